@@ -0,0 +1,289 @@
+# --- 로컬 HTTP/JSON API (대시보드와 같은 KPI/지역별/가격 추이를 다른 도구에서 조회) ---
+# 외부 서비스 없이 표준 라이브러리 http.server로 띄운다. 조회는 dashboard_service.py를 그대로 쓰므로
+# 대시보드와 같은 값이 나오고, 디스크 결과 캐시도 대시보드와 함께 쓴다.
+#   python api_server.py                        # http://127.0.0.1:8600
+#   curl "http://127.0.0.1:8600/api/dashboard?model=iPhone%2016%20Pro&start=2025-10-03&end=2025-11-09"
+# 응답 ETag는 (DB 버전, 요청 경로)로 만든다. If-None-Match가 같으면 조회 없이 304를 돌려주므로
+# 주기적으로 폴링하는 클라이언트는 DB가 바뀌기 전까지 다시 계산하지 않는다.
+#
+# GET /api/version                                  DB 버전, 백엔드
+# GET /api/models                                   기종 선택지
+# GET /api/date-bounds                              게시일 범위
+# GET /api/dashboard?platform=&model=&start=&end=&dedup=   KPI, 가격 분포, 지역별/플랫폼별 매물 수 (dedup=1: 중복 매물 제외)
+# GET /api/trend?platform=&model=&start=&end=&unit= 가격 추이 (unit: 자동|일|주|월)
+# GET /api/compare?models=a,b&platforms=x,y&start=&end=&unit=   기종 비교
+# GET /api/unmapped?platform=&model=&start=&end=    지역 미기재 동 목록
+# GET /api/listings?platform=&model=&start=&end=&after_date=&after_id=&limit=   매물 목록 (키셋 페이지)
+# GET /api/export.csv?platform=&model=&start=&end=  필터된 매물 전체 CSV (청크 단위 스트리밍)
+# GET /api/price-drops?platform=&model=&start=&end=      가격 인하 이력 (기간: 새 가격을 처음 본 날)
+# GET /api/days-on-market?platform=&model=&start=&end=   기종별 게시 기간 (model을 빼면 전체 기종)
+# start/end를 빼면 DB의 전체 게시일 범위, platform을 빼면 '전체'
+# 조회가 실패하면(연결 실패, 테이블 없음 등) 빈 결과 대신 500과 {"error": ...}를 돌려준다 (fallback=False 서비스).
+import argparse
+import datetime
+import hashlib
+import json
+import math
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote
+
+import numpy as np
+import pandas as pd
+
+from market_db import DB_FILE, MAP_FILE_PATH
+from dashboard_data import TREND_UNITS, LISTING_PAGE_SIZE
+from dashboard_service import DashboardService, RESULT_CACHE_FILE, QUERY_BACKENDS
+from listing_export import iter_listing_csv, export_file_name
+
+DEFAULT_PORT = 8600
+MAX_LISTING_LIMIT = 1000
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def jsonable(value):
+    """DataFrame/numpy/날짜가 섞인 조회 결과 → json.dumps 가능한 값 (NaN → null)"""
+    if isinstance(value, pd.DataFrame): return jsonable(value.to_dict('records'))
+    if isinstance(value, dict): return {str(k): jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)): return [jsonable(v) for v in value]
+    if isinstance(value, np.integer): return int(value)
+    if isinstance(value, (float, np.floating)): return None if math.isnan(value) else float(value)
+    if isinstance(value, (datetime.date, pd.Timestamp)): return value.isoformat()
+    if value is pd.NA or value is pd.NaT: return None
+    return value
+
+
+def make_etag(version, path):
+    return '"' + hashlib.sha1(f"{version}|{path}".encode('utf-8')).hexdigest()[:20] + '"'
+
+
+def etag_matches(header, etag):
+    if not header: return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+# --- 요청 파라미터 ---
+def param(query, name, default=None):
+    values = query.get(name)
+    return values[0] if values else default
+
+
+def date_param(query, name, default):
+    value = param(query, name)
+    if value is None: return default
+    try: return datetime.date.fromisoformat(value)
+    except ValueError: raise BadRequest(f"{name}: YYYY-MM-DD 형식이 아닙니다 ({value})")
+
+
+def list_param(query, name):
+    value = param(query, name, "")
+    return tuple(v.strip() for v in value.split(",") if v.strip())
+
+
+def filter_params(service, query, need_model=True):
+    """(platform, model, start_date, end_date)"""
+    model = param(query, 'model')
+    if need_model and not model: raise BadRequest("model 파라미터가 필요합니다")
+    min_date, max_date = service.fetch_date_bounds()
+    start = date_param(query, 'start', datetime.date.fromisoformat(min_date) if min_date else datetime.date.today())
+    end = date_param(query, 'end', datetime.date.fromisoformat(max_date) if max_date else datetime.date.today())
+    if start > end: raise BadRequest("start가 end보다 늦습니다")
+    return param(query, 'platform', '전체'), model, start, end
+
+
+def unit_param(query):
+    unit = param(query, 'unit', '자동')
+    if unit != '자동' and unit not in TREND_UNITS: raise BadRequest(f"unit: 자동, {', '.join(TREND_UNITS)} 중 하나 ({unit})")
+    return unit
+
+
+# --- 엔드포인트 (query → JSON으로 바꿀 dict) ---
+def api_version(service, query):
+    return {'version': service.data_version(), 'backend': service.backend}
+
+
+def api_models(service, query):
+    return {'models': service.fetch_model_options()}
+
+
+def api_date_bounds(service, query):
+    min_date, max_date = service.fetch_date_bounds()
+    return {'min_date': min_date, 'max_date': max_date}
+
+
+def api_dashboard(service, query):
+    platform, model, start, end = filter_params(service, query)
+    dedup = param(query, 'dedup', '0') in ('1', 'true')
+    if dedup: results = service.fetch_dashboard_data(platform, model, start, end, MAP_FILE_PATH, dedup=True)
+    else: results = service.fetch_dashboard_data(platform, model, start, end, MAP_FILE_PATH)
+    return {
+        'filters': {'platform': platform, 'model': model, 'start': start, 'end': end, 'dedup': dedup},
+        'total_count': results['total_count'],
+        'avg_price': results['avg_price'],
+        'price_stats': results['price_stats'],
+        'regions': results['region_df'],
+        'platforms': results['platform_df'],
+        'price_histogram': results['price_hist_df'],
+    }
+
+
+def api_trend(service, query):
+    platform, model, start, end = filter_params(service, query)
+    df, used_unit = service.fetch_price_trend(platform, model, start, end, unit_param(query))
+    return {'filters': {'platform': platform, 'model': model, 'start': start, 'end': end}, 'unit': used_unit, 'points': df}
+
+
+def api_compare(service, query):
+    models, platforms = list_param(query, 'models'), list_param(query, 'platforms')
+    if not models: raise BadRequest("models 파라미터가 필요합니다 (쉼표로 구분)")
+    _, _, start, end = filter_params(service, query, need_model=False)
+    comparison, used_unit = service.fetch_model_comparison(models, platforms or ('당근마켓', '번개장터', '중고나라'),
+                                                           start, end, unit_param(query))
+    return {
+        'unit': used_unit,
+        'models': comparison['models'],
+        'summary': comparison['summary_df'],
+        'trend': comparison['trend_df'],
+        'platforms': comparison['platform_df'],
+    }
+
+
+def api_unmapped(service, query):
+    platform, model, start, end = filter_params(service, query)
+    df = service.fetch_unmapped_details(platform, model, start, end, MAP_FILE_PATH)
+    return {'rows': df.rename(columns={'동 이름(원본)': 'dong', '매물 수': 'count'})}
+
+
+def api_listings(service, query):
+    platform, model, start, end = filter_params(service, query)
+    after_date, after_id = param(query, 'after_date'), param(query, 'after_id')
+    try:
+        after = (after_date, int(after_id)) if after_date and after_id else None
+        limit = min(max(int(param(query, 'limit', LISTING_PAGE_SIZE)), 1), MAX_LISTING_LIMIT)
+    except ValueError: raise BadRequest("after_id, limit은 정수여야 합니다")
+    df, has_more = service.fetch_listing_page(platform, model, start, end, after=after, limit=limit)
+    next_after = {'after_date': df.iloc[-1]['posted_date'], 'after_id': int(df.iloc[-1]['post_id'])} if has_more else None
+    return {'rows': df, 'has_more': has_more, 'next': next_after}
+
+
+def api_price_drops(service, query):
+    platform, model, start, end = filter_params(service, query, need_model=False)
+    return {'rows': service.fetch_price_drops(platform, model, start, end)}
+
+
+def api_days_on_market(service, query):
+    platform, model, start, end = filter_params(service, query, need_model=False)
+    summary, latest_seen = service.fetch_days_on_market(platform, model, start, end)
+    return {'latest_seen': latest_seen, 'models': summary}
+
+
+ROUTES = {
+    '/api/version': api_version,
+    '/api/models': api_models,
+    '/api/date-bounds': api_date_bounds,
+    '/api/dashboard': api_dashboard,
+    '/api/trend': api_trend,
+    '/api/compare': api_compare,
+    '/api/unmapped': api_unmapped,
+    '/api/listings': api_listings,
+    '/api/price-drops': api_price_drops,
+    '/api/days-on-market': api_days_on_market,
+}
+STREAM_ROUTES = {'/api/export.csv'}
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive + chunked 전송
+    service = None                 # make_server에서 지정
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path not in ROUTES and url.path not in STREAM_ROUTES:
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': f"없는 경로입니다: {url.path}"})
+
+        # DB 버전이 같고 클라이언트가 같은 ETag를 갖고 있으면 조회하지 않는다
+        etag = make_etag(self.service.data_version(), self.path)
+        if etag_matches(self.headers.get('If-None-Match'), etag):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        query = parse_qs(url.query)
+        try:
+            if url.path == '/api/export.csv': return self.stream_export(query, etag)
+            body = ROUTES[url.path](self.service, query)
+        except BadRequest as e:
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        except Exception as e:
+            if url.path in STREAM_ROUTES: raise  # 청크 응답을 이미 시작했을 수 있다
+            return self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"조회 실패: {e.__cause__ or e}"})
+        self.send_json(HTTPStatus.OK, body, etag)
+
+    def send_json(self, status, body, etag=None):
+        data = json.dumps(jsonable(body), ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')  # 캐시해 두되 쓸 때마다 ETag로 확인
+        self.end_headers()
+        self.wfile.write(data)
+
+    def stream_export(self, query, etag):
+        """필터된 매물 전체를 CSV로. 커서에서 읽은 청크를 그대로 chunked 응답으로 보낸다"""
+        platform, model, start, end = filter_params(self.service, query)
+        conn = self.service.get_connection()
+        if conn is None: return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': "DB 연결 오류"})
+        try:
+            chunks = iter_listing_csv(conn, platform, model, start, end)
+            first = next(chunks)  # 헤더 (쿼리 오류는 응답을 시작하기 전에 드러난다)
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type', 'text/csv; charset=utf-8')
+            file_name = quote(export_file_name(platform, model, start, end, 'CSV'))
+            self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{file_name}")
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.write_chunk(first)
+            for chunk in chunks:
+                if chunk: self.write_chunk(chunk)
+            self.wfile.write(b"0\r\n\r\n")
+        finally:
+            self.service.release_connection(conn)
+
+    def write_chunk(self, chunk):
+        self.wfile.write(b"%X\r\n" % len(chunk) + chunk + b"\r\n")
+
+
+def make_server(host='127.0.0.1', port=DEFAULT_PORT, service=None):
+    handler = type('BoundApiHandler', (ApiHandler,), {'service': service or DashboardService(fallback=False)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 집계 로컬 HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1", help="바인딩 주소 (기본: 127.0.0.1, 로컬 전용)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"포트 (기본: {DEFAULT_PORT})")
+    parser.add_argument("--db", default=str(DB_FILE), help="DB 파일 (기본: project2.db)")
+    parser.add_argument("--backend", default="sqlite", choices=QUERY_BACKENDS, help="집계 조회 백엔드 (parquet은 duckdb 필요)")
+    parser.add_argument("--cache", default=str(RESULT_CACHE_FILE), help="결과 캐시 파일 (기본: 대시보드와 같은 파일)")
+    args = parser.parse_args()
+
+    service = DashboardService(args.db, args.cache, backend=args.backend, fallback=False)
+    server = make_server(args.host, args.port, service)
+    print(f"✅ API 서버: http://{args.host}:{args.port}/api/version (DB: {args.db}, 백엔드: {args.backend})")
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally: server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# --- 대시보드 쿼리 벤치마크 (합성 데이터 생성 + 크기별 실행 시간 측정/기준값 비교) ---
+#   python benchmark.py generate --sizes 10k 1m        # bench/bench_10k.db, bench/bench_1m.db 생성
+#   python benchmark.py run --sizes 10k 1m 10m          # 없는 DB는 만들고 측정, 기준값과 비교
+#   python benchmark.py run --sizes 10k --save-baseline # 측정 결과를 기준값으로 저장
+#   python benchmark.py run --sizes 1m --backends sqlite parquet  # 같은 조건으로 SQLite / Parquet 스냅숏 비교
+# 합성 데이터는 project2.db의 실제 게시물을 복원 추출(bootstrap)해서 만든다.
+# 기종/플랫폼/지역 분포는 실제 데이터를 그대로 따르고, 날짜는 실제 요일 분포 × 최근일수록 많은 추세로 늘린다.
+import argparse
+import datetime
+import json
+import platform as platform_info
+import sqlite3
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from market_db import BASE_DIR, DB_FILE, MAP_FILE_PATH, ReadOnlyPool, db_version_token
+from dashboard_data import (
+    read_model_options, rollups_available, read_rollup_groups, read_post_groups,
+    read_dashboard_data, read_unmapped_details, read_listing_page, read_date_bounds,
+    read_price_distribution, summarize_prices, read_price_trend, read_model_comparison,
+)
+from map_render import load_map_image, draw_map_overlay, seoul_gu_counts
+import db_refresh
+import columnar
+
+BENCH_DIR = BASE_DIR / "bench"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+INSERT_BATCH = 100_000
+MAX_SPAN_DAYS = 3 * 365
+BASE_TABLES = ('platforms', 'products', 'regions', 'posts')
+
+
+def parse_size(label):
+    """'10k' → 10000, '1m' → 1000000"""
+    label = label.lower()
+    units = {'k': 1_000, 'm': 1_000_000}
+    if label[-1] in units: return int(float(label[:-1]) * units[label[-1]])
+    return int(label)
+
+
+def bench_db_path(label):
+    return BENCH_DIR / f"bench_{label.lower()}.db"
+
+
+def bench_snapshot_dir(label):
+    return BENCH_DIR / f"snapshot_{label.lower()}"
+
+
+# --- 합성 데이터 생성 ---
+def nullable(series):
+    """sqlite3에 바로 넘길 수 있는 리스트 (NA → None)"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def copy_schema(src, dst):
+    """원본 DB의 기본 테이블/인덱스 정의를 그대로 만든다 (집계 테이블은 db_refresh가 생성)"""
+    rows = src.execute(
+        "SELECT type, tbl_name, sql FROM sqlite_master WHERE sql IS NOT NULL AND tbl_name IN (%s) "
+        "ORDER BY type = 'index'" % ",".join("?" * len(BASE_TABLES)), BASE_TABLES
+    ).fetchall()
+    for _, _, sql in rows:
+        dst.execute(sql)
+
+
+def date_weights(real_dates, span_days):
+    """실제 요일 분포 × 최근일수록 많은(0.5 → 1.5) 추세로 날짜별 가중치"""
+    weekday_counts = pd.to_datetime(real_dates).dt.dayofweek.value_counts().reindex(range(7), fill_value=0)
+    weekday_share = (weekday_counts + 1) / (weekday_counts + 1).sum()
+    end = pd.to_datetime(real_dates).max()
+    days = pd.date_range(end=end, periods=span_days, freq='D')
+    weights = weekday_share.reindex(days.dayofweek).to_numpy() * np.linspace(0.5, 1.5, span_days)
+    return days.strftime('%Y-%m-%d').to_numpy(), weights / weights.sum()
+
+
+def generate(out_path, rows, source=DB_FILE, seed=0):
+    """실제 게시물을 복원 추출해 rows건짜리 합성 DB를 만든다"""
+    rng = np.random.default_rng(seed)
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    real = pd.read_sql_query(
+        "SELECT platform_id, product_id, title, price_krw, posted_date, region_id FROM posts "
+        "WHERE posted_date IS NOT NULL", src
+    )
+    real_span = (pd.to_datetime(real['posted_date']).max() - pd.to_datetime(real['posted_date']).min()).days + 1
+    span_days = min(max(real_span, rows // 3000), MAX_SPAN_DAYS)
+    days, weights = date_weights(real['posted_date'], span_days)
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    out_path.unlink(missing_ok=True)
+    dst = sqlite3.connect(out_path)
+    dst.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;")
+    copy_schema(src, dst)
+    for table in ('platforms', 'products', 'regions'):
+        df = pd.read_sql_query(f"SELECT * FROM {table}", src)
+        placeholders = ",".join("?" * len(df.columns))
+        dst.executemany(
+            f"INSERT INTO {table} ({','.join(df.columns)}) VALUES ({placeholders})",
+            zip(*(nullable(df[column]) for column in df.columns)),
+        )
+    src.close()
+
+    region_ids = real['region_id'].dropna().to_numpy()
+    start = time.perf_counter()
+    for offset in range(0, rows, INSERT_BATCH):
+        n = min(INSERT_BATCH, rows - offset)
+        sample = real.iloc[rng.integers(0, len(real), n)].reset_index(drop=True)
+        # 30%는 지역을 실제 지역 분포에서 다시 뽑아 (기종, 지역) 조합을 늘린다
+        moved = rng.random(n) < 0.3
+        sample.loc[moved, 'region_id'] = rng.choice(region_ids, moved.sum())
+        sample['region_id'] = sample['region_id'].astype('Int64')
+        # 가격: 같은 게시물 가격 ±8% (천 원 단위), 날짜: 가중치대로 다시 배정
+        noise = rng.lognormal(0, 0.08, n)
+        sample['price_krw'] = (sample['price_krw'] * noise / 1000).round().mul(1000).astype('Int64')
+        sample['posted_date'] = rng.choice(days, n, p=weights)
+        post_ids = np.arange(offset + 1, offset + n + 1)
+        dst.executemany(
+            "INSERT INTO posts (post_id, platform_id, product_id, ext_post_id, title, price_krw, posted_date, url, region_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            zip(
+                post_ids.tolist(), sample['platform_id'].tolist(), sample['product_id'].tolist(),
+                [f"bench-{i}" for i in post_ids], sample['title'].tolist(),
+                nullable(sample['price_krw']), sample['posted_date'].tolist(),
+                [f"https://example.com/bench/{i}" for i in post_ids], nullable(sample['region_id']),
+            ),
+        )
+        dst.commit()
+    elapsed = time.perf_counter() - start
+
+    # 대시보드와 같은 상태로: 기종 분류 + 구 보정 + 일별 집계
+    db_refresh.classify_products(dst)
+    db_refresh.resolve_regions(dst)
+    db_refresh.refresh_rollups(dst)
+    dst.execute("ANALYZE")
+    dst.commit()
+    dst.close()
+    print(f"✅ {out_path.name}: {rows:,}건, {span_days}일 ({rows / max(elapsed, 1e-9):,.0f}건/초)")
+    return out_path
+
+
+# --- 측정 ---
+def time_call(fn, repeat):
+    fn()  # 첫 실행(페이지 캐시 적재)은 측정에서 뺀다
+    timings, value = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, value
+
+
+def result_rows(value):
+    if isinstance(value, pd.DataFrame): return len(value)
+    if isinstance(value, tuple) and value and isinstance(value[0], pd.DataFrame): return len(value[0])
+    if isinstance(value, dict): return value.get('total_count')
+    if isinstance(value, (list, bytes)): return len(value)
+    return None
+
+
+def benchmark_filters(conn):
+    """(기종, 전체 기간, 최근 7일, 기종 목록, 플랫폼 목록). 기간/기종은 DB의 실제 값에서 고른다"""
+    top = conn.execute("""
+        SELECT pr.model_family, pr.variant, COUNT(*) FROM posts AS p JOIN products AS pr ON p.product_id = pr.product_id
+        WHERE pr.model_family IS NOT NULL GROUP BY 1, 2 ORDER BY 3 DESC LIMIT 1
+    """).fetchone()
+    model = f"{top[0]} {top[1]}".strip() if top else '기타'  # 게시물이 가장 많은 기종
+    min_date, max_date = read_date_bounds(conn)
+    end = datetime.date.fromisoformat(max_date)
+    full = (datetime.date.fromisoformat(min_date), end)
+    week = (end - datetime.timedelta(days=6), end)
+    model_options = read_model_options(conn)
+    platforms = [row[0] for row in conn.execute("SELECT name FROM platforms ORDER BY name")]
+    return model, full, week, model_options, platforms
+
+
+def benchmark_cases(conn, base_map):
+    """(이름, 호출 함수) 목록"""
+    model, full, week, model_options, platforms = benchmark_filters(conn)
+    region_df = read_dashboard_data(conn, '전체', model, *full, MAP_FILE_PATH)['region_df']
+    first_page, _ = read_listing_page(conn, '전체', model, *full)
+    after = (first_page.iloc[-1]['posted_date'], int(first_page.iloc[-1]['post_id'])) if len(first_page) else None
+
+    cases = [
+        ('model_options', lambda: read_model_options(conn)),
+        ('date_bounds', lambda: read_date_bounds(conn)),
+        ('rollups_available', lambda: rollups_available(conn)),
+        ('rollup_groups/full', lambda: read_rollup_groups(conn, model, *full)),
+        ('rollup_groups/7d', lambda: read_rollup_groups(conn, model, *week)),
+        ('post_groups/full', lambda: read_post_groups(conn, model, *full, MAP_FILE_PATH)),
+        ('post_groups/7d', lambda: read_post_groups(conn, model, *week, MAP_FILE_PATH)),
+        ('dashboard_data/전체', lambda: read_dashboard_data(conn, '전체', model, *full, MAP_FILE_PATH)),
+        ('dashboard_data/번개장터', lambda: read_dashboard_data(conn, '번개장터', model, *full, MAP_FILE_PATH)),
+        ('price_distribution/full', lambda: summarize_prices(read_price_distribution(conn, '전체', model, *full))[1]),
+        ('price_distribution/7d', lambda: summarize_prices(read_price_distribution(conn, '전체', model, *week))[1]),
+        ('price_trend/auto', lambda: read_price_trend(conn, '전체', model, *full)[0]),
+        ('price_trend/day', lambda: read_price_trend(conn, '전체', model, *full, unit='일')[0]),
+        ('model_comparison/all', lambda: read_model_comparison(conn, model_options, platforms, *full)[0]),
+        ('unmapped_details', lambda: read_unmapped_details(conn, '전체', model, *full, MAP_FILE_PATH)),
+        ('listing_page/first', lambda: read_listing_page(conn, '전체', model, *full)),
+        ('listing_page/next', lambda: read_listing_page(conn, '전체', model, *full, after=after)),
+    ]
+    if base_map is not None:
+        gu_counts = seoul_gu_counts(region_df)
+        cases.append(('map_render/JPEG', lambda: draw_map_overlay(base_map, gu_counts, 'JPEG')))
+        cases.append(('map_render/PNG', lambda: draw_map_overlay(base_map, gu_counts, 'PNG')))
+    return cases
+
+
+def columnar_cases(snap, filters):
+    """Parquet 스냅숏에서 실행하는 집계 조회 (이름은 SQLite 항목과 같게 해서 나란히 비교)"""
+    model, full, week, model_options, platforms = filters
+    return [
+        ('dashboard_data/전체', lambda: columnar.read_dashboard_data(snap, '전체', model, *full)),
+        ('dashboard_data/번개장터', lambda: columnar.read_dashboard_data(snap, '번개장터', model, *full)),
+        ('price_distribution/full', lambda: summarize_prices(columnar.read_price_distribution(snap, '전체', model, *full))[1]),
+        ('price_distribution/7d', lambda: summarize_prices(columnar.read_price_distribution(snap, '전체', model, *week))[1]),
+        ('price_trend/auto', lambda: columnar.read_price_trend(snap, '전체', model, *full)[0]),
+        ('price_trend/day', lambda: columnar.read_price_trend(snap, '전체', model, *full, unit='일')[0]),
+        ('model_comparison/all', lambda: columnar.read_model_comparison(snap, model_options, platforms, *full)[0]),
+    ]
+
+
+def measure(cases, repeat):
+    results = {}
+    for name, fn in cases:
+        timings, value = time_call(fn, repeat)
+        results[name] = {
+            'median_ms': round(statistics.median(timings), 3),
+            'min_ms': round(min(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'rows': result_rows(value),
+        }
+    return results
+
+
+def run_size(label, repeat, backends=('sqlite',)):
+    """{결과 키: 항목별 측정값}. SQLite는 '<크기>', Parquet 스냅숏은 '<크기>/parquet'"""
+    path = bench_db_path(label)
+    if not path.exists(): generate(path, parse_size(label))
+    pool = ReadOnlyPool(path, size=1)
+    results = {}
+    with pool.connection() as conn:
+        if 'sqlite' in backends:
+            results[label] = measure(benchmark_cases(conn, load_map_image()), repeat)
+        if 'parquet' in backends:
+            filters = benchmark_filters(conn)
+    pool.close_all()
+
+    if 'parquet' in backends:
+        snapshot_dir = bench_snapshot_dir(label)
+        meta = columnar.read_meta(snapshot_dir)
+        if meta is None or meta.get('db_version') != db_version_token(path):
+            meta = columnar.export_snapshot(path, snapshot_dir)
+            print(f"✅ {snapshot_dir.name}: {meta['rows']:,}건 ({meta['export_seconds']}초)")
+        snapshot = columnar.ColumnarSnapshot(snapshot_dir)
+        with snapshot.connection() as snap:
+            results[f"{label}/parquet"] = measure(columnar_cases(snap, filters), repeat)
+        snapshot.close_all()
+    return results
+
+
+# --- 기준값 비교 ---
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """(크기, 이름, 기준 ms, 현재 ms, 배율, 상태) 목록. 상태: 느려짐/빨라짐/결과 변경/''
+    차이가 min_delta_ms보다 작으면 배율과 상관없이 측정 오차로 본다."""
+    rows = []
+    for label, cases in results.items():
+        for name, current in cases.items():
+            old = baseline.get('results', {}).get(label, {}).get(name)
+            if old is None:
+                rows.append((label, name, None, current['median_ms'], None, '새 항목'))
+                continue
+            ratio = current['median_ms'] / max(old['median_ms'], 1e-6)
+            status = ''
+            noise = abs(current['median_ms'] - old['median_ms']) < min_delta_ms
+            if old.get('rows') != current['rows']: status = '결과 변경'
+            elif noise: pass
+            elif ratio >= threshold: status = '느려짐'
+            elif ratio <= 1 / threshold: status = '빨라짐'
+            rows.append((label, name, old['median_ms'], current['median_ms'], ratio, status))
+    return rows
+
+
+def print_report(results, comparison=None):
+    if comparison is None:
+        for label, cases in results.items():
+            print(f"\n[{label}]")
+            for name, r in cases.items():
+                print(f"  {name:<26} {r['median_ms']:>10.2f}ms  (min {r['min_ms']:.2f}, max {r['max_ms']:.2f}, rows {r['rows']})")
+        return
+    current_label = None
+    for label, name, old_ms, new_ms, ratio, status in comparison:
+        if label != current_label:
+            print(f"\n[{label}]  {'항목':<24} {'기준':>10} {'현재':>10} {'배율':>7}")
+            current_label = label
+        old_text = f"{old_ms:.2f}" if old_ms is not None else "-"
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else "-"
+        mark = {'느려짐': ' ⚠️ 느려짐', '빨라짐': ' ✅ 빨라짐', '결과 변경': ' ❗ 결과 변경'}.get(status, f" {status}" if status else "")
+        print(f"  {name:<26} {old_text:>10} {new_ms:>10.2f} {ratio_text:>7}{mark}")
+
+
+def print_backends(results):
+    """같은 항목의 SQLite / Parquet 스냅숏 시간을 나란히 출력"""
+    for label, cases in results.items():
+        if not label.endswith('/parquet'): continue
+        base = results.get(label[:-len('/parquet')], {})
+        print(f"\n[{label[:-len('/parquet')]}]  {'항목':<24} {'SQLite':>10} {'Parquet':>10} {'배율':>7}")
+        for name, r in cases.items():
+            old = base.get(name)
+            old_text = f"{old['median_ms']:.2f}" if old else "-"
+            ratio_text = f"{old['median_ms'] / max(r['median_ms'], 1e-6):.2f}x" if old else "-"
+            mark = " ❗ 결과 다름" if old and old['rows'] != r['rows'] else ""
+            print(f"  {name:<26} {old_text:>10} {r['median_ms']:>10.2f} {ratio_text:>7}{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="대시보드 쿼리 벤치마크 (합성 데이터 생성 및 실행 시간 측정)")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help="합성 데이터 DB 생성 (bench/bench_<크기>.db)")
+    gen.add_argument("--sizes", nargs="+", default=['10k'], help="게시물 수 (예: 10k 1m 10m)")
+    gen.add_argument("--seed", type=int, default=0)
+
+    run = sub.add_parser('run', help="크기별 쿼리/지도 렌더링 시간 측정 후 기준값과 비교")
+    run.add_argument("--sizes", nargs="+", default=['10k'], help="게시물 수 (예: 10k 1m 10m)")
+    run.add_argument("--repeat", type=int, default=5, help="항목별 반복 횟수 (중앙값 사용)")
+    run.add_argument("--baseline", default=str(BASELINE_FILE), help="기준값 파일 (기본: bench/baseline.json)")
+    run.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    run.add_argument("--threshold", type=float, default=1.25, help="느려짐으로 볼 배율 (기본 1.25)")
+    run.add_argument("--min-delta-ms", type=float, default=1.0, help="이보다 작은 차이는 무시 (기본 1ms)")
+    run.add_argument("--output", help="측정 결과 JSON 저장 경로")
+    run.add_argument("--fail-on-regression", action="store_true", help="느려지거나 결과가 바뀌면 종료 코드 1")
+    run.add_argument("--backends", nargs="+", default=['sqlite'], choices=['sqlite', 'parquet'],
+                     help="측정할 조회 백엔드 (parquet은 duckdb 필요, 스냅숏은 bench/snapshot_<크기>)")
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        for label in args.sizes:
+            generate(bench_db_path(label), parse_size(label), seed=args.seed)
+        return
+
+    if 'parquet' in args.backends and not columnar.duckdb_available():
+        raise SystemExit("parquet 백엔드는 duckdb가 필요합니다: pip install duckdb")
+    results = {}
+    for label in args.sizes:
+        results.update(run_size(label.lower(), args.repeat, args.backends))
+    report = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform_info.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform_info.platform(),
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    if 'parquet' in args.backends: print_backends(results)
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline or not baseline_path.exists():
+        print_report(results)
+        if args.save_baseline:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+            print(f"\n✅ 기준값 저장: {baseline_path}")
+        else:
+            print(f"\n기준값 파일이 없습니다. --save-baseline으로 저장하세요. ({baseline_path})")
+        return
+
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    comparison = compare(results, baseline, args.threshold, args.min_delta_ms)
+    print(f"기준값: {baseline.get('created_at')} ({baseline.get('machine')})")
+    print_report(results, comparison)
+    regressions = [row for row in comparison if row[5] in ('느려짐', '결과 변경')]
+    if regressions:
+        print(f"\n⚠️ 느려짐/결과 변경 {len(regressions)}건")
+        if args.fail_on_regression: raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
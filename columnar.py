@@ -0,0 +1,325 @@
+# --- 컬럼형 분석 백엔드 (Parquet 스냅숏 + DuckDB) ---
+# 적재 후처리(db_refresh.py)가 끝나면 posts를 플랫폼/기종/구와 조인해 월별로 나눈 Parquet 스냅숏으로 내보낸다.
+#   snapshot/month=2025-10/data_0.parquet ...  + snapshot/snapshot.json (원본 DB 버전, 행 수)
+# 대시보드에서 DASHBOARD_BACKEND=parquet 이면 기간 전체를 훑는 집계 조회(통합 집계, 가격 분포, 가격 추이, 기종 비교)를
+# 이 스냅숏에서 실행한다. 함수 이름/인자/반환 모양은 dashboard_data.py와 같고 값도 같다
+# (가격 분포는 집계 테이블과 같은 가격 구간 번호를 스냅숏에 저장해 두고 합친다).
+# 매물 목록/미기재 상세처럼 몇 건만 읽는 조회는 계속 SQLite를 쓴다.
+# duckdb는 선택 의존성이다 (pip install duckdb). 없으면 스냅숏을 만들지 않고 대시보드는 SQLite로 조회한다.
+#   python columnar.py                   # project2.db → snapshot/
+#   python columnar.py --db bench/bench_1m.db --out bench/snapshot_1m
+import argparse
+import json
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from market_db import BASE_DIR, DB_FILE, model_filter_sql, models_filter_sql, price_bucket, bucket_prices, db_version_token
+from dashboard_data import (
+    TREND_UNITS, MAX_TREND_POINTS, trend_unit_for, lttb_indices, summarize_groups,
+)
+from query_trace import tracer
+
+SNAPSHOT_DIR = BASE_DIR / "snapshot"
+SNAPSHOT_META = "snapshot.json"
+EXPORT_CHUNK_ROWS = 200_000
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE snapshot (
+  post_id      BIGINT,
+  posted_date  DATE,
+  platform     VARCHAR,
+  model_family VARCHAR,
+  variant      VARCHAR,
+  sigungu      VARCHAR,   -- regions.resolved_sigungu (daily_rollup.sigungu와 같은 값)
+  price_krw    BIGINT,
+  price_bucket INTEGER    -- market_db.price_bucket (daily_price_hist와 같은 구간 번호)
+)
+"""
+
+EXPORT_SQL = """
+SELECT p.post_id, p.posted_date, pf.name AS platform, pr.model_family, pr.variant,
+       r.resolved_sigungu AS sigungu, p.price_krw, price_bucket(p.price_krw) AS price_bucket
+FROM posts AS p
+JOIN platforms AS pf ON p.platform_id = pf.platform_id
+JOIN products AS pr ON p.product_id = pr.product_id
+LEFT JOIN regions AS r ON p.region_id = r.region_id
+WHERE p.posted_date IS NOT NULL
+"""
+
+
+def duckdb_available():
+    try:
+        import duckdb  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def read_meta(snapshot_dir=SNAPSHOT_DIR):
+    try: return json.loads((Path(snapshot_dir) / SNAPSHOT_META).read_text(encoding='utf-8'))
+    except (OSError, ValueError): return None
+
+
+# --- 스냅숏 내보내기 ---
+def export_snapshot(db_file=DB_FILE, snapshot_dir=SNAPSHOT_DIR, chunk_rows=EXPORT_CHUNK_ROWS):
+    """posts + 차원을 월별 Parquet으로 내보내고 메타 정보 dict 반환.
+    새 폴더에 다 쓴 뒤 바꿔 끼우므로 읽는 쪽은 예전 스냅숏이나 새 스냅숏 중 하나만 본다."""
+    import duckdb
+
+    snapshot_dir = Path(snapshot_dir)
+    version = db_version_token(db_file)  # 내보내는 동안 DB가 바뀌면 메타 버전이 어긋나 오래된 스냅숏으로 본다
+    start = time.perf_counter()
+
+    src = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    src.create_function('price_bucket', 1, price_bucket, deterministic=True)
+    duck = duckdb.connect()
+    try:
+        duck.execute(SNAPSHOT_SCHEMA)
+        cursor = src.execute(EXPORT_SQL)
+        columns = [c[0] for c in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows: break
+            _append_chunk(duck, columns, rows)
+    finally:
+        src.close()
+
+    tmp_dir = snapshot_dir.with_name(snapshot_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        duck.execute(f"""
+        COPY (SELECT *, strftime(posted_date, '%Y-%m') AS month FROM snapshot ORDER BY posted_date, post_id)
+        TO '{tmp_dir.as_posix()}' (FORMAT PARQUET, PARTITION_BY (month), COMPRESSION ZSTD)
+        """)
+        row_count = duck.execute("SELECT COUNT(*) FROM snapshot").fetchone()[0]
+    finally:
+        duck.close()
+    tmp_dir.mkdir(parents=True, exist_ok=True)  # 게시물이 없으면 COPY가 폴더를 만들지 않는다
+
+    meta = {
+        'db_version': version,
+        'rows': row_count,
+        'partitions': sorted(p.name for p in tmp_dir.glob("month=*")),
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'export_seconds': round(time.perf_counter() - start, 2),
+    }
+    (tmp_dir / SNAPSHOT_META).write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    old_dir = snapshot_dir.with_name(snapshot_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if snapshot_dir.exists(): snapshot_dir.rename(old_dir)
+    tmp_dir.rename(snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def _append_chunk(duck, columns, rows):
+    # 청크를 DataFrame으로 넘겨 한 번에 복사 (executemany는 행마다 바인딩해서 느리다)
+    chunk = pd.DataFrame.from_records(rows, columns=columns)
+    duck.register('chunk', chunk)
+    try:
+        duck.execute("""
+        INSERT INTO snapshot
+        SELECT post_id, CAST(posted_date AS DATE), platform, model_family, variant, sigungu,
+               CAST(price_krw AS BIGINT), CAST(price_bucket AS INTEGER)
+        FROM chunk
+        """)
+    finally:
+        duck.unregister('chunk')
+
+
+# --- 스냅숏 열기 (ReadOnlyPool과 같은 acquire/release/connection 인터페이스) ---
+class ColumnarSnapshot:
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR, threads=None):
+        import duckdb
+
+        self.snapshot_dir = Path(snapshot_dir)
+        self.meta = read_meta(self.snapshot_dir)
+        if self.meta is None: raise FileNotFoundError(f"Parquet 스냅숏이 없습니다: {self.snapshot_dir}")
+        self._conn = duckdb.connect()
+        if threads: self._conn.execute(f"SET threads = {int(threads)}")
+        self._lock = threading.Lock()
+        if self.meta['partitions']:
+            pattern = (self.snapshot_dir / "month=*" / "*.parquet").as_posix()
+            self._conn.execute(f"""
+            CREATE VIEW posts AS
+            SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, hive_types = {{'month': VARCHAR}})
+            """)
+        else:
+            self._conn.execute(SNAPSHOT_SCHEMA.replace("CREATE TABLE snapshot (", "CREATE TABLE posts (month VARCHAR, "))
+
+    def is_current(self, db_file=DB_FILE):
+        return self.meta.get('db_version') == db_version_token(db_file)
+
+    def acquire(self):
+        # DuckDB 연결은 스레드 사이에 공유하지 않고, 같은 DB를 보는 커서를 스레드마다 따로 만든다
+        with self._lock:
+            return self._conn.cursor()
+
+    def release(self, conn):
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try: yield conn
+        finally: self.release(conn)
+
+    def close_all(self):
+        self._conn.close()
+
+
+def open_snapshot(db_file=DB_FILE, snapshot_dir=SNAPSHOT_DIR):
+    """DB와 버전이 같은 스냅숏이면 ColumnarSnapshot, duckdb가 없거나 스냅숏이 없거나 오래됐으면 None"""
+    if not duckdb_available(): return None
+    meta = read_meta(snapshot_dir)
+    if meta is None or meta.get('db_version') != db_version_token(db_file): return None
+    return ColumnarSnapshot(snapshot_dir)
+
+
+# --- 조회 (dashboard_data.py의 같은 이름 함수와 같은 결과) ---
+# 월 파티션 조건을 함께 걸어 기간 밖의 Parquet 파일은 열지 않는다.
+def date_filter_sql(start_date, end_date, alias='s'):
+    sql = (f" {alias}.month BETWEEN ? AND ? "
+           f" AND {alias}.posted_date BETWEEN CAST(? AS DATE) AND CAST(? AS DATE) ")
+    return sql, [str(start_date)[:7], str(end_date)[:7], str(start_date), str(end_date)]
+
+
+# 추이 구간 시작일 (SQLite의 date(d, '-6 days', 'weekday 1')와 DuckDB의 'week' 모두 d 이전의 가장 가까운 월요일)
+TREND_PERIODS = {
+    '일': "{d}",
+    '주': "CAST(date_trunc('week', {d}) AS DATE)",
+    '월': "CAST(date_trunc('month', {d}) AS DATE)",
+}
+
+
+def read_dashboard_groups(conn, model, start_date, end_date, map_file_path=None):
+    """(날짜, 플랫폼, 구) 단위 집계. 구는 스냅숏을 만들 때 이미 보정되어 있으므로 map_file_path는 쓰지 않는다"""
+    date_sql, params = date_filter_sql(start_date, end_date)
+    model_sql, model_params = model_filter_sql(model, 's')
+    sql = f"""
+    SELECT strftime(s.posted_date, '%Y-%m-%d') AS posted_date, s.platform, s.sigungu,
+           CAST(COUNT(*) AS BIGINT) AS cnt,
+           CAST(SUM(s.price_krw) AS BIGINT) AS price_sum,
+           CAST(COUNT(s.price_krw) AS BIGINT) AS price_cnt
+    FROM posts AS s
+    WHERE {date_sql} {model_sql}
+    GROUP BY s.posted_date, s.platform, s.sigungu
+    ORDER BY s.posted_date, s.platform, s.sigungu
+    """
+    return tracer.read_duckdb(sql, conn, params=params + model_params)
+
+
+def read_price_distribution(conn, platform, model, start_date, end_date):
+    """가격 오름차순 (price, cnt, cum) DataFrame (daily_price_hist와 같은 가격 구간)"""
+    date_sql, params = date_filter_sql(start_date, end_date)
+    model_sql, model_params = model_filter_sql(model, 's')
+    platform_sql, platform_params = (" AND s.platform = ? ", [platform]) if platform != '전체' else ("", [])
+    sql = f"""
+    WITH merged AS (
+      SELECT s.price_bucket AS bucket, CAST(COUNT(*) AS BIGINT) AS cnt
+      FROM posts AS s
+      WHERE {date_sql} {platform_sql} {model_sql} AND s.price_krw IS NOT NULL
+      GROUP BY s.price_bucket
+    )
+    SELECT bucket, cnt, CAST(SUM(cnt) OVER (ORDER BY bucket) AS BIGINT) AS cum FROM merged ORDER BY bucket
+    """
+    df = tracer.read_duckdb(sql, conn, params=params + platform_params + model_params)
+    df['price'] = bucket_prices(df['bucket']).round(-3)
+    return df[['price', 'cnt', 'cum']]
+
+
+def read_dashboard_data(conn, platform, model, start_date, end_date, map_file_path=None):
+    groups = read_dashboard_groups(conn, model, start_date, end_date, map_file_path)
+    return summarize_groups(groups, platform, read_price_distribution(conn, platform, model, start_date, end_date))
+
+
+def read_price_trend(conn, platform, model, start_date, end_date, unit='자동', max_points=MAX_TREND_POINTS):
+    """(구간 시작일, 평균가, 이동 평균, 가격 건수) DataFrame과 실제 사용한 단위 반환"""
+    unit = trend_unit_for(start_date, end_date, unit)
+    window_days = TREND_UNITS[unit][1]
+    date_sql, params = date_filter_sql(start_date, end_date)
+    model_sql, model_params = model_filter_sql(model, 's')
+    platform_sql, platform_params = (" AND s.platform = ? ", [platform]) if platform != '전체' else ("", [])
+    sql = f"""
+    WITH buckets AS (
+      SELECT {TREND_PERIODS[unit].format(d='s.posted_date')} AS period,
+             SUM(s.price_krw) AS price_sum, COUNT(s.price_krw) AS price_cnt
+      FROM posts AS s
+      WHERE {date_sql} {platform_sql} {model_sql}
+      GROUP BY period
+    )
+    SELECT strftime(period, '%Y-%m-%d') AS period,
+           price_sum * 1.0 / price_cnt AS avg_price,
+           SUM(price_sum) OVER w * 1.0 / SUM(price_cnt) OVER w AS smoothed_price,
+           CAST(price_cnt AS BIGINT) AS price_cnt
+    FROM buckets
+    WHERE price_cnt > 0
+    WINDOW w AS (ORDER BY period RANGE BETWEEN INTERVAL {window_days} DAYS PRECEDING AND CURRENT ROW)
+    ORDER BY period
+    """
+    df = tracer.read_duckdb(sql, conn, params=params + platform_params + model_params)
+    if max_points and len(df) > max_points:
+        df = df.iloc[lttb_indices(df['avg_price'].to_numpy(), max_points)].reset_index(drop=True)
+    return df, unit
+
+
+def read_model_comparison(conn, models, platforms, start_date, end_date, unit='자동'):
+    """비교용 원자료 DataFrame(kind='trend' | 'platform')과 실제 사용한 추이 단위 반환"""
+    unit = trend_unit_for(start_date, end_date, unit)
+    window_days = TREND_UNITS[unit][1]
+    date_sql, params = date_filter_sql(start_date, end_date)
+    model_sql, model_params = models_filter_sql(models, 's')
+    platform_sql = f" AND s.platform IN ({','.join('?' * len(platforms))}) " if platforms else " AND false "
+    sql = f"""
+    WITH base AS (
+      SELECT s.model_family, s.variant, s.platform,
+             {TREND_PERIODS[unit].format(d='s.posted_date')} AS period,
+             COUNT(*) AS cnt, SUM(s.price_krw) AS price_sum, COUNT(s.price_krw) AS price_cnt
+      FROM posts AS s
+      WHERE {date_sql} {platform_sql} {model_sql}
+      GROUP BY s.model_family, s.variant, s.platform, period
+    ),
+    per_model AS (
+      SELECT model_family, variant, period,
+             SUM(cnt) AS cnt, SUM(price_sum) AS price_sum, SUM(price_cnt) AS price_cnt
+      FROM base
+      GROUP BY model_family, variant, period
+    )
+    SELECT 'trend' AS kind, model_family, variant, NULL AS platform, strftime(period, '%Y-%m-%d') AS period,
+           CAST(cnt AS BIGINT) AS cnt, CAST(price_sum AS BIGINT) AS price_sum, CAST(price_cnt AS BIGINT) AS price_cnt,
+           SUM(price_sum) OVER w * 1.0 / NULLIF(SUM(price_cnt) OVER w, 0) AS smoothed_price
+    FROM per_model
+    WINDOW w AS (PARTITION BY model_family, variant ORDER BY period
+                 RANGE BETWEEN INTERVAL {window_days} DAYS PRECEDING AND CURRENT ROW)
+    UNION ALL
+    SELECT 'platform', model_family, variant, platform, NULL,
+           CAST(SUM(cnt) AS BIGINT), CAST(SUM(price_sum) AS BIGINT), CAST(SUM(price_cnt) AS BIGINT), NULL
+    FROM base
+    GROUP BY model_family, variant, platform
+    ORDER BY kind, model_family, variant, platform, period
+    """
+    params = params + list(platforms) + model_params
+    return tracer.read_duckdb(sql, conn, params=params), unit
+
+
+def main():
+    parser = argparse.ArgumentParser(description="posts를 월별 Parquet 스냅숏으로 내보내기 (DuckDB 분석 백엔드용)")
+    parser.add_argument("--db", default=str(DB_FILE), help="원본 DB 파일 (기본: project2.db)")
+    parser.add_argument("--out", default=str(SNAPSHOT_DIR), help="스냅숏 폴더 (기본: snapshot/)")
+    args = parser.parse_args()
+
+    if not duckdb_available():
+        raise SystemExit("duckdb가 설치되어 있지 않습니다: pip install duckdb")
+    meta = export_snapshot(args.db, args.out)
+    print(f"✅ Parquet 스냅숏: {meta['rows']:,}건, {len(meta['partitions'])}개 월 파티션 ({meta['export_seconds']}초) → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
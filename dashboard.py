@@ -1,13 +1,21 @@
 import streamlit as st
-import sqlite3
 import datetime
 import pandas as pd
 import plotly.graph_objects as go
-from PIL import Image, ImageDraw, ImageFont 
-import io 
-from pathlib import Path 
-import unicodedata 
-import re 
+import os
+import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from listing_export import EXPORT_FORMATS, export_file_name, export_listings
+from query_trace import tracer
+from market_db import BASE_DIR, MAP_FILE_PATH, DB_FILE
+import columnar
+from dashboard_data import TREND_UNITS
+from dashboard_service import DashboardService, RESULT_CACHE_FILE
+from map_render import (
+    SEOUL_MAP_FILE, SEOUL_GU_COORDINATES, circle_style, seoul_gu_counts,
+    load_map_image, encode_map_image, draw_map_overlay,
+)
 
 # --- [1] 페이지 설정 (최상단 고정) ---
 st.set_page_config(page_title="중고 아이폰 분석", layout="wide")
@@ -40,6 +48,9 @@ st.markdown("""
     .card-blue { border-top: 5px solid #3498db; }
     .card-green { border-top: 5px solid #2ecc71; }
     .card-purple { border-top: 5px solid #9b59b6; }
+    .card-orange { border-top: 5px solid #e67e22; }
+    .card-teal { border-top: 5px solid #1abc9c; }
+    .card-gray { border-top: 5px solid #7f8c8d; }
 
     /* 텍스트 스타일 */
     .kpi-title {
@@ -65,454 +76,661 @@ st.markdown("""
 """, unsafe_allow_html=True)
 # --------------------
 
-# --- [2] 파일 경로 설정 ---
-BASE_DIR = Path(__file__).parent 
-MAP_FILE_PATH = BASE_DIR / "dong_gu_map.csv" 
-# ✅ 코드 파일과 같은 위치에서 찾도록 수정
-DB_FILE = BASE_DIR / "project2.db"
-
-# --- [3] 지도 좌표 설정 (사용자 지정 좌표 유지) ---
-SEOUL_GU_COORDINATES = {
-    '도봉구': (285, 60),  '노원구': (322, 80),  '강북구': (258, 88),
-    '은평구': (167, 106),  '성북구': (258, 140), '중랑구': (340, 147),
-    '서대문구': (178, 165), '종로구': (225, 160), '동대문구': (303, 160),
-    '마포구': (148, 187), '중구': (243, 190),   '성동구': (290, 202),
-    '광진구': (335, 210), '강동구': (395, 198),
-    '강서구': (55, 180),  '양천구': (90, 240),  '구로구': (75, 270),
-    '영등포구': (146, 230), '동작구': (190, 258), '용산구': (225, 230),
-    '금천구': (130, 300), '관악구': (190, 300), '서초구': (255, 283),
-    '강남구': (305, 265), '송파구': (360, 250)
+# --- [2] 지도 이미지 설정 (지도 파일/구 좌표는 map_render.py) ---
+# 지도 오버레이 출력 형식: 'PNG' | 'PNG8'(팔레트) | 'JPEG' | 'WEBP'
+MAP_IMAGE_FORMAT = 'JPEG'
+
+# --- [3] 필터 기본값 ---
+PLATFORM_OPTIONS = ['전체', '당근마켓', '중고나라', '번개장터']
+MAX_COMPARE_MODELS = 6
+DEFAULT_DATE_RANGE = (datetime.date(2025, 10, 3), datetime.date(2025, 11, 9))
+
+
+# --- 쿼리 계측 (DASHBOARD_DEBUG=1 이면 사이드바에 계측 패널 표시 + JSON Lines 기록) ---
+DEBUG_MODE = os.environ.get("DASHBOARD_DEBUG", "0") == "1"
+TRACE_LOG_FILE = os.environ.get("DASHBOARD_TRACE_LOG", str(BASE_DIR / ".cache" / "query_trace.jsonl"))
+
+tracer.configure(enabled=DEBUG_MODE, log_path=TRACE_LOG_FILE)
+
+# --- 동시 조회용 스레드 풀 (sqlite3는 쿼리 실행 중 GIL을 놓으므로 조회끼리 겹쳐 실행된다) ---
+FETCH_WORKERS = 4  # 연결 풀 크기와 같게
+
+@st.cache_resource
+def get_fetch_executor():
+    return ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="fetch")
+
+# --- 조회 계층 (연결 풀 + 분석 백엔드 + 결과 캐시, dashboard_service.py) ---
+# 결과 캐시는 디스크에 저장되고 DB 버전이 바뀌면 자동 무효화된다. api_server.py도 같은 캐시 파일을 쓴다.
+# DASHBOARD_BACKEND=parquet 이면 집계 조회를 Parquet 스냅숏 + DuckDB로 실행 (columnar.py)
+QUERY_BACKEND = os.environ.get("DASHBOARD_BACKEND", "sqlite")
+RESULT_CACHE_MAX_MB = int(os.environ.get("DASHBOARD_RESULT_CACHE_MB", "256"))
+
+@st.cache_resource
+def get_service():
+    return DashboardService(DB_FILE, RESULT_CACHE_FILE, cache_max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024,
+                            backend=QUERY_BACKEND, pool_size=FETCH_WORKERS, on_error=st.error)
+
+service = get_service()
+result_cache = service.cache
+data_version = service.data_version
+get_db_connection, release_db_connection = service.get_connection, service.release_connection
+
+fetch_model_options = service.fetch_model_options
+fetch_date_bounds = service.fetch_date_bounds
+fetch_dedup_available = service.fetch_dedup_available
+fetch_dashboard_data = service.fetch_dashboard_data
+fetch_price_trend = service.fetch_price_trend
+fetch_model_comparison = service.fetch_model_comparison
+fetch_unmapped_details = service.fetch_unmapped_details
+fetch_listing_page = service.fetch_listing_page
+
+# 중복 매물 제외(dedup)가 꺼져 있으면 캐시 워머와 같은 인자로 조회해 결과 캐시를 같이 쓴다
+def fetch_results(platform, model, start_date, end_date, dedup=False):
+    if dedup: return fetch_dashboard_data(platform, model, start_date, end_date, MAP_FILE_PATH, dedup=True)
+    return fetch_dashboard_data(platform, model, start_date, end_date, MAP_FILE_PATH)
+
+# --- 💡 [수정] 지도 이미지 함수 (그리기는 map_render.py, 색상 로직: 초록 -> 노랑 -> 빨강) ---
+# 디코딩한 기본 지도는 프로세스당 한 번만 읽는다 (그릴 때는 복사본 사용)
+@st.cache_resource
+def load_base_map():
+    return load_map_image(SEOUL_MAP_FILE)
+
+# 같은 구별 매물 수 조합이면 다시 그리지 않고 인코딩된 이미지를 재사용
+@st.cache_data(max_entries=256)
+def render_map_overlay(gu_counts, image_format=MAP_IMAGE_FORMAT):
+    tracer.mark_cache(False)  # 캐시에 없어서 실제로 그리는 경우에만 실행됨
+    base_map = load_base_map()
+    if base_map is None: return None
+    return draw_map_overlay(base_map, gu_counts, image_format)
+
+@tracer.trace(rows=lambda image: len(image) if image else None, cache_default='hit')
+def generate_map_overlay(region_df, image_format=MAP_IMAGE_FORMAT):
+    return render_map_overlay(seoul_gu_counts(region_df), image_format)
+
+# --- Plotly 지도 (기본 지도는 배경 이미지로 한 번만 인코딩, 원은 브라우저가 그림) ---
+@st.cache_resource
+def base_map_data_uri():
+    base_map = load_base_map()
+    if base_map is None: return None, (0, 0)
+    encoded = base64.b64encode(encode_map_image(base_map, 'JPEG')).decode('ascii')
+    return f"data:image/jpeg;base64,{encoded}", base_map.size
+
+def build_map_figure(region_df):
+    source, (width, height) = base_map_data_uri()
+    if source is None: return None
+    gu_counts = seoul_gu_counts(region_df)[::-1]
+    styles = [circle_style(count) for _, count in gu_counts]
+    fig = go.Figure(go.Scatter(
+        x=[SEOUL_GU_COORDINATES[gu][0] for gu, _ in gu_counts],
+        y=[SEOUL_GU_COORDINATES[gu][1] for gu, _ in gu_counts],
+        mode='markers+text',
+        text=[str(count) if radius > 8 else "" for (_, count), (radius, _) in zip(gu_counts, styles)],
+        textfont=dict(color=[f"rgb{color[:3]}" for _, color in styles]),
+        customdata=[gu for gu, _ in gu_counts],
+        marker=dict(
+            size=[radius * 2 for radius, _ in styles], sizemode='diameter',
+            color='rgba(0,0,0,0)',
+            line=dict(color=[f"rgb{color[:3]}" for _, color in styles], width=3),
+        ),
+        hovertemplate="<b>%{customdata}</b><br>매물 수: %{text}건<extra></extra>",
+    ))
+    fig.update_layout(
+        images=[dict(source=source, xref='x', yref='y', x=0, y=0, sizex=width, sizey=height,
+                     sizing='stretch', layer='below')],
+        xaxis=dict(range=[0, width], visible=False, fixedrange=True),
+        yaxis=dict(range=[height, 0], visible=False, fixedrange=True, scaleanchor='x'),
+        margin=dict(l=0, r=0, t=0, b=0), height=height, showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig
+
+# --- Plotly 한글 설정 ---
+plotly_config = {
+    'displaylogo': False,
+    'modeBarButtonsToRemove': ['select2d', 'lasso2d'],
+    'locale': 'ko', 
+    'toImageButtonOptions': {'format': 'png', 'filename': 'custom_image', 'height': 500, 'width': 700, 'scale': 1},
 }
 
+# '더 보기' 콜백: 다시 그리기 전에 다음 페이지를 붙여 둔다
+def load_next_listing_page(platform, model, start_date, end_date, after):
+    next_page, has_more = fetch_listing_page(platform, model, start_date, end_date, after=after)
+    st.session_state['listing_pages'].append(next_page)
+    st.session_state['listing_has_more'] = has_more
 
-# --- DB 연결 ---
-def get_db_connection():
-    try:
-        conn = sqlite3.connect(f"file:{DB_FILE}?mode=ro", uri=True) 
-        return conn
-    except Exception as e:
-        st.error(f"DB 연결 오류: {e}")
-        return None
-
-# --- 정규화 함수 ---
-def normalize_key(text):
-    if pd.isna(text) or text == "": return None
-    text = str(text)
-    text = unicodedata.normalize('NFC', text)
-    text = re.sub(r'[^가-힣a-zA-Z0-9]', '', text)
-    return text
-
-# --- 쿼리 생성 헬퍼 ---
-def build_dynamic_query_parts(platform, model, start_date, end_date):
-    params = []
-    where_clause = " WHERE p.posted_date BETWEEN ? AND ? "
-    params.extend([str(start_date), str(end_date)])
-
-    if platform != '전체':
-        where_clause += " AND pf.name = ? "
-        params.append(platform)
-
-    if model == 'iPhone 16 Pro':
-        where_clause += " AND (pr.model LIKE ? OR pr.model LIKE ?) "
-        params.extend(['%iPhone 16 Pro%', '%아이폰 16 프로%'])
-    elif model == 'iPhone 16':
-        where_clause += " AND (pr.model LIKE ? OR pr.model LIKE ?) "
-        params.extend(['%iPhone 16%', '%아이폰 16%'])
-        where_clause += " AND pr.model NOT LIKE '%Pro%' AND pr.model NOT LIKE '%프로%' "
-    elif model == 'iPhone 15 Pro':
-        where_clause += " AND (pr.model LIKE ? OR pr.model LIKE ?) "
-        params.extend(['%iPhone 15 Pro%', '%아이폰 15 프로%'])
-    elif model == 'iPhone 15': 
-        where_clause += " AND (pr.model LIKE ? OR pr.model LIKE ?) "
-        params.extend(['%iPhone 15%', '%아이폰 15%'])
-        where_clause += " AND pr.model NOT LIKE '%Pro%' AND pr.model NOT LIKE '%프로%' "
-    elif model == 'iPhone 14 Pro':
-        where_clause += " AND (pr.model LIKE ? OR pr.model LIKE ?) "
-        params.extend(['%iPhone 14 Pro%', '%아이폰 14 프로%'])
-    elif model == 'iPhone 14': 
-        where_clause += " AND (pr.model LIKE ? OR pr.model LIKE ?) "
-        params.extend(['%iPhone 14%', '%아이폰 14%'])
-        where_clause += " AND pr.model NOT LIKE '%Pro%' AND pr.model NOT LIKE '%프로%' "
-    return where_clause, params
-
-# --- KPI 함수 ---
-@st.cache_data
-def fetch_kpi_and_ids(platform, model, start_date, end_date):
-    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
-    sql = f"""
-    SELECT COUNT(p.post_id), AVG(p.price_krw), GROUP_CONCAT(p.post_id, ', ')
-    FROM posts AS p
-    JOIN platforms AS pf ON p.platform_id = pf.platform_id
-    JOIN products AS pr ON p.product_id = pr.product_id
-    {where_clause}
-    """
+# 내보내기: 다운로드 버튼을 누를 때 (별도 스레드에서) 필터된 매물 전체를 청크 단위로 파일에 쓴다
+def export_listing_file(platform, model, start_date, end_date, fmt):
     conn = get_db_connection()
-    if conn is None: return 0, 0, []
-    try:
-        cursor = conn.cursor()
-        cursor.execute(sql, params)
-        result = cursor.fetchone()
-        if result: return (result[0] or 0, result[1] or 0, [])
-    except Exception: pass
-    finally: conn.close()
-    return 0, 0, []
-
-# --- 매핑 사전 로드 ---
-def load_mapping_dict(map_file_path):
-    mapping_dict = {}
-    if not map_file_path.exists(): return mapping_dict
+    if conn is None: return b""
     try:
-        try: map_df = pd.read_csv(map_file_path, encoding='utf-8-sig')
-        except: map_df = pd.read_csv(map_file_path, encoding='cp949')
+        with export_listings(conn, platform, model, start_date, end_date, fmt) as f: return f.read()
+    finally: release_db_connection(conn)
+
+# --- 매물 목록 (프래그먼트: '더 보기'를 눌러도 이 영역만 다시 그림) ---
+@st.fragment
+def listing_drilldown(platform, model, start_date, end_date):
+    st.subheader("📋 매물 목록")
+    with st.container(border=True):
+        format_col, export_col = st.columns([2, 1])
+        with format_col:
+            export_format = st.radio("내보내기 형식", options=list(EXPORT_FORMATS), horizontal=True, key="export_format")
+        with export_col:
+            st.download_button(
+                "⬇️ 조건에 맞는 매물 전체 내보내기",
+                data=lambda: export_listing_file(platform, model, start_date, end_date, export_format),
+                file_name=export_file_name(platform, model, start_date, end_date, export_format),
+                mime=EXPORT_FORMATS[export_format][1],
+                on_click="ignore",
+                use_container_width=True,
+            )
+        if not st.toggle("매물 목록 불러오기", key="show_listings"):
+            st.caption("토글을 켜면 조건에 맞는 매물을 최신순으로 50건씩 불러옵니다.")
+            return
+
+        filter_key = (platform, model, str(start_date), str(end_date))
+        if st.session_state.get('listing_filter') != filter_key:
+            first_page, has_more = fetch_listing_page(platform, model, start_date, end_date)
+            st.session_state['listing_filter'] = filter_key
+            st.session_state['listing_pages'] = [first_page]
+            st.session_state['listing_has_more'] = has_more
+
+        listings = pd.concat(st.session_state['listing_pages'], ignore_index=True)
+        if listings.empty:
+            st.info("데이터 없음")
+            return
+
+        st.dataframe(
+            listings.drop(columns=['post_id']),
+            column_config={
+                "posted_date": st.column_config.TextColumn("작성일"),
+                "platform": st.column_config.TextColumn("플랫폼"),
+                "title": st.column_config.TextColumn("제목", width="large"),
+                "price_krw": st.column_config.NumberColumn("가격", format="%d원"),
+                "region": st.column_config.TextColumn("지역"),
+                "url": st.column_config.LinkColumn("링크", display_text="열기"),
+            },
+            hide_index=True,
+            use_container_width=True,
+            height=400
+        )
+        st.caption(f"{len(listings):,}건 표시 중")
+
+        if st.session_state['listing_has_more']:
+            last = listings.iloc[-1]
+            st.button("더 보기", on_click=load_next_listing_page,
+                      args=(platform, model, start_date, end_date, (last['posted_date'], int(last['post_id']))))
+
+# --- 미리 조회 (전체 실행에서 조회를 한꺼번에 시작해 두고, 각 프래그먼트가 자기 결과를 기다려 받는다) ---
+# 프래그먼트만 다시 실행될 때는 미리 시작한 조회가 없으므로 바로 조회한다 (결과 캐시 적중).
+# 작업 스레드에서 st.error를 부르면 버려지므로, 연결 오류는 결과와 함께 받아 스크립트 스레드에서 표시한다.
+def run_collecting_errors(fn, *args):
+    with service.collect_errors() as errors:
+        return fn(*args), errors
+
+def prefetch(key, fn, *args):
+    st.session_state['prefetch'][key] = get_fetch_executor().submit(run_collecting_errors, fn, *args)
+
+def prefetched(key, fn, *args):
+    future = st.session_state.get('prefetch', {}).pop(key, None)
+    if future is None: return fn(*args)
+    value, errors = future.result()
+    for message in errors: st.error(message)
+    return value
+
+# --- 화면 구역 (프래그먼트: 적용된 필터를 인자로 받아 각자 조회하고 그린다) ---
+# 차트 안의 옵션(추이 단위, 인터랙티브 지도, 미기재 상세 펼치기)을 바꾸면 해당 구역만 다시 실행된다.
+# 통합 집계(fetch_dashboard_data)는 한 번 조회한 결과를 KPI/지도/파이/분포가 결과 캐시에서 나눠 쓴다.
+PLATFORM_COLORS = {'중고나라': '#77DD77', '번개장터': '#FF6961', '당근마켓': '#FFB347'}
+
+def kpi_card(column, color, title, value, caption):
+    with column:
+        st.markdown(f"""
+        <div class="kpi-card card-{color}">
+            <div class="kpi-title">{title}</div>
+            <div class="kpi-value">{value}</div>
+            <div class="kpi-caption">{caption}</div>
+        </div>
+        """, unsafe_allow_html=True)
+
+# 💡 디자인 변경: KPI 영역에 border를 두지 않아 카드 그림자가 더 잘 보이게 함
+@st.fragment
+def kpi_cards(platform, model, start_date, end_date, dedup=False):
+    results = fetch_results(platform, model, start_date, end_date, dedup)
+    region_df, price_stats = results['region_df'], results['price_stats']
+
+    # 최다 거래 지역 계산
+    valid_regions = region_df[region_df['sigungu'] != '지역 미기재']
+    most_frequent_region = valid_regions.iloc[0]['sigungu'] if not valid_regions.empty else "-"
+    most_frequent_count = valid_regions.iloc[0]['count'] if not valid_regions.empty else 0
+    region_caption = f"총 {most_frequent_count}건" if most_frequent_region != "-" else "-"
+
+    _, kpi1, kpi2, kpi3, _ = st.columns([0.5, 2, 2, 2, 0.5])
+    kpi_card(kpi1, "blue", "📦 총 매물 수", f"{results['total_count']:,.0f} 건",
+             "플랫폼 간 중복 매물 제외" if dedup else "선택 기간 내 전체 매물")
+    kpi_card(kpi2, "green", "💰 평균 가격", f"{results['avg_price']:,.0f} 원",
+             "중복 제외 매물의 평균값" if dedup else "기간 내 전체 매물의 평균값")
+    kpi_card(kpi3, "purple", "🗺️ 최다 거래 지역", most_frequent_region, region_caption)
+
+    # --- 가격 분포 KPI (평균은 미끼/액세서리 매물에 끌려가므로 중앙값과 분위수를 함께 표시) ---
+    _, kpi4, kpi5, kpi6, _ = st.columns([0.5, 2, 2, 2, 0.5])
+    kpi_card(kpi4, "orange", "📍 중앙값", f"{price_stats['median']:,.0f} 원", f"가격이 있는 매물 {price_stats['count']:,}건 기준")
+    kpi_card(kpi5, "teal", "↔️ 가격 범위 (p10~p90)",
+             f"{price_stats['p10'] / 10000:,.0f}~{price_stats['p90'] / 10000:,.0f} 만원", "하위/상위 10% 매물 제외")
+    kpi_card(kpi6, "gray", "📐 IQR (p25~p75)", f"{price_stats['iqr']:,.0f} 원",
+             f"{price_stats['p25']:,.0f} ~ {price_stats['p75']:,.0f} 원")
+    st.write("") # 여백 추가
+
+@st.fragment
+def platform_pie(platform, model, start_date, end_date, dedup=False):
+    platform_df = fetch_results(platform, model, start_date, end_date, dedup)['platform_df']
+    st.subheader("📊 플랫폼별 현황")
+    with st.container(border=True): 
+        if platform_df.empty:
+            st.info("데이터 없음")
+            return
+        platform_colors = [PLATFORM_COLORS.get(name, '#D3D3D3') for name in platform_df['name']]
         
-        map_df.columns = map_df.columns.str.strip()
-        for _, row in map_df.iterrows():
-            key = normalize_key(row['dong'])
-            if key: mapping_dict[key] = str(row['sigungu']).strip()
-    except: pass
-    return mapping_dict
-
-# --- 지역별 데이터 함수 ---
-@st.cache_data
-def fetch_regional_data(platform, model, start_date, end_date, map_file_path):
-    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
-    sql = f"""
-    SELECT p.post_id, r.sigungu, r.dong 
-    FROM posts AS p
-    JOIN platforms AS pf ON p.platform_id = pf.platform_id
-    JOIN products AS pr ON p.product_id = pr.product_id
-    JOIN regions AS r ON p.region_id = r.region_id
-    {where_clause}
-    """
-    conn = get_db_connection()
-    if conn is None: return pd.DataFrame(columns=['sigungu', 'count'])
-    try: df = pd.read_sql_query(sql, conn, params=params)
-    except: return pd.DataFrame(columns=['sigungu', 'count'])
-    finally: conn.close()
-    if df.empty: return pd.DataFrame(columns=['sigungu', 'count'])
-
-    mapping_dict = load_mapping_dict(map_file_path)
-
-    def fill_missing_gu(row):
-        if row['sigungu'] and str(row['sigungu']).strip() not in ['None', 'nan', '']:
-            return row['sigungu']
-        clean_dong = normalize_key(row['dong'])
-        if not clean_dong: return "지역 미기재"
-        return mapping_dict.get(clean_dong, "지역 미기재")
-
-    df['final_gu'] = df.apply(fill_missing_gu, axis=1)
-    
-    result_df = df.groupby('final_gu').size().reset_index(name='count')
-    result_df = result_df.rename(columns={'final_gu': 'sigungu'})
-    result_df = result_df.sort_values('count', ascending=False)
-    return result_df
-
-# --- 매핑 실패(미기재) 상세 목록 함수 ---
-@st.cache_data
-def fetch_unmapped_details(platform, model, start_date, end_date, map_file_path):
-    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
-    sql = f"""
-    SELECT r.dong 
-    FROM posts AS p
-    JOIN platforms AS pf ON p.platform_id = pf.platform_id
-    JOIN products AS pr ON p.product_id = pr.product_id
-    JOIN regions AS r ON p.region_id = r.region_id
-    {where_clause}
-    AND (r.sigungu IS NULL OR r.sigungu = '')
-    """
-    conn = get_db_connection()
-    if conn is None: return pd.DataFrame()
-    df = pd.read_sql_query(sql, conn, params=params)
-    conn.close()
-    
-    if df.empty:
-        return pd.DataFrame(columns=['동 이름(원본)', '매물 수'])
-
-    mapping_dict = load_mapping_dict(map_file_path)
-    
-    df['dong'] = df['dong'].fillna("(지역 정보 없음)")
-    df.loc[df['dong'].astype(str).str.strip() == '', 'dong'] = "(지역 정보 없음)"
-    
-    def is_unmapped(row):
-        if row['dong'] == "(지역 정보 없음)": return True
-        clean_dong = normalize_key(row['dong'])
-        if not clean_dong: return True 
-        return clean_dong not in mapping_dict 
-
-    unmapped = df[df.apply(is_unmapped, axis=1)]
-    
-    if unmapped.empty:
-        return pd.DataFrame(columns=['동 이름(원본)', '매물 수'])
-
-    result = unmapped['dong'].value_counts().reset_index()
-    result.columns = ['동 이름(원본)', '매물 수']
-    return result
-
-# --- 플랫폼 데이터 함수 ---
-@st.cache_data
-def fetch_platform_data(model, start_date, end_date):
-    where_clause, params = build_dynamic_query_parts('전체', model, start_date, end_date)
-    sql = f"""
-    SELECT pf.name, COUNT(p.post_id) as count
-    FROM posts AS p
-    JOIN platforms AS pf ON p.platform_id = pf.platform_id
-    JOIN products AS pr ON p.product_id = pr.product_id
-    {where_clause}
-    GROUP BY pf.name ORDER BY count DESC
-    """
-    conn = get_db_connection()
-    if conn is None: return pd.DataFrame(columns=['name', 'count'])
-    try: return pd.read_sql_query(sql, conn, params=params)
-    finally: conn.close()
-
-# --- 가격 추이 함수 ---
-@st.cache_data
-def fetch_price_trend_data(platform, model, start_date, end_date):
-    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
-    sql = f"""
-    SELECT p.posted_date, AVG(p.price_krw) as avg_price
-    FROM posts AS p
-    JOIN platforms AS pf ON p.platform_id = pf.platform_id
-    JOIN products AS pr ON p.product_id = pr.product_id
-    {where_clause}
-    GROUP BY p.posted_date ORDER BY p.posted_date ASC
-    """
-    conn = get_db_connection()
-    if conn is None: return pd.DataFrame(columns=['posted_date', 'avg_price'])
-    try: return pd.read_sql_query(sql, conn, params=params)
-    finally: conn.close()
-
-# --- 💡 [수정] 지도 이미지 함수 (색상 로직: 초록 -> 노랑 -> 빨강) ---
-def generate_map_overlay(region_df):
-    try:
-        base_image = Image.open("서울지도보기.jpg").convert("RGBA")
-        draw = ImageDraw.Draw(base_image)
-    except FileNotFoundError: return None 
-    
-    valid_df = region_df[region_df['sigungu'].isin(SEOUL_GU_COORDINATES.keys())]
-    if valid_df.empty: return base_image 
-    
-    REF_MAX_COUNT = 40.0 
-    
-    for _, row in valid_df.iloc[::-1].iterrows():
-        gu_name = row['sigungu']
-        count = row['count']
+        pull_values = [0.0] * len(platform_df)
+        line_widths = [0] * len(platform_df)
+        line_colors = ['#FFFFFF'] * len(platform_df)
         
-        coords = SEOUL_GU_COORDINATES.get(gu_name)
-        if coords: 
-            x, y = coords
-            
-            # 비율
-            ratio = min(count / REF_MAX_COUNT, 1.0)
-            
-            # 크기: 5px ~ 25px
-            radius = 5 + (ratio * 20)
-            
-            # 💡 색상: 초록(적음) -> 노랑(중간) -> 빨강(많음)
-            if count <= 5:
-                outline_color = (0, 200, 0, 255) # 진한 초록
-            elif count <= 15:
-                outline_color = (255, 215, 0, 255) # 진한 노랑(Gold)
-            else:
-                outline_color = (255, 0, 0, 255) # 빨강
-            
-            # 원 그리기 (내부 비움)
-            draw.ellipse(
-                (x - radius, y - radius, x + radius, y + radius), 
-                fill=None, 
-                outline=outline_color, 
-                width=3 
+        if platform != '전체':
+            try:
+                idx = platform_df[platform_df['name'] == platform].index[0]
+                pull_values[idx] = 0.1
+                line_widths[idx] = 2
+                line_colors[idx] = '#000000'
+            except: pass 
+
+        fig = go.Figure(data=[go.Pie(
+            labels=platform_df['name'], 
+            values=platform_df['count'], 
+            hole=.4, 
+            pull=pull_values, 
+            textinfo='label+percent',
+            texttemplate="%{label}<br>%{percent:.1%}",
+            textposition='inside',
+            hovertemplate="<b>%{label}</b><br>매물 수: %{value}건<br>비율: %{percent}<extra></extra>",
+            marker=dict(colors=platform_colors, line=dict(color=line_colors, width=line_widths))
+        )])
+        fig.update_layout(
+            margin=dict(l=0, r=0, t=0, b=0), 
+            legend=dict(orientation="h", yanchor="bottom", y=-0.1, xanchor="center", x=0.5),
+            annotations=[dict(text='플랫폼', x=0.5, y=0.5, font_size=16, showarrow=False)]
+        )
+        st.plotly_chart(fig, use_container_width=True, config=plotly_config)
+
+# 가격 추이/가격 분포는 중복 매물 제외와 상관없이 전체 매물로 그린다 (켜져 있으면 제목에 표시)
+ALL_POSTS_LABEL = " (전체 매물 기준)"
+
+# 가격 추이 (단위 선택은 이 구역 안에서만 다시 조회)
+@st.fragment
+def price_trend(platform, model, start_date, end_date, dedup=False):
+    trend_unit = st.session_state.get('trend_unit', '자동')
+    price_trend_df, used_unit = prefetched(
+        ('trend', platform, model, start_date, end_date, trend_unit),
+        fetch_price_trend, platform, model, start_date, end_date, trend_unit,
+    )
+    st.subheader(f"📈 {used_unit}별 평균 가격 변동{ALL_POSTS_LABEL if dedup else ''}")
+    with st.container(border=True):
+        st.radio("**가격 추이 단위**", options=['자동', *TREND_UNITS], horizontal=True, key="trend_unit",
+                 help="자동: 기간이 3개월 이하면 일, 2년 이하면 주, 그보다 길면 월 단위")
+        if price_trend_df.empty:
+            st.info("데이터 없음")
+            return
+        fig_line = go.Figure(data=[
+            go.Scatter(
+                x=price_trend_df['period'], 
+                y=price_trend_df['avg_price'], 
+                mode='lines+markers',
+                name='평균가',
+                line=dict(color='rgba(52, 152, 219, 0.45)', width=1),
+                hovertemplate="평균가: %{y:,.0f}원<extra></extra>"
+            ),
+            go.Scatter(
+                x=price_trend_df['period'],
+                y=price_trend_df['smoothed_price'],
+                mode='lines',
+                name='이동 평균',
+                line=dict(color='#2c3e50', width=3),
+                hovertemplate="이동 평균: %{y:,.0f}원<extra></extra>"
+            ),
+        ])
+        fig_line.update_layout(
+            margin=dict(l=0, r=0, t=20, b=0), 
+            height=300, 
+            hovermode="x unified",
+            legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1),
+            xaxis=dict(tickformat="%Y-%m" if used_unit == '월' else "%Y-%m-%d", hoverformat=TREND_UNITS[used_unit][2])
+        )
+        st.plotly_chart(fig_line, use_container_width=True, config=plotly_config)
+
+@st.fragment
+def price_distribution(platform, model, start_date, end_date, dedup=False):
+    results = fetch_dashboard_data(platform, model, start_date, end_date, MAP_FILE_PATH)
+    price_stats, price_hist_df = results['price_stats'], results['price_hist_df']
+    st.subheader(f"💹 가격 분포{ALL_POSTS_LABEL if dedup else ''}")
+    with st.container(border=True):
+        if price_hist_df.empty:
+            st.info("데이터 없음")
+            return
+        fig_hist = go.Figure(data=go.Bar(
+            x=(price_hist_df['bin_start'] + price_hist_df['bin_end']) / 2,
+            y=price_hist_df['count'],
+            width=price_hist_df['bin_end'] - price_hist_df['bin_start'],
+            customdata=price_hist_df[['bin_start', 'bin_end']],
+            marker_color='#e67e22',
+            hovertemplate="%{customdata[0]:,.0f} ~ %{customdata[1]:,.0f}원<br>매물 수: %{y}건<extra></extra>"
+        ))
+        fig_hist.add_vline(x=price_stats['median'], line_dash="dash", line_color="#2c3e50",
+                           annotation_text="중앙값", annotation_position="top")
+        fig_hist.update_layout(
+            margin=dict(l=0, r=0, t=20, b=0),
+            height=300,
+            bargap=0.05,
+            xaxis=dict(tickformat=",.0f", title="가격(원)"),
+            yaxis=dict(title="매물 수")
+        )
+        st.plotly_chart(fig_hist, use_container_width=True, config=plotly_config)
+        if price_stats['outliers']:
+            st.caption(f"p1~p99 밖의 매물 {price_stats['outliers']:,}건은 그래프에서 제외했습니다.")
+
+# 지역별 분포 (지도 방식 전환은 이 구역만 다시 그림)
+@st.fragment
+def region_map(platform, model, start_date, end_date, dedup=False):
+    results = fetch_results(platform, model, start_date, end_date, dedup)
+    region_df, total_count = results['region_df'], results['total_count']
+    title_col, toggle_col = st.columns([3, 1])
+    with title_col: st.subheader("📍 지역별 매물 분포 (전체)")
+    with toggle_col:
+        interactive_map = st.toggle("인터랙티브 지도", key="interactive_map",
+                                    help="지도를 서버에서 이미지로 그리지 않고 브라우저(Plotly)에서 그립니다.")
+    if interactive_map: map_image, map_figure = None, build_map_figure(region_df)
+    else: map_image, map_figure = prefetched(('map', model, start_date, end_date, dedup), generate_map_overlay, region_df), None
+    with st.container(border=True):
+        if not (map_image or map_figure):
+            st.error("서울지도보기.jpg 없음")
+            return
+        # 지도 이미지는 가운데 정렬 효과를 위해 컬럼 사용
+        c1, c2, c3 = st.columns([1, 8, 1])
+        with c2:
+            if map_figure: st.plotly_chart(map_figure, use_container_width=True, config=plotly_config)
+            else: st.image(map_image, use_container_width=True)
+        if region_df.empty: return
+
+        display_df = region_df[region_df['sigungu'] != '지역 미기재'].copy()
+        
+        displayed_count = display_df['count'].sum()
+        if displayed_count < total_count:
+            null_count = total_count - displayed_count
+            null_row = pd.DataFrame({'sigungu': ['NULL 값 존재'], 'count': [null_count]})
+            display_df = pd.concat([display_df, null_row], ignore_index=True)
+
+        # 💡 [수정] 데이터프레임 출력 방식 개선 (꽉 차게)
+        st.dataframe(
+            display_df.rename(columns={"sigungu": "구"}).set_index('구'), 
+            column_config={
+                "구": st.column_config.TextColumn("구", width="medium"),
+                "count": st.column_config.NumberColumn("매물 수", format="%d건")
+            }, 
+            use_container_width=True,
+            height=300
+        )
+        
+        unknown_count = region_df[region_df['sigungu'] == '지역 미기재']['count'].sum()
+        if unknown_count > 0:
+            st.divider()
+            st.warning(f"⚠️ **지역 미기재 데이터: 총 {unknown_count}건**")
+            unmapped_details(platform, model, start_date, end_date)
+
+# 미기재 상세: 펼칠 때만 조회하고, 펼치고 접어도 이 구역만 다시 실행
+@st.fragment
+def unmapped_details(platform, model, start_date, end_date):
+    with st.expander("🔻 미기재 상세 내역 보기 (동 이름)", key="unmapped_open", on_change="rerun") as expander:
+        if not expander.open: return
+        unmapped_details_df = prefetched(
+            ('unmapped', platform, model, start_date, end_date),
+            fetch_unmapped_details, platform, model, start_date, end_date, MAP_FILE_PATH,
+        )
+        if not unmapped_details_df.empty:
+            st.markdown("##### 🚨 잘못 입력한 '동' 목록")
+            st.dataframe(
+                unmapped_details_df.set_index("동 이름(원본)"), 
+                use_container_width=True
             )
-            
-            # 숫자 표시
-            if radius > 8:
-                try:
-                    font = ImageFont.load_default() 
-                    text = str(count)
-                    text_w = len(text) * 6 
-                    text_h = 10
-                    # 글자도 테두리 색과 동일하게
-                    draw.text((x - text_w/2, y - text_h/2), text, fill=outline_color, font=font, stroke_width=0)
-                except: pass
-
-    img_buffer = io.BytesIO()
-    base_image.save(img_buffer, format='PNG')
-    img_buffer.seek(0)
-    return img_buffer
 
-# --- Plotly 한글 설정 ---
-plotly_config = {
-    'displaylogo': False,
-    'modeBarButtonsToRemove': ['select2d', 'lasso2d'],
-    'locale': 'ko', 
-    'toImageButtonOptions': {'format': 'png', 'filename': 'custom_image', 'height': 500, 'width': 700, 'scale': 1},
-}
+# --- 🔀 기종 비교 (기종별 KPI 표 + 가격 추이/매물 수 겹쳐 그리기) ---
+# 세 구역이 GROUP BY 한 번의 결과를 같이 쓰므로 하나의 프래그먼트로 둔다.
+@st.fragment
+def model_comparison(models, platforms, start_date, end_date):
+    if not models or not platforms:
+        st.info("비교할 기종과 플랫폼을 하나 이상 선택하세요.")
+        return
+    trend_unit = st.session_state.get('compare_trend_unit', '자동')
+    comparison, used_unit = fetch_model_comparison(models, platforms, start_date, end_date, trend_unit)
+    summary_df, trend_df = comparison['summary_df'], comparison['trend_df']
+    compare_platform_df = comparison['platform_df']
+
+    st.subheader("🔀 기종별 요약")
+    if summary_df.empty: st.info("데이터 없음")
+    else:
+        st.dataframe(
+            summary_df, hide_index=True, use_container_width=True,
+            column_config={
+                "model": st.column_config.TextColumn("기종"),
+                "count": st.column_config.NumberColumn("매물 수", format="%d건"),
+                "avg_price": st.column_config.NumberColumn("평균 가격", format="%d원"),
+            },
+        )
+
+    chart_col1, chart_col2 = st.columns(2)
+    with chart_col1:
+        st.subheader(f"📈 기종별 {used_unit}별 평균 가격")
+        with st.container(border=True):
+            st.radio("**가격 추이 단위**", options=['자동', *TREND_UNITS], horizontal=True, key="compare_trend_unit",
+                     help="자동: 기간이 3개월 이하면 일, 2년 이하면 주, 그보다 길면 월 단위")
+            if not trend_df.empty:
+                fig_compare = go.Figure()
+                for name, series in trend_df.groupby('model', sort=False):
+                    fig_compare.add_trace(go.Scatter(
+                        x=series['period'], y=series['smoothed_price'], mode='lines', name=name,
+                        customdata=series['avg_price'],
+                        hovertemplate=f"{name}<br>이동 평균: %{{y:,.0f}}원<br>평균가: %{{customdata:,.0f}}원<extra></extra>",
+                    ))
+                fig_compare.update_layout(
+                    margin=dict(l=0, r=0, t=20, b=0),
+                    height=350,
+                    legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1),
+                    xaxis=dict(tickformat="%Y-%m" if used_unit == '월' else "%Y-%m-%d", hoverformat=TREND_UNITS[used_unit][2])
+                )
+                st.plotly_chart(fig_compare, use_container_width=True, config=plotly_config)
+            else: st.info("데이터 없음")
+    with chart_col2:
+        st.subheader("📊 기종 × 플랫폼 매물 수")
+        with st.container(border=True):
+            if not compare_platform_df.empty:
+                fig_bar = go.Figure([
+                    go.Bar(
+                        x=rows['model'], y=rows['count'], name=name,
+                        marker_color=PLATFORM_COLORS.get(name, '#D3D3D3'),
+                        hovertemplate=f"{name}<br>%{{x}}: %{{y:,}}건<extra></extra>",
+                    )
+                    for name, rows in compare_platform_df.groupby('platform')
+                ])
+                fig_bar.update_layout(
+                    barmode='group',
+                    margin=dict(l=0, r=0, t=20, b=0),
+                    height=350,
+                    legend=dict(orientation="h", yanchor="bottom", y=1.0, xanchor="right", x=1),
+                    xaxis=dict(categoryorder='array', categoryarray=comparison['models'])
+                )
+                st.plotly_chart(fig_bar, use_container_width=True, config=plotly_config)
+            else: st.info("데이터 없음")
+
+# --- 캐시 워머 (앱 시작 시/데이터 적재 후 자주 보는 조합을 미리 계산) ---
+# 플랫폼 × 기종 × 기간 조합마다 통합 집계와 지도 이미지를 미리 캐시에 올려 둔다.
+# DASHBOARD_CACHE_WARMER=0 으로 끌 수 있다.
+CACHE_WARMER_ENABLED = os.environ.get("DASHBOARD_CACHE_WARMER", "1") != "0"
+WARMER_WORKERS = 2          # 동시에 실행할 조합 수 (연결 풀 크기 이하)
+WARM_RECENT_DAYS = (7, 30)  # 기본 기간 외에 '최근 N일' 기간도 미리 계산
+
+def warm_date_windows():
+    windows = [DEFAULT_DATE_RANGE]
+    _, max_date = fetch_date_bounds()
+    if max_date:
+        end = datetime.date.fromisoformat(max_date)
+        windows += [(end - datetime.timedelta(days=days - 1), end) for days in WARM_RECENT_DAYS]
+    return list(dict.fromkeys(windows))
+
+def warm_one(platform, model, start_date, end_date):
+    # 백그라운드 워머의 연결 오류는 화면에 띄우지 않는다 (실패한 조회는 캐시되지 않아 화면에서 다시 조회)
+    with service.collect_errors():
+        results = fetch_dashboard_data(platform, model, start_date, end_date, MAP_FILE_PATH)
+        generate_map_overlay(results['region_df'])
+        fetch_price_trend(platform, model, start_date, end_date)
+
+class CacheWarmer:
+    def __init__(self, jobs, workers=WARMER_WORKERS):
+        self.total = len(jobs)
+        self.done = 0
+        self.failed = 0
+        self.finished = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, args=(jobs, workers), daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self, jobs, workers):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(warm_one, *job) for job in jobs]
+            for future in as_completed(futures):
+                with self._lock:
+                    self.done += 1
+                    if future.exception() is not None: self.failed += 1
+        self.finished = True
+
+# DB 버전이 바뀌면(새 적재) 새 워머를 띄운다. 이전 버전 결과는 결과 캐시가 버전 키로 무효화한다.
+@st.cache_resource
+def start_cache_warmer(version):
+    jobs = [
+        (platform, model, start_date, end_date)
+        for start_date, end_date in warm_date_windows()
+        for model in fetch_model_options()
+        for platform in PLATFORM_OPTIONS
+    ]
+    return CacheWarmer(jobs).start()
 
 # --- UI 메인 ---
 st.title('📱 중고 아이폰 시장 분석 대시보드')
 st.caption("플랫폼, 기종, 지역별 데이터를 기반으로 시장 동향을 분석합니다.")
 
+if CACHE_WARMER_ENABLED:
+    warmer = start_cache_warmer(data_version())
+    with st.sidebar:
+        if warmer.finished:
+            st.caption(f"⚡ 캐시 준비 완료 ({warmer.total - warmer.failed}/{warmer.total}개 조합)")
+        else:
+            st.progress(warmer.done / max(warmer.total, 1), text=f"⚡ 캐시 준비 중 {warmer.done}/{warmer.total}")
+with st.sidebar:
+    if QUERY_BACKEND == 'parquet':
+        if service.analytics_backend()[0] is columnar: st.caption("🧊 분석 백엔드: Parquet 스냅숏 (DuckDB)")
+        else: st.caption("🧊 Parquet 스냅숏이 없거나 오래되어 SQLite로 조회합니다. `python columnar.py`로 다시 만드세요.")
+    cache_stats = result_cache.stats()
+    st.caption(
+        f"💾 결과 캐시 {cache_stats['entries']}건 ({cache_stats['bytes'] / 1024 / 1024:.1f}MB) · "
+        f"적중 {cache_stats['total_hits']:,} / 미스 {cache_stats['total_misses']:,}"
+    )
+
 with st.container(border=True):
     col1, col2, col3, col4 = st.columns([1.3, 1.5, 2, 1.2]) 
-    with col1: platform = st.radio("**플랫폼**", options=['전체', '당근마켓', '중고나라', '번개장터'], index=2, horizontal=True)
-    with col2: model = st.selectbox("**아이폰 기종**", options=['iPhone 14', 'iPhone 14 Pro', 'iPhone 15', 'iPhone 15 Pro', 'iPhone 16', 'iPhone 16 Pro'], index=5)
-    with col3: date_range = st.date_input("**기간**", value=(datetime.date(2025, 10, 3), datetime.date(2025, 11, 9)), format="YYYY-MM-DD")
-    with col4: st.write(""); analysis_button = st.button("🔍 분석 실행", type="primary", use_container_width=True)
+    with col4:
+        st.write(""); analysis_button = st.button("🔍 분석 실행", type="primary", use_container_width=True)
+        compare_mode = st.toggle("기종 비교", value=False, help="여러 기종을 골라 가격 추이와 매물 수를 겹쳐서 비교합니다.")
+        dedup_available = fetch_dedup_available()
+        dedup = st.toggle("중복 매물 제외", key="dedup", disabled=compare_mode or not dedup_available,
+                          help="여러 플랫폼에 함께 올라온 같은 매물을 한 건으로 셉니다 (매물 수, 평균 가격, 지역/플랫폼 분포).")
+        dedup = dedup and dedup_available
+    model_options = fetch_model_options()
+    if compare_mode:
+        with col1: compare_platforms = st.multiselect("**플랫폼**", options=PLATFORM_OPTIONS[1:], default=PLATFORM_OPTIONS[1:])
+        with col2:
+            default_models = [m for m in ['iPhone 14 Pro', 'iPhone 15 Pro', 'iPhone 16 Pro'] if m in model_options]
+            compare_models = st.multiselect("**비교할 기종**", options=model_options, default=default_models,
+                                            max_selections=MAX_COMPARE_MODELS)
+    else:
+        with col1: platform = st.radio("**플랫폼**", options=PLATFORM_OPTIONS, index=2, horizontal=True)
+        with col2: model = st.selectbox("**아이폰 기종**", options=model_options, index=model_options.index('iPhone 16 Pro') if 'iPhone 16 Pro' in model_options else 0)
+    with col3: date_range = st.date_input("**기간**", value=DEFAULT_DATE_RANGE, format="YYYY-MM-DD")
+    if not model_options: st.warning("기종 분류 정보가 없습니다. `python db_refresh.py`를 먼저 실행하세요.")
+    elif not dedup_available: st.caption("중복 매물 묶음 정보가 없어 중복 제외를 쓸 수 없습니다. `python db_refresh.py`를 먼저 실행하세요.")
+
+# --- 적용된 필터 (분석 실행을 누른 시점의 값: 이후 다른 위젯 때문에 전체가 다시 실행돼도 이 값으로 그린다) ---
+if compare_mode: current_filters = ('compare', tuple(compare_models), tuple(compare_platforms), *date_range)
+else: current_filters = ('single', platform, model, *date_range, dedup)
+if analysis_button and len(date_range) == 2: st.session_state['applied_filters'] = current_filters
+applied_filters = st.session_state.get('applied_filters')
+if applied_filters and applied_filters != current_filters:
+    st.caption("필터가 바뀌었습니다. 🔍 분석 실행을 누르면 아래 결과에 반영됩니다.")
 
 st.divider() 
-# 💡 디자인 변경: KPI 컨테이너의 border를 제거하여 카드 그림자가 더 잘 보이게 함
-kpi_container = st.container() 
-chart_container = st.container()
-
-if analysis_button and len(date_range) == 2:
-    start_date, end_date = date_range
-    
-    total_count, avg_price, id_list = fetch_kpi_and_ids(platform, model, start_date, end_date)
-    region_df = fetch_regional_data(platform, model, start_date, end_date, MAP_FILE_PATH)
-    platform_df = fetch_platform_data(model, start_date, end_date) 
-    price_trend_df = fetch_price_trend_data(platform, model, start_date, end_date) 
-    map_image = generate_map_overlay(region_df)
-    
-    unmapped_details_df = fetch_unmapped_details(platform, model, start_date, end_date, MAP_FILE_PATH)
 
-    # 💡 [디자인 수정] HTML/CSS를 활용한 카드형 레이아웃 적용
-    with kpi_container:
-        kpi_space_left, kpi1, kpi2, kpi3, kpi_space_right = st.columns([0.5, 2, 2, 2, 0.5])
-        
-        # 최다 거래 지역 계산
-        valid_regions = region_df[region_df['sigungu'] != '지역 미기재']
-        most_frequent_region = valid_regions.iloc[0]['sigungu'] if not valid_regions.empty else "-"
-        most_frequent_count = valid_regions.iloc[0]['count'] if not valid_regions.empty else 0
-
-        # --- KPI 1: 총 매물 수 (Blue Card) ---
-        with kpi1: 
-            st.markdown(f"""
-            <div class="kpi-card card-blue">
-                <div class="kpi-title">📦 총 매물 수</div>
-                <div class="kpi-value">{total_count:,.0f} 건</div>
-                <div class="kpi-caption">선택 기간 내 전체 매물</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        # --- KPI 2: 평균 가격 (Green Card) ---
-        with kpi2: 
-            st.markdown(f"""
-            <div class="kpi-card card-green">
-                <div class="kpi-title">💰 평균 가격</div>
-                <div class="kpi-value">{avg_price:,.0f} 원</div>
-                <div class="kpi-caption">기간 내 전체 매물의 평균값</div>
-            </div>
-            """, unsafe_allow_html=True)
-
-        # --- KPI 3: 최다 거래 지역 (Purple Card) ---
-        with kpi3: 
-            region_caption = f"총 {most_frequent_count}건" if most_frequent_region != "-" else "-"
-            st.markdown(f"""
-            <div class="kpi-card card-purple">
-                <div class="kpi-title">🗺️ 최다 거래 지역</div>
-                <div class="kpi-value">{most_frequent_region}</div>
-                <div class="kpi-caption">{region_caption}</div>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        st.write("") # 여백 추가
-
-    with chart_container:
-        chart_col1, chart_col2 = st.columns(2)
-        with chart_col1:
-            st.subheader("📍 지역별 매물 분포 (전체)")
-            with st.container(border=True):
-                if map_image:
-                    # 지도 이미지는 가운데 정렬 효과를 위해 컬럼 사용
-                    c1, c2, c3 = st.columns([1, 8, 1])
-                    with c2:
-                        st.image(map_image, use_container_width=True)
-                    
-                    if not region_df.empty:
-                        display_df = region_df[region_df['sigungu'] != '지역 미기재'].copy()
-                        
-                        displayed_count = display_df['count'].sum()
-                        if displayed_count < total_count:
-                            null_count = total_count - displayed_count
-                            null_row = pd.DataFrame({'sigungu': ['NULL 값 존재'], 'count': [null_count]})
-                            display_df = pd.concat([display_df, null_row], ignore_index=True)
-
-                        # 💡 [수정] 데이터프레임 출력 방식 개선 (꽉 차게)
-                        st.dataframe(
-                            display_df.rename(columns={"sigungu": "구"}).set_index('구'), 
-                            column_config={
-                                "구": st.column_config.TextColumn("구", width="medium"),
-                                "count": st.column_config.NumberColumn("매물 수", format="%d건")
-                            }, 
-                            use_container_width=True,
-                            height=300
-                        )
-                        
-                        unknown_count = region_df[region_df['sigungu'] == '지역 미기재']['count'].sum()
-                        if unknown_count > 0:
-                            st.divider()
-                            st.warning(f"⚠️ **지역 미기재 데이터: 총 {unknown_count}건**")
-                            with st.expander("🔻 미기재 상세 내역 보기 (동 이름)"):
-                                if not unmapped_details_df.empty:
-                                    st.markdown("##### 🚨 잘못 입력한 '동' 목록")
-                                    st.dataframe(
-                                        unmapped_details_df.set_index("동 이름(원본)"), 
-                                        use_container_width=True
-                                    )
-                else: st.error("서울지도보기.jpg 없음")
-
-        with chart_col2:
-            st.subheader("📊 플랫폼별 현황")
-            with st.container(border=True): 
-                if not platform_df.empty:
-                    color_map = {'중고나라': '#77DD77', '번개장터': '#FF6961', '당근마켓': '#FFB347'}
-                    platform_colors = [color_map.get(name, '#D3D3D3') for name in platform_df['name']]
-                    
-                    pull_values = [0.0] * len(platform_df)
-                    line_widths = [0] * len(platform_df)
-                    line_colors = ['#FFFFFF'] * len(platform_df)
-                    
-                    if platform != '전체':
-                        try:
-                            idx = platform_df[platform_df['name'] == platform].index[0]
-                            pull_values[idx] = 0.1
-                            line_widths[idx] = 2
-                            line_colors[idx] = '#000000'
-                        except: pass 
-
-                    fig = go.Figure(data=[go.Pie(
-                        labels=platform_df['name'], 
-                        values=platform_df['count'], 
-                        hole=.4, 
-                        pull=pull_values, 
-                        textinfo='label+percent',
-                        texttemplate="%{label}<br>%{percent:.1%}",
-                        textposition='inside',
-                        hovertemplate="<b>%{label}</b><br>매물 수: %{value}건<br>비율: %{percent}<extra></extra>",
-                        marker=dict(colors=platform_colors, line=dict(color=line_colors, width=line_widths))
-                    )])
-                    fig.update_layout(
-                        margin=dict(l=0, r=0, t=0, b=0), 
-                        legend=dict(orientation="h", yanchor="bottom", y=-0.1, xanchor="center", x=0.5),
-                        annotations=[dict(text='플랫폼', x=0.5, y=0.5, font_size=16, showarrow=False)]
-                    )
-                    st.plotly_chart(fig, use_container_width=True, config=plotly_config)
-                else: st.info("데이터 없음")
-            
-            st.subheader("📈 일별 평균 가격 변동") 
-            with st.container(border=True):
-                if not price_trend_df.empty:
-                    fig_line = go.Figure(data=go.Scatter(
-                        x=price_trend_df['posted_date'], 
-                        y=price_trend_df['avg_price'], 
-                        mode='lines+markers',
-                        hovertemplate="평균가: %{y:,.0f}원<extra></extra>"
-                    ))
-                    fig_line.update_layout(
-                        margin=dict(l=0, r=0, t=20, b=0), 
-                        height=300, 
-                        hovermode="x unified",
-                        xaxis=dict(tickformat="%Y-%m-%d", hoverformat="%Y년 %m월 %d일")
-                    )
-                    st.plotly_chart(fig_line, use_container_width=True, config=plotly_config)
-                else: st.info("데이터 없음")
+if applied_filters and applied_filters[0] == 'compare':
+    model_comparison(*applied_filters[1:])
+
+elif applied_filters:
+    _, platform, model, start_date, end_date, dedup = applied_filters
+
+    # 서로 의존하지 않는 조회는 동시에 시작하고, 먼저 나온 결과(KPI)부터 그린다
+    st.session_state['prefetch'] = {}
+    trend_unit = st.session_state.get('trend_unit', '자동')
+    prefetch(('trend', platform, model, start_date, end_date, trend_unit),
+             fetch_price_trend, platform, model, start_date, end_date, trend_unit)
+    if st.session_state.get('unmapped_open'):
+        prefetch(('unmapped', platform, model, start_date, end_date),
+                 fetch_unmapped_details, platform, model, start_date, end_date, MAP_FILE_PATH)
+    if st.session_state.get('show_listings'):
+        # 매물 목록 프래그먼트가 캐시에서 바로 읽도록 첫 페이지를 미리 조회
+        get_fetch_executor().submit(run_collecting_errors, fetch_listing_page, platform, model, start_date, end_date)
+
+    results = fetch_results(platform, model, start_date, end_date, dedup)
+    # 지도 이미지는 구별 집계가 나오자마자 백그라운드에서 그리기 시작
+    if not st.session_state.get('interactive_map'):
+        prefetch(('map', model, start_date, end_date, dedup), generate_map_overlay, results['region_df'])
+
+    kpi_cards(platform, model, start_date, end_date, dedup)
+    chart_col1, chart_col2 = st.columns(2)
+    # 지도를 그리는 동안 오른쪽 차트부터 채운다
+    with chart_col2:
+        platform_pie(platform, model, start_date, end_date, dedup)
+        price_trend(platform, model, start_date, end_date, dedup)
+        price_distribution(platform, model, start_date, end_date, dedup)
+    with chart_col1:
+        region_map(platform, model, start_date, end_date, dedup)
+
+    listing_drilldown(platform, model, start_date, end_date)
+
+# --- 🔧 쿼리 계측 패널 (DASHBOARD_DEBUG=1) ---
+# 이번 실행의 조회까지 보이도록 화면을 다 그린 뒤 사이드바에 추가한다.
+if DEBUG_MODE:
+    with st.sidebar:
+        with st.expander("🔧 쿼리 계측", expanded=True):
+            records = tracer.recent(50)
+            if not records: st.caption("기록 없음")
+            else:
+                st.dataframe(tracer.summary(), hide_index=True, use_container_width=True)
+                st.dataframe(pd.DataFrame([{
+                    '시각': r['ts'][11:], '함수': r['func'], 'ms': r['ms'], '행 수': r['rows'],
+                    '캐시': r['cache'] or '-',
+                    '전체 스캔': ", ".join(t for q in r['queries'] for t in q['full_scan']),
+                } for r in reversed(records)]), hide_index=True, use_container_width=True)
+
+                # 가장 최근에 실제로 DB를 읽은 호출의 실행 계획
+                latest = next((r for r in reversed(records) if r['queries']), None)
+                if latest:
+                    st.caption(f"최근 실행 계획: {latest['func']} ({latest['args']})")
+                    for q in latest['queries']:
+                        st.code("\n".join(q['plan']) + f"\n-- {q['ms']}ms, {q['rows']}행", language=None)
+            st.caption(f"JSON Lines 기록: `{TRACE_LOG_FILE}`")
+            st.button("기록 지우기", on_click=tracer.clear)
@@ -0,0 +1,498 @@
+# --- 대시보드 조회/집계 함수 (Streamlit 없이 import 가능) ---
+# 모든 함수는 열린 SQLite 연결을 받아 DataFrame/dict를 돌려준다.
+# 연결 관리, 결과 캐시, 에러 표시는 호출하는 쪽(dashboard.py, benchmark.py)이 맡는다.
+import numpy as np
+import pandas as pd
+
+from market_db import (
+    model_filter_sql, models_filter_sql, model_label, model_sort_key, bucket_prices,
+    UNKNOWN_GU, get_mapping_index, resolve_gu_series, table_exists,
+)
+from query_trace import tracer
+
+
+# --- 기종 선택지 (products에 분류된 기종 목록) ---
+def read_model_options(conn):
+    rows = conn.execute(
+        "SELECT DISTINCT model_family, variant FROM products WHERE model_family IS NOT NULL"
+    ).fetchall()
+    return sorted((model_label(family, variant) for family, variant in rows), key=model_sort_key)
+
+
+# --- 쿼리 생성 헬퍼 ---
+def build_dynamic_query_parts(platform, model, start_date, end_date):
+    params = []
+    where_clause = " WHERE p.posted_date BETWEEN ? AND ? "
+    params.extend([str(start_date), str(end_date)])
+
+    if platform != '전체':
+        where_clause += " AND pf.name = ? "
+        params.append(platform)
+
+    model_sql, model_params = model_filter_sql(model, 'pr')
+    where_clause += model_sql
+    params.extend(model_params)
+    return where_clause, params
+
+
+# --- 집계 테이블 사용 가능 여부 ---
+# 날짜별 posts의 (건수, 최대 post_id, post_id 합계)가 집계 시점(rollup_state)과 모두 같으면 최신 상태로 본다.
+# 건수/합계도 비교해야 바뀐 파일을 다시 적재하면서 지운 게시물(--no-refresh)이 남은 집계를 걸러낸다.
+ROLLUP_FRESHNESS_SQL = """
+WITH current AS (
+  SELECT posted_date, COUNT(*), MAX(post_id), SUM(post_id) FROM posts WHERE posted_date IS NOT NULL GROUP BY posted_date
+), recorded AS (
+  SELECT posted_date, post_count, max_post_id, post_id_sum FROM rollup_state
+)
+SELECT 1 FROM (SELECT * FROM current EXCEPT SELECT * FROM recorded)
+UNION ALL
+SELECT 1 FROM (SELECT * FROM recorded EXCEPT SELECT * FROM current)
+LIMIT 1
+"""
+
+
+def rollups_available(conn):
+    if not table_exists(conn, 'rollup_state') or 'post_id_sum' not in columns_of(conn, 'rollup_state'): return False
+    if conn.execute("SELECT 1 FROM rollup_state LIMIT 1").fetchone() is None: return False
+    return conn.execute(ROLLUP_FRESHNESS_SQL).fetchone() is None
+
+
+# --- 중복 매물 제외 (dedup.py가 묶은 listing_cluster_id의 대표 게시물만) ---
+# 묶음이 아직 계산되지 않은 게시물(listing_cluster_id가 NULL)은 혼자인 묶음으로 본다.
+def columns_of(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def has_listing_clusters(conn):
+    """중복 매물 묶음이 있는 DB인지 (db_refresh.py를 한 번 실행하면 posts.listing_cluster_id가 생긴다)"""
+    return 'listing_cluster_id' in columns_of(conn, 'posts')
+
+
+def unique_post_sql(conn, alias='p'):
+    """대표 게시물만 남기는 WHERE 조건 (앞에 AND 포함). 묶음 컬럼이 없는 DB는 전체 매물을 중복 제외로 내보내지 않도록 오류"""
+    if not has_listing_clusters(conn):
+        raise ValueError("중복 매물 묶음(posts.listing_cluster_id)이 없습니다. `python db_refresh.py`를 먼저 실행하세요.")
+    return f" AND {alias}.post_id = COALESCE({alias}.listing_cluster_id, {alias}.post_id) "
+
+
+# (날짜, 플랫폼, 구) 단위 집계를 daily_rollup에서 읽기 (dedup이면 묶음 대표만 센 unique_* 컬럼)
+def read_rollup_groups(conn, model, start_date, end_date, dedup=False):
+    model_sql, model_params = model_filter_sql(model, 'ru')
+    prefix = 'unique_' if dedup else ''
+    sql = f"""
+    SELECT ru.posted_date, pf.name AS platform, ru.sigungu,
+           SUM(ru.{'unique_count' if dedup else 'post_count'}) AS cnt,
+           SUM(ru.{prefix}price_sum) AS price_sum,
+           SUM(ru.{prefix}price_count) AS price_cnt
+    FROM daily_rollup AS ru
+    JOIN platforms AS pf ON ru.platform_id = pf.platform_id
+    WHERE ru.posted_date BETWEEN ? AND ? {model_sql}
+    GROUP BY ru.posted_date, pf.name, ru.sigungu
+    """
+    return tracer.read_sql(sql, conn, params=[str(start_date), str(end_date)] + model_params)
+
+
+# 집계 테이블이 없거나 오래된 경우: posts에서 같은 모양으로 집계
+# 구는 적재 후처리에서 regions.resolved_sigungu로 저장해 두므로 SQL GROUP BY로 끝나고,
+# 아직 보정되지 않은 지역만 원본 시군구/동을 받아 벡터 연산으로 보정한다.
+def read_post_groups(conn, model, start_date, end_date, map_file_path, dedup=False):
+    where_clause, params = build_dynamic_query_parts('전체', model, start_date, end_date)
+    if dedup: where_clause += unique_post_sql(conn)
+    sql = f"""
+    SELECT p.posted_date, pf.name AS platform,
+           r.resolved_sigungu AS gu,
+           r.region_id IS NOT NULL AND r.resolved_sigungu IS NULL AS pending,
+           CASE WHEN r.region_id IS NOT NULL AND r.resolved_sigungu IS NULL THEN r.sigungu END AS raw_sigungu,
+           CASE WHEN r.region_id IS NOT NULL AND r.resolved_sigungu IS NULL THEN r.dong END AS raw_dong,
+           COUNT(p.post_id) AS cnt,
+           SUM(p.price_krw) AS price_sum,
+           COUNT(p.price_krw) AS price_cnt
+    FROM posts AS p
+    JOIN platforms AS pf ON p.platform_id = pf.platform_id
+    JOIN products AS pr ON p.product_id = pr.product_id
+    LEFT JOIN regions AS r ON p.region_id = r.region_id
+    {where_clause}
+    GROUP BY p.posted_date, pf.name, gu, pending, raw_sigungu, raw_dong
+    """
+    df = tracer.read_sql(sql, conn, params=params).rename(columns={'gu': 'sigungu'})
+    pending = df['pending'] == 1
+    if pending.any():
+        mapping_index = get_mapping_index(map_file_path)
+        df.loc[pending, 'sigungu'] = resolve_gu_series(df.loc[pending, 'raw_sigungu'], df.loc[pending, 'raw_dong'], mapping_index)
+    return df.groupby(['posted_date', 'platform', 'sigungu'], dropna=False)[['cnt', 'price_sum', 'price_cnt']].sum().reset_index()
+
+
+# --- 가격 분포 (중앙값 / p10·p90 / IQR / 히스토그램) ---
+# 집계 테이블이 최신이면 daily_price_hist의 가격 구간별 건수를 합치고(상대 오차 0.5% 이내),
+# 아니면 posts에서 가격별 건수를 묶어 정확한 값을 구한다. 어느 쪽이든 누적 건수까지 DB에서 계산하고
+# pandas는 (가격, 건수, 누적) 몇백 행에서 분위수 위치만 찾는다.
+PRICE_QUANTILES = {'p10': 0.10, 'p25': 0.25, 'median': 0.50, 'p75': 0.75, 'p90': 0.90}
+PRICE_HIST_BINS = 30
+PRICE_HIST_RANGE = (0.01, 0.99)  # 히스토그램은 p1~p99 구간만 그린다 (미끼/오입력 가격 제외)
+EMPTY_PRICE_STATS = {'count': 0, 'iqr': 0, 'outliers': 0, **{name: 0 for name in PRICE_QUANTILES}}
+
+
+def price_sketch_available(conn):
+    return table_exists(conn, 'daily_price_hist') and rollups_available(conn)
+
+
+def read_price_distribution(conn, platform, model, start_date, end_date):
+    """가격 오름차순 (price, cnt, cum) DataFrame"""
+    if price_sketch_available(conn):
+        model_sql, model_params = model_filter_sql(model, 'h')
+        platform_sql, platform_params = (" AND pf.name = ? ", [platform]) if platform != '전체' else ("", [])
+        sql = f"""
+        WITH merged AS (
+          SELECT h.price_bucket AS bucket, SUM(h.post_count) AS cnt
+          FROM daily_price_hist AS h
+          JOIN platforms AS pf ON h.platform_id = pf.platform_id
+          WHERE h.posted_date BETWEEN ? AND ? {platform_sql} {model_sql}
+          GROUP BY h.price_bucket
+        )
+        SELECT bucket, cnt, SUM(cnt) OVER (ORDER BY bucket) AS cum FROM merged ORDER BY bucket
+        """
+        df = tracer.read_sql(sql, conn, params=[str(start_date), str(end_date)] + platform_params + model_params)
+        df['price'] = bucket_prices(df['bucket']).round(-3)  # 구간 대표값은 천 원 단위로 표시
+        return df[['price', 'cnt', 'cum']]
+
+    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
+    sql = f"""
+    WITH merged AS (
+      SELECT p.price_krw AS price, COUNT(*) AS cnt
+      FROM posts AS p
+      JOIN platforms AS pf ON p.platform_id = pf.platform_id
+      JOIN products AS pr ON p.product_id = pr.product_id
+      {where_clause} AND p.price_krw IS NOT NULL
+      GROUP BY p.price_krw
+    )
+    SELECT price, cnt, SUM(cnt) OVER (ORDER BY price) AS cum FROM merged ORDER BY price
+    """
+    return tracer.read_sql(sql, conn, params=params)
+
+
+def price_at(dist, q):
+    """누적 건수에서 q 분위수 가격 (nearest-rank)"""
+    rank = max(int(np.ceil(q * dist['cum'].iloc[-1])), 1)
+    return float(dist['price'].iloc[dist['cum'].searchsorted(rank)])
+
+
+def summarize_prices(dist):
+    """(분위수 dict, 히스토그램 DataFrame[bin_start, bin_end, count])"""
+    empty_hist = pd.DataFrame(columns=['bin_start', 'bin_end', 'count'])
+    if dist.empty: return dict(EMPTY_PRICE_STATS), empty_hist
+
+    stats = {name: price_at(dist, q) for name, q in PRICE_QUANTILES.items()}
+    stats['count'] = int(dist['cum'].iloc[-1])
+    stats['iqr'] = stats['p75'] - stats['p25']
+
+    low, high = (price_at(dist, q) for q in PRICE_HIST_RANGE)
+    counts, edges = np.histogram(dist['price'], bins=PRICE_HIST_BINS, range=(low, high), weights=dist['cnt'])
+    stats['outliers'] = stats['count'] - int(counts.sum())
+    hist = pd.DataFrame({'bin_start': edges[:-1], 'bin_end': edges[1:], 'count': counts.astype(int)})
+    return stats, hist
+
+
+# --- 💡 통합 집계 함수 (필터된 게시물을 한 번만 스캔) ---
+# 플랫폼 파이 차트는 플랫폼 필터 없이 그려야 하므로, 플랫폼 조건은 SQL에서 빼고
+# (날짜, 플랫폼, 구) 단위로 묶은 결과를 받아 pandas에서 각 화면용으로 나눈다.
+EMPTY_RESULTS = {
+    'total_count': 0,
+    'avg_price': 0,
+    'region_df': pd.DataFrame(columns=['sigungu', 'count']),
+    'platform_df': pd.DataFrame(columns=['name', 'count']),
+    'price_stats': dict(EMPTY_PRICE_STATS),
+    'price_hist_df': pd.DataFrame(columns=['bin_start', 'bin_end', 'count']),
+}
+
+
+def read_dashboard_groups(conn, model, start_date, end_date, map_file_path, dedup=False):
+    # 중복 제외 건수(unique_*)가 생기기 전에 만든 집계 테이블이면 posts에서 센다
+    if rollups_available(conn) and not (dedup and 'unique_count' not in columns_of(conn, 'daily_rollup')):
+        return read_rollup_groups(conn, model, start_date, end_date, dedup)
+    return read_post_groups(conn, model, start_date, end_date, map_file_path, dedup)
+
+
+def summarize_groups(df, platform, price_dist=None):
+    """(날짜, 플랫폼, 구) 집계 → KPI / 지역별 / 플랫폼별 (+ 가격 분포). 가격 추이는 read_price_trend"""
+    if df.empty: return dict(EMPTY_RESULTS)
+
+    results = dict(EMPTY_RESULTS)
+    if price_dist is not None:
+        results['price_stats'], results['price_hist_df'] = summarize_prices(price_dist)
+
+    # 플랫폼별 현황 (플랫폼 필터 미적용)
+    platform_df = df.groupby('platform')['cnt'].sum().reset_index()
+    platform_df.columns = ['name', 'count']
+    results['platform_df'] = platform_df.sort_values('count', ascending=False).reset_index(drop=True)
+
+    if platform != '전체':
+        df = df[df['platform'] == platform]
+    if df.empty: return results
+
+    # KPI
+    price_cnt = df['price_cnt'].sum()
+    results['total_count'] = int(df['cnt'].sum())
+    results['avg_price'] = df['price_sum'].sum() / price_cnt if price_cnt else 0
+
+    # 지역별 분포 (지역 정보가 연결된 게시물만)
+    region_rows = df[df['sigungu'].notna()]
+    if region_rows.empty: return results
+
+    result_df = region_rows.groupby('sigungu')['cnt'].sum().reset_index(name='count')
+    results['region_df'] = result_df.sort_values('count', ascending=False)
+    return results
+
+
+def read_dashboard_data(conn, platform, model, start_date, end_date, map_file_path, dedup=False):
+    groups = read_dashboard_groups(conn, model, start_date, end_date, map_file_path, dedup)
+    return summarize_groups(groups, platform, read_price_distribution(conn, platform, model, start_date, end_date))
+
+
+# --- 가격 추이 (기간 길이에 따라 일/주/월 단위로 묶고, 이동 평균까지 SQL 윈도 함수로 계산) ---
+# 이동 평균은 가격 합 / 가격 건수를 창 안에서 합쳐 구하므로 건수가 적은 구간에 끌려가지 않는다.
+# 창은 날짜 기준(RANGE)이라 게시물이 없는 날이 있어도 '최근 7일'이 그대로 유지된다.
+TREND_UNITS = {
+    # 단위: (구간 시작일 SQL, 이동 평균 창(일), 차트 표시 형식)
+    '일': ("{d}", 6, "%Y년 %m월 %d일"),
+    '주': ("date({d}, '-6 days', 'weekday 1')", 21, "%Y년 %m월 %d일 주"),
+    '월': ("strftime('%Y-%m-01', {d})", 62, "%Y년 %m월"),
+}
+TREND_AUTO_LIMITS = ((92, '일'), (731, '주'))  # 기간(일)이 이 이하이면 해당 단위, 넘으면 '월'
+MAX_TREND_POINTS = 400
+TREND_COLUMNS = ['period', 'avg_price', 'smoothed_price', 'price_cnt']
+
+
+def trend_unit_for(start_date, end_date, unit='자동'):
+    if unit in TREND_UNITS: return unit
+    days = (pd.Timestamp(end_date) - pd.Timestamp(start_date)).days + 1
+    return next((name for limit, name in TREND_AUTO_LIMITS if days <= limit), '월')
+
+
+def read_price_trend(conn, platform, model, start_date, end_date, unit='자동', max_points=MAX_TREND_POINTS):
+    """(구간 시작일, 평균가, 이동 평균, 가격 건수) DataFrame과 실제 사용한 단위 반환"""
+    unit = trend_unit_for(start_date, end_date, unit)
+    period_sql, window_days, _ = TREND_UNITS[unit]
+    if rollups_available(conn):
+        model_sql, model_params = model_filter_sql(model, 'ru')
+        platform_sql, platform_params = (" AND pf.name = ? ", [platform]) if platform != '전체' else ("", [])
+        source = f"""
+          SELECT {period_sql.format(d='ru.posted_date')} AS period,
+                 SUM(ru.price_sum) AS price_sum, SUM(ru.price_count) AS price_cnt
+          FROM daily_rollup AS ru
+          JOIN platforms AS pf ON ru.platform_id = pf.platform_id
+          WHERE ru.posted_date BETWEEN ? AND ? {platform_sql} {model_sql}
+          GROUP BY period
+        """
+        params = [str(start_date), str(end_date)] + platform_params + model_params
+    else:
+        where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
+        source = f"""
+          SELECT {period_sql.format(d='p.posted_date')} AS period,
+                 SUM(p.price_krw) AS price_sum, COUNT(p.price_krw) AS price_cnt
+          FROM posts AS p
+          JOIN platforms AS pf ON p.platform_id = pf.platform_id
+          JOIN products AS pr ON p.product_id = pr.product_id
+          {where_clause}
+          GROUP BY period
+        """
+    sql = f"""
+    WITH buckets AS ({source})
+    SELECT period,
+           price_sum * 1.0 / price_cnt AS avg_price,
+           SUM(price_sum) OVER w * 1.0 / SUM(price_cnt) OVER w AS smoothed_price,
+           price_cnt
+    FROM buckets
+    WHERE price_cnt > 0
+    WINDOW w AS (ORDER BY julianday(period) RANGE BETWEEN {window_days} PRECEDING AND CURRENT ROW)
+    ORDER BY period
+    """
+    df = tracer.read_sql(sql, conn, params=params)
+    if max_points and len(df) > max_points:
+        df = df.iloc[lttb_indices(df['avg_price'].to_numpy(), max_points)].reset_index(drop=True)
+    return df, unit
+
+
+def lttb_indices(values, threshold):
+    """Largest-Triangle-Three-Buckets: 모양을 유지하면서 threshold개 점만 남길 위치 (x는 순번)"""
+    n = len(values)
+    if threshold >= n or threshold < 3: return np.arange(n)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = [0]
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # 다음 구간의 평균점 (마지막 구간이면 마지막 점)
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean() if next_end > next_start else x[-1]
+        avg_y = values[next_start:next_end].mean() if next_end > next_start else values[-1]
+        a = selected[-1]
+        area = np.abs((x[a] - avg_x) * (values[start:end] - values[a]) - (x[a] - x[start:end]) * (avg_y - values[a]))
+        selected.append(start + int(area.argmax()))
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+# --- 기종 비교 (여러 기종 × 플랫폼을 쿼리 한 번으로) ---
+# (기종, 플랫폼, 구간)으로 한 번 묶은 뒤, 같은 결과에서
+#   · 기종별 가격 추이 + 이동 평균 (PARTITION BY 기종 윈도 함수)
+#   · 기종 × 플랫폼별 매물 수/가격 합
+# 두 모양을 UNION ALL로 함께 돌려준다.
+COMPARISON_COLUMNS = ['kind', 'model_family', 'variant', 'platform', 'period', 'cnt', 'price_sum', 'price_cnt', 'smoothed_price']
+
+
+def read_model_comparison(conn, models, platforms, start_date, end_date, unit='자동'):
+    """비교용 원자료 DataFrame(kind='trend' | 'platform')과 실제 사용한 추이 단위 반환"""
+    unit = trend_unit_for(start_date, end_date, unit)
+    period_sql, window_days, _ = TREND_UNITS[unit]
+    platform_sql = f" AND pf.name IN ({','.join('?' * len(platforms))}) " if platforms else " AND 0 "
+    if rollups_available(conn):
+        model_sql, model_params = models_filter_sql(models, 'ru')
+        base = f"""
+          SELECT ru.model_family, ru.variant, pf.name AS platform,
+                 {period_sql.format(d='ru.posted_date')} AS period,
+                 SUM(ru.post_count) AS cnt, SUM(ru.price_sum) AS price_sum, SUM(ru.price_count) AS price_cnt
+          FROM daily_rollup AS ru
+          JOIN platforms AS pf ON ru.platform_id = pf.platform_id
+          WHERE ru.posted_date BETWEEN ? AND ? {platform_sql} {model_sql}
+          GROUP BY ru.model_family, ru.variant, pf.name, period
+        """
+    else:
+        model_sql, model_params = models_filter_sql(models, 'pr')
+        base = f"""
+          SELECT pr.model_family, pr.variant, pf.name AS platform,
+                 {period_sql.format(d='p.posted_date')} AS period,
+                 COUNT(p.post_id) AS cnt, SUM(p.price_krw) AS price_sum, COUNT(p.price_krw) AS price_cnt
+          FROM posts AS p
+          JOIN platforms AS pf ON p.platform_id = pf.platform_id
+          JOIN products AS pr ON p.product_id = pr.product_id
+          WHERE p.posted_date BETWEEN ? AND ? {platform_sql} {model_sql}
+          GROUP BY pr.model_family, pr.variant, pf.name, period
+        """
+    sql = f"""
+    WITH base AS ({base}),
+    per_model AS (
+      SELECT model_family, variant, period,
+             SUM(cnt) AS cnt, SUM(price_sum) AS price_sum, SUM(price_cnt) AS price_cnt
+      FROM base
+      GROUP BY model_family, variant, period
+    )
+    SELECT 'trend' AS kind, model_family, variant, NULL AS platform, period, cnt, price_sum, price_cnt,
+           SUM(price_sum) OVER w * 1.0 / NULLIF(SUM(price_cnt) OVER w, 0) AS smoothed_price
+    FROM per_model
+    WINDOW w AS (PARTITION BY model_family, variant ORDER BY julianday(period)
+                 RANGE BETWEEN {window_days} PRECEDING AND CURRENT ROW)
+    UNION ALL
+    SELECT 'platform', model_family, variant, platform, NULL, SUM(cnt), SUM(price_sum), SUM(price_cnt), NULL
+    FROM base
+    GROUP BY model_family, variant, platform
+    ORDER BY kind, model_family, variant, platform, period
+    """
+    params = [str(start_date), str(end_date)] + list(platforms) + model_params
+    return tracer.read_sql(sql, conn, params=params), unit
+
+
+def summarize_comparison(df):
+    """비교 원자료 → {summary_df: 기종별 KPI, trend_df: 기종별 추이, platform_df: 기종 × 플랫폼 매물 수}"""
+    df = df.copy()
+    df['model'] = [model_label(family, variant) for family, variant in zip(df['model_family'], df['variant'])]
+    order = sorted(df['model'].unique(), key=model_sort_key)
+
+    platform_df = df[df['kind'] == 'platform'][['model', 'platform', 'cnt', 'price_sum', 'price_cnt']]
+    summary = platform_df.groupby('model')[['cnt', 'price_sum', 'price_cnt']].sum().reindex(order)
+    summary['avg_price'] = summary['price_sum'] / summary['price_cnt'].where(summary['price_cnt'] > 0)
+    summary_df = summary.reset_index()[['model', 'cnt', 'avg_price']].rename(columns={'cnt': 'count'})
+
+    trend = df[(df['kind'] == 'trend') & (df['price_cnt'] > 0)].copy()
+    trend['avg_price'] = trend['price_sum'] / trend['price_cnt']
+    trend_df = trend[['model', 'period', 'avg_price', 'smoothed_price', 'cnt']].sort_values(['model', 'period'])
+
+    return {
+        'models': order,
+        'summary_df': summary_df,
+        'trend_df': trend_df.reset_index(drop=True),
+        'platform_df': platform_df[['model', 'platform', 'cnt']].rename(columns={'cnt': 'count'}).reset_index(drop=True),
+    }
+
+
+# --- 매핑 실패(미기재) 상세 목록 (동 단위 드릴다운은 posts에서 직접 조회) ---
+UNMAPPED_COLUMNS = ['동 이름(원본)', '매물 수']
+
+
+def read_unmapped_details(conn, platform, model, start_date, end_date, map_file_path):
+    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
+    sql = f"""
+    SELECT r.dong, r.sigungu, r.resolved_sigungu IS NULL AS pending, COUNT(p.post_id) AS cnt
+    FROM posts AS p
+    JOIN platforms AS pf ON p.platform_id = pf.platform_id
+    JOIN products AS pr ON p.product_id = pr.product_id
+    JOIN regions AS r ON p.region_id = r.region_id
+    {where_clause}
+    AND (r.resolved_sigungu = ? OR r.resolved_sigungu IS NULL)
+    GROUP BY r.dong, r.sigungu, pending
+    """
+    df = tracer.read_sql(sql, conn, params=params + [UNKNOWN_GU])
+
+    # 아직 보정되지 않은 지역은 요청 시 벡터 연산으로 판정
+    pending = df['pending'] == 1
+    if pending.any():
+        mapping_index = get_mapping_index(map_file_path)
+        still_unknown = resolve_gu_series(df.loc[pending, 'sigungu'], df.loc[pending, 'dong'], mapping_index) == UNKNOWN_GU
+        df = pd.concat([df[~pending], df[pending][still_unknown]])
+
+    if df.empty:
+        return pd.DataFrame(columns=UNMAPPED_COLUMNS)
+
+    df['dong'] = df['dong'].fillna("(지역 정보 없음)")
+    df.loc[df['dong'].astype(str).str.strip() == '', 'dong'] = "(지역 정보 없음)"
+
+    result = df.groupby('dong')['cnt'].sum().sort_values(ascending=False).reset_index()
+    result.columns = UNMAPPED_COLUMNS
+    return result
+
+
+# --- 매물 목록 (posted_date, post_id 기준 키셋 페이지네이션) ---
+# 전체 ID 목록을 만들지 않고, 마지막으로 본 (날짜, ID) 다음부터 한 페이지씩 읽는다.
+LISTING_PAGE_SIZE = 50
+LISTING_COLUMNS = ['post_id', 'posted_date', 'platform', 'title', 'price_krw', 'region', 'url']
+
+
+def listing_query(platform, model, start_date, end_date, after=None, columns=LISTING_COLUMNS):
+    """필터에 맞는 게시물을 최신순으로 읽는 (SQL, 파라미터). 매물 목록과 내보내기(listing_export.py)가 함께 쓴다"""
+    where_clause, params = build_dynamic_query_parts(platform, model, start_date, end_date)
+    if after is not None:
+        where_clause += " AND (p.posted_date, p.post_id) < (?, ?) "
+        params.extend(after)
+    expressions = {
+        'post_id': "p.post_id",
+        'posted_date': "p.posted_date",
+        'platform': "pf.name AS platform",
+        'model_family': "pr.model_family",
+        'variant': "pr.variant",
+        'title': "p.title",
+        'price_krw': "p.price_krw",
+        'region': "TRIM(COALESCE(r.resolved_sigungu, r.sigungu, '') || ' ' || COALESCE(r.dong, '')) AS region",
+        'url': "p.url",
+    }
+    sql = f"""
+    SELECT {', '.join(expressions[c] for c in columns)}
+    FROM posts AS p
+    JOIN platforms AS pf ON p.platform_id = pf.platform_id
+    JOIN products AS pr ON p.product_id = pr.product_id
+    LEFT JOIN regions AS r ON p.region_id = r.region_id
+    {where_clause}
+    ORDER BY p.posted_date DESC, p.post_id DESC
+    """
+    return sql, params
+
+
+def read_listing_page(conn, platform, model, start_date, end_date, after=None, limit=LISTING_PAGE_SIZE):
+    """(한 페이지 DataFrame, 다음 페이지 존재 여부) 반환"""
+    sql, params = listing_query(platform, model, start_date, end_date, after)
+    df = tracer.read_sql(sql + " LIMIT ?", conn, params=params + [limit + 1])
+    # 한 건 더 읽어서 다음 페이지가 있는지 판단
+    return df.head(limit), len(df) > limit
+
+
+# --- 게시일 범위 ---
+def read_date_bounds(conn):
+    return conn.execute("SELECT MIN(posted_date), MAX(posted_date) FROM posts").fetchone()
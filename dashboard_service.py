@@ -0,0 +1,201 @@
+# --- 대시보드 조회 계층 (Streamlit 없이 import 가능: dashboard.py와 api_server.py가 함께 쓴다) ---
+# 읽기 전용 연결 풀 + 분석 백엔드 선택(SQLite / Parquet 스냅숏) + 디스크 결과 캐시 + 쿼리 계측을 한데 묶는다.
+# SQL/집계는 dashboard_data.py(columnar.py)에 있고, 여기서는 연결을 빌려 호출하고 결과를 캐시한다.
+# 조회 메서드는 실패하면 예외를 내고(캐시에 저장되지 않음), 캐시 바깥에서 빈 결과로 바꿔 돌려준다
+# (화면이 깨지지 않게 하는 대시보드의 기존 동작).
+#   service = DashboardService()
+#   service.fetch_dashboard_data('전체', 'iPhone 16 Pro', date(2025, 10, 3), date(2025, 11, 9), MAP_FILE_PATH)
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+import columnar
+import dashboard_data
+import observations
+from market_db import BASE_DIR, DB_FILE, ReadOnlyPool, db_version_token
+from dashboard_data import (
+    EMPTY_RESULTS, UNMAPPED_COLUMNS, LISTING_COLUMNS, LISTING_PAGE_SIZE, TREND_COLUMNS, COMPARISON_COLUMNS,
+    read_model_options, read_date_bounds, has_listing_clusters, read_unmapped_details, read_listing_page,
+    summarize_groups, summarize_comparison,
+)
+from observations import PRICE_DROP_COLUMNS, DAYS_ON_MARKET_COLUMNS
+from result_cache import ResultCache
+from query_trace import tracer
+
+RESULT_CACHE_FILE = BASE_DIR / ".cache" / "dashboard_results.sqlite"
+QUERY_BACKENDS = ('sqlite', 'parquet')
+
+# 계측 + 결과 캐시를 씌우는 조회 메서드 (키: DB 파일 + 분석 백엔드, 메서드 이름, 인자, DB 버전)
+# 값: 조회가 실패했을 때 돌려줄 빈 결과 (인자 이름 -> 값 딕셔너리를 받는다)
+FETCH_METHODS = {
+    'fetch_model_options': lambda a: [],
+    'fetch_dedup_available': lambda a: False,
+    'fetch_date_bounds': lambda a: (None, None),
+    'fetch_dashboard_data': lambda a: dict(EMPTY_RESULTS),
+    'fetch_price_trend': lambda a: (pd.DataFrame(columns=TREND_COLUMNS), a['unit']),
+    'fetch_model_comparison': lambda a: (summarize_comparison(pd.DataFrame(columns=COMPARISON_COLUMNS)), a['unit']),
+    'fetch_unmapped_details': lambda a: pd.DataFrame(columns=UNMAPPED_COLUMNS),
+    'fetch_listing_page': lambda a: (pd.DataFrame(columns=LISTING_COLUMNS), False),
+    'fetch_price_drops': lambda a: pd.DataFrame(columns=PRICE_DROP_COLUMNS),
+    'fetch_days_on_market': lambda a: (pd.DataFrame(columns=DAYS_ON_MARKET_COLUMNS), None),
+}
+
+
+def with_fallback(method, empty):
+    """method가 예외를 내면 empty(인자)를 돌려준다. 결과 캐시 바깥에 씌워 빈 결과가 캐시되지 않게 한다"""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        try: return method(*args, **kwargs)
+        except Exception:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return empty(bound.arguments)
+    return wrapper
+
+
+class DashboardService:
+    def __init__(self, db_file=DB_FILE, cache_file=RESULT_CACHE_FILE, cache_max_bytes=256 * 1024 * 1024,
+                 backend='sqlite', pool_size=4, snapshot_dir=columnar.SNAPSHOT_DIR, on_error=None, fallback=True):
+        self.db_file = Path(db_file)
+        self.backend = backend
+        # 캐시 파일을 같이 쓰는 다른 DB(벤치마크, 테스트 DB)나 다른 백엔드의 결과와 섞이거나 서로 지우지 않게
+        self.cache_namespace = f"{self.db_file.resolve()}|{backend}"
+        self.snapshot_dir = Path(snapshot_dir)
+        self.on_error = on_error  # on_error(메시지): 연결 실패 알림 (대시보드는 st.error)
+        # fallback=False이면 조회 실패를 빈 결과로 바꾸지 않고 예외를 그대로 낸다 (api_server.py의 오류 응답)
+        self.pool = ReadOnlyPool(self.db_file, size=pool_size)
+        self.cache = ResultCache(cache_file, max_bytes=cache_max_bytes, on_lookup=tracer.on_cache_lookup)
+        self._snapshot = None
+        self._snapshot_key = None
+        self._lock = threading.Lock()
+        self._errors = threading.local()  # collect_errors 중인 스레드의 오류 메시지 목록
+        for name, empty in FETCH_METHODS.items():
+            method = getattr(self, name)
+            cached = tracer.trace()(self.cache.cached(self.data_version, namespace=self.cache_namespace)(method))
+            setattr(self, name, with_fallback(cached, empty) if fallback else cached)
+
+    def data_version(self):
+        # 적재/후처리 스크립트가 DB를 고치면 바뀌는 토큰
+        return db_version_token(self.db_file)
+
+    # --- 연결 ---
+    def report_error(self, message):
+        errors = getattr(self._errors, 'messages', None)
+        if errors is not None: errors.append(message)
+        elif self.on_error: self.on_error(message)
+
+    @contextmanager
+    def collect_errors(self):
+        """이 스레드에서 난 연결 오류를 on_error 대신 목록에 모은다
+        (대시보드의 작업 스레드에는 Streamlit 실행 문맥이 없어 st.error가 버려진다: 결과를 받는 쪽에서 표시)"""
+        errors = []
+        self._errors.messages = errors
+        try: yield errors
+        finally: self._errors.messages = None
+
+    def connect(self, pool=None):
+        try:
+            return (pool or self.pool).acquire()
+        except Exception as e:
+            self.report_error(f"DB 연결 오류: {e}")
+            raise
+
+    def get_connection(self, pool=None):
+        # 실패하면 None (조회 메서드 밖에서 연결을 직접 빌리는 곳용)
+        try: return self.connect(pool)
+        except Exception: return None
+
+    def release_connection(self, conn, pool=None):
+        (pool or self.pool).release(conn)
+
+    # --- 분석 백엔드 (backend='parquet'이면 집계 조회를 Parquet 스냅숏 + DuckDB로 실행) ---
+    # 스냅숏은 db_refresh.py가 갱신한다. duckdb가 없거나 스냅숏이 DB보다 오래됐으면 SQLite로 조회한다.
+    def columnar_snapshot(self):
+        key = (self.data_version(), db_version_token(self.snapshot_dir / columnar.SNAPSHOT_META))
+        with self._lock:
+            if key != self._snapshot_key:
+                try: self._snapshot = columnar.open_snapshot(self.db_file, self.snapshot_dir)
+                except Exception: self._snapshot = None
+                self._snapshot_key = key
+            return self._snapshot
+
+    def analytics_backend(self):
+        """(조회 모듈, 연결 풀): columnar + 스냅숏 또는 dashboard_data + SQLite 연결 풀"""
+        if self.backend == 'parquet':
+            snapshot = self.columnar_snapshot()
+            if snapshot is not None: return columnar, snapshot
+        return dashboard_data, self.pool
+
+    # --- 조회 ---
+    def fetch_model_options(self):
+        conn = self.connect()
+        try: return read_model_options(conn)
+        finally: self.release_connection(conn)
+
+    # 중복 매물 묶음이 있는 DB인지 (없으면 대시보드가 중복 제외 토글을 끈다)
+    def fetch_dedup_available(self):
+        conn = self.connect()
+        try: return has_listing_clusters(conn)
+        finally: self.release_connection(conn)
+
+    def fetch_date_bounds(self):
+        conn = self.connect()
+        try: return read_date_bounds(conn)
+        finally: self.release_connection(conn)
+
+    # dedup: 여러 플랫폼에 함께 올라온 매물을 한 건으로 센 매물 수/평균 가격/지역/플랫폼 (가격 분포는 전체 매물 기준, 화면에도 그렇게 표시)
+    # 중복 제외 건수는 집계 테이블에만 있으므로 Parquet 백엔드여도 SQLite로 조회한다
+    def fetch_dashboard_data(self, platform, model, start_date, end_date, map_file_path, dedup=False):
+        queries, pool = (dashboard_data, self.pool) if dedup else self.analytics_backend()
+        conn = self.connect(pool)
+        try:
+            if dedup: df = dashboard_data.read_dashboard_groups(conn, model, start_date, end_date, map_file_path, dedup=True)
+            else: df = queries.read_dashboard_groups(conn, model, start_date, end_date, map_file_path)
+            price_dist = queries.read_price_distribution(conn, platform, model, start_date, end_date)
+        finally: self.release_connection(conn, pool)
+        return summarize_groups(df, platform, price_dist)
+
+    # 가격 추이 (일/주/월 단위 + 이동 평균, 점이 많으면 LTTB로 줄임)
+    def fetch_price_trend(self, platform, model, start_date, end_date, unit='자동'):
+        queries, pool = self.analytics_backend()
+        conn = self.connect(pool)
+        try: return queries.read_price_trend(conn, platform, model, start_date, end_date, unit)
+        finally: self.release_connection(conn, pool)
+
+    # 기종 비교 (선택한 기종 × 플랫폼을 GROUP BY 한 번으로 조회)
+    def fetch_model_comparison(self, models, platforms, start_date, end_date, unit='자동'):
+        queries, pool = self.analytics_backend()
+        conn = self.connect(pool)
+        try: df, used_unit = queries.read_model_comparison(conn, models, platforms, start_date, end_date, unit)
+        finally: self.release_connection(conn, pool)
+        return summarize_comparison(df), used_unit
+
+    # 매핑 실패(미기재) 상세 목록 (동 단위 드릴다운은 posts에서 직접 조회)
+    def fetch_unmapped_details(self, platform, model, start_date, end_date, map_file_path):
+        conn = self.connect()
+        try: return read_unmapped_details(conn, platform, model, start_date, end_date, map_file_path)
+        finally: self.release_connection(conn)
+
+    # 매물 목록 드릴다운 (posted_date, post_id 기준 키셋 페이지네이션)
+    def fetch_listing_page(self, platform, model, start_date, end_date, after=None, limit=LISTING_PAGE_SIZE):
+        conn = self.connect()
+        try: return read_listing_page(conn, platform, model, start_date, end_date, after=after, limit=limit)
+        finally: self.release_connection(conn)
+
+    # 가격 인하 이력 (post_observations, 관측일 기준)
+    def fetch_price_drops(self, platform, model, start_date, end_date):
+        conn = self.connect()
+        try: return observations.read_price_drops(conn, platform, model, start_date, end_date)
+        finally: self.release_connection(conn)
+
+    # 기종별 게시 기간 (게시일 기준으로 고른 매물의 처음/마지막 관측일)
+    def fetch_days_on_market(self, platform, model, start_date, end_date):
+        conn = self.connect()
+        try: return observations.read_days_on_market(conn, platform, model, start_date, end_date)
+        finally: self.release_connection(conn)
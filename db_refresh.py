@@ -0,0 +1,297 @@
+# --- 적재 후처리: 제품 기종 분류 + 지역 구 보정 + 중복 매물 묶기 + 일별 집계(rollup) 테이블 생성/갱신 ---
+# 관측 이력(post_observations) 테이블이 없는 DB는 여기서 만들고 스테이징으로 한 번 채운다 (--full이면 다시 만듦).
+# ingest.py가 적재 후 자동으로 실행한다. DB Browser에서 "load" 스크립트를 직접 실행했다면 한 번 돌려 주면 된다.
+#   python db_refresh.py                 # 새 제품/지역 처리 + 새로 적재된(변경된) 날짜만 갱신
+#   python db_refresh.py --dates 2025-11-09 2025-11-10
+#   python db_refresh.py --full          # 전체 재처리 (model_keywords.csv, dong_gu_map.csv 수정 후)
+# duckdb가 설치되어 있으면 끝난 뒤 분석용 Parquet 스냅숏(snapshot/)도 다시 만든다 (columnar.py).
+import argparse
+import sqlite3
+import datetime
+
+import pandas as pd
+
+import columnar
+from dedup import cluster_listings, ensure_cluster_column
+from observations import ensure_observation_schema, refresh_observations
+from market_db import DB_FILE, MAP_FILE_PATH, get_mapping_index, classify_model, resolve_gu_series, price_bucket, table_exists, db_version_token
+
+# --- 집계 테이블 스키마 ---
+ROLLUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_rollup (
+  posted_date  TEXT NOT NULL,
+  platform_id  INTEGER NOT NULL REFERENCES platforms(platform_id),
+  model_family TEXT,               -- products.model_family ('iPhone 16', 분류 불가 시 NULL)
+  variant      TEXT,               -- products.variant ('Pro', 일반 모델은 '')
+  sigungu      TEXT,               -- 보정된 구 (NULL: 지역 정보가 연결되지 않은 게시물)
+  storage_gb   INTEGER,
+  post_count   INTEGER NOT NULL,
+  price_count  INTEGER NOT NULL,   -- 가격이 있는 게시물 수 (평균 계산용)
+  price_sum    INTEGER,
+  price_min    INTEGER,
+  price_max    INTEGER,
+  unique_count       INTEGER NOT NULL,   -- 중복 매물 묶음(dedup.py)의 대표 게시물만 센 수
+  unique_price_count INTEGER NOT NULL,
+  unique_price_sum   INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_rollup_model_date ON daily_rollup(model_family, variant, posted_date);
+CREATE INDEX IF NOT EXISTS idx_rollup_date       ON daily_rollup(posted_date);
+
+-- 가격 분포 스케치: (날짜, 플랫폼, 기종, 가격 구간)별 건수 (중앙값/분위수/히스토그램용)
+CREATE TABLE IF NOT EXISTS daily_price_hist (
+  posted_date  TEXT NOT NULL,
+  platform_id  INTEGER NOT NULL REFERENCES platforms(platform_id),
+  model_family TEXT,
+  variant      TEXT,
+  price_bucket INTEGER NOT NULL,   -- market_db.price_bucket(price_krw)
+  post_count   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_hist_model_date ON daily_price_hist(model_family, variant, posted_date);
+
+-- 날짜별로 마지막 집계 시점의 posts 상태를 기록해 변경된 날짜만 다시 집계
+CREATE TABLE IF NOT EXISTS rollup_state (
+  posted_date  TEXT PRIMARY KEY,
+  post_count   INTEGER NOT NULL,
+  max_post_id  INTEGER NOT NULL,
+  post_id_sum  INTEGER NOT NULL,   -- 지운 자리에 같은 post_id가 다시 들어와도(건수/최대값이 같아도) 바뀐 것을 알 수 있게
+  refreshed_at TEXT NOT NULL
+);
+"""
+
+
+def column_names(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def ensure_rollup_schema(conn):
+    """집계 테이블을 만든다. 예전 구조라서 지우고 새로 만들었으면 True (전체 날짜를 다시 집계해야 함)"""
+    # 기종 컬럼이 바뀌기 전(model_family만 있던) 집계 테이블이나
+    # 가격 분포 테이블이나 중복 제외 건수나 post_id 합계가 생기기 전에 집계된 DB는 새로 만든다
+    existing = column_names(conn, 'daily_rollup')
+    rebuild = bool(existing) and (
+        'variant' not in existing or 'unique_count' not in existing or not table_exists(conn, 'daily_price_hist')
+        or 'post_id_sum' not in column_names(conn, 'rollup_state'))
+    if rebuild:
+        conn.executescript("DROP TABLE daily_rollup; DROP TABLE IF EXISTS rollup_state;")
+    conn.executescript(ROLLUP_SCHEMA)
+    return rebuild
+
+
+# --- 제품 기종 분류 ---
+def ensure_product_columns(conn):
+    existing = column_names(conn, 'products')
+    for column in ('model_family', 'variant'):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE products ADD COLUMN {column} TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_family ON products(model_family, variant)")
+    conn.commit()
+
+
+def classify_products(conn, full=False):
+    """분류되지 않은(full이면 전체) 제품에 model_family/variant를 채운다. 변경된 제품 수 반환"""
+    ensure_product_columns(conn)
+    sql = "SELECT product_id, model, model_family, variant FROM products"
+    if not full: sql += " WHERE variant IS NULL"
+    updates = []
+    for product_id, model, old_family, old_variant in conn.execute(sql).fetchall():
+        family, variant = classify_model(model)
+        if (family, variant) != (old_family, old_variant):
+            updates.append((family, variant, product_id))
+    with conn:
+        conn.executemany("UPDATE products SET model_family = ?, variant = ? WHERE product_id = ?", updates)
+    return len(updates)
+
+
+def find_changed_dates(conn):
+    """posts의 날짜별 (건수, 최대 post_id, post_id 합계)가 rollup_state와 다른 날짜 목록"""
+    ensure_rollup_schema(conn)
+    current = {
+        row[0]: tuple(row[1:]) for row in conn.execute(
+            "SELECT posted_date, COUNT(*), MAX(post_id), SUM(post_id) FROM posts "
+            "WHERE posted_date IS NOT NULL GROUP BY posted_date"
+        )
+    }
+    recorded = {
+        row[0]: tuple(row[1:]) for row in conn.execute(
+            "SELECT posted_date, post_count, max_post_id, post_id_sum FROM rollup_state"
+        )
+    }
+    changed = {d for d, sig in current.items() if recorded.get(d) != sig}
+    changed |= set(recorded) - set(current)  # posts에서 사라진 날짜
+    return sorted(changed)
+
+
+# --- 후처리 상태 기록 (매핑 파일 해시 등) ---
+def get_meta(conn, key):
+    conn.execute("CREATE TABLE IF NOT EXISTS refresh_meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM refresh_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO refresh_meta (key, value) VALUES (?, ?)", (key, value))
+
+
+# --- 지역 구 보정 (시군구가 빈 지역은 dong_gu_map.csv로 구를 채워 regions에 저장) ---
+def ensure_region_columns(conn):
+    if 'resolved_sigungu' not in column_names(conn, 'regions'):
+        conn.execute("ALTER TABLE regions ADD COLUMN resolved_sigungu TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_regions_resolved ON regions(resolved_sigungu)")
+    conn.commit()
+
+
+def resolve_regions(conn, full=False, mapping_index=None):
+    """보정되지 않은 지역에 resolved_sigungu를 채운다. 변경된 region_id 목록 반환
+    dong_gu_map.csv 내용이 지난 실행과 달라졌으면 전체 지역을 다시 보정한다."""
+    ensure_region_columns(conn)
+    if mapping_index is None:
+        mapping_index = get_mapping_index(MAP_FILE_PATH)
+    if get_meta(conn, 'dong_map_digest') != mapping_index.digest:
+        full = True
+
+    sql = "SELECT region_id, sigungu, dong, resolved_sigungu FROM regions"
+    if not full: sql += " WHERE resolved_sigungu IS NULL"
+    df = pd.read_sql_query(sql, conn)
+
+    df['new_gu'] = resolve_gu_series(df['sigungu'], df['dong'], mapping_index)
+    changed = df[df['new_gu'] != df['resolved_sigungu']]
+    with conn:
+        conn.executemany(
+            "UPDATE regions SET resolved_sigungu = ? WHERE region_id = ?",
+            list(zip(changed['new_gu'], changed['region_id'].astype(int).tolist())),
+        )
+        set_meta(conn, 'dong_map_digest', mapping_index.digest)
+    return changed['region_id'].astype(int).tolist()
+
+
+def dates_for_regions(conn, region_ids):
+    """해당 지역 게시물이 있는 날짜 목록 (구 보정이 바뀐 날짜의 집계를 다시 만들 때 사용)"""
+    if not region_ids: return []
+    placeholders = ",".join("?" * len(region_ids))
+    rows = conn.execute(
+        f"SELECT DISTINCT posted_date FROM posts WHERE posted_date IS NOT NULL AND region_id IN ({placeholders})",
+        region_ids,
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def refresh_rollups(conn, dates=None):
+    """지정한 날짜(없으면 변경된 날짜)의 집계 행을 지우고 다시 만든다. 갱신한 날짜 목록 반환"""
+    if ensure_rollup_schema(conn) or dates is None:
+        dates = set(dates or []) | set(find_changed_dates(conn))
+    dates = sorted(set(str(d) for d in dates))
+    if not dates: return []
+
+    now = datetime.datetime.now().isoformat(timespec='seconds')
+    ensure_cluster_column(conn)
+    conn.create_function('price_bucket', 1, price_bucket, deterministic=True)
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS refresh_dates (posted_date TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM refresh_dates")
+        conn.executemany("INSERT INTO refresh_dates VALUES (?)", [(d,) for d in dates])
+
+        conn.execute("DELETE FROM daily_rollup WHERE posted_date IN (SELECT posted_date FROM refresh_dates)")
+        conn.execute("DELETE FROM daily_price_hist WHERE posted_date IN (SELECT posted_date FROM refresh_dates)")
+        conn.execute("DELETE FROM rollup_state WHERE posted_date IN (SELECT posted_date FROM refresh_dates)")
+        conn.execute("""
+        INSERT INTO daily_rollup (
+          posted_date, platform_id, model_family, variant, sigungu, storage_gb,
+          post_count, price_count, price_sum, price_min, price_max,
+          unique_count, unique_price_count, unique_price_sum
+        )
+        SELECT
+          p.posted_date,
+          p.platform_id,
+          pr.model_family,
+          pr.variant,
+          r.resolved_sigungu AS gu,
+          pr.storage_gb,
+          COUNT(p.post_id),
+          COUNT(p.price_krw),
+          SUM(p.price_krw),
+          MIN(p.price_krw),
+          MAX(p.price_krw),
+          SUM(p.post_id = COALESCE(p.listing_cluster_id, p.post_id)),
+          COUNT(CASE WHEN p.post_id = COALESCE(p.listing_cluster_id, p.post_id) THEN p.price_krw END),
+          SUM(CASE WHEN p.post_id = COALESCE(p.listing_cluster_id, p.post_id) THEN p.price_krw END)
+        FROM posts AS p
+        JOIN products AS pr ON p.product_id = pr.product_id
+        LEFT JOIN regions AS r ON p.region_id = r.region_id
+        WHERE p.posted_date IN (SELECT posted_date FROM refresh_dates)
+        GROUP BY p.posted_date, p.platform_id, pr.model_family, pr.variant, gu, pr.storage_gb
+        """)
+        conn.execute("""
+        INSERT INTO daily_price_hist (posted_date, platform_id, model_family, variant, price_bucket, post_count)
+        SELECT p.posted_date, p.platform_id, pr.model_family, pr.variant, price_bucket(p.price_krw) AS bucket, COUNT(*)
+        FROM posts AS p
+        JOIN products AS pr ON p.product_id = pr.product_id
+        WHERE p.posted_date IN (SELECT posted_date FROM refresh_dates) AND p.price_krw IS NOT NULL
+        GROUP BY p.posted_date, p.platform_id, pr.model_family, pr.variant, bucket
+        """)
+        conn.execute("""
+        INSERT INTO rollup_state (posted_date, post_count, max_post_id, post_id_sum, refreshed_at)
+        SELECT posted_date, COUNT(*), MAX(post_id), SUM(post_id), ?
+        FROM posts
+        WHERE posted_date IN (SELECT posted_date FROM refresh_dates)
+        GROUP BY posted_date
+        """, (now,))
+    return dates
+
+
+def refresh_database(db_file=DB_FILE, dates=None, full=False, snapshot_dir=columnar.SNAPSHOT_DIR, snapshot=True):
+    """후처리 전체(기종 분류 → 구 보정 → 집계 갱신 → 스냅숏)를 실행하고 결과를 출력한다"""
+    conn = sqlite3.connect(db_file)
+    try:
+        # 새 제품/지역은 새로 적재된 날짜의 게시물에만 쓰이므로 변경된 날짜만 다시 집계하면 된다
+        classified = classify_products(conn, full=full)
+        resolved = resolve_regions(conn, full=full)
+        # 관측 이력은 ingest.py가 적재할 때 갱신한다. 이력 테이블이 생기기 전에 적재한 DB만 여기서 채운다
+        observed = refresh_observations(conn) if ensure_observation_schema(conn) or full else None
+        if full:
+            conn.executescript("DROP TABLE IF EXISTS daily_rollup; DROP TABLE IF EXISTS daily_price_hist; DROP TABLE IF EXISTS rollup_state;")
+            dates = None
+        else:
+            dates = dates or find_changed_dates(conn)
+            dates = sorted(set(dates) | set(dates_for_regions(conn, resolved)))
+        # 중복 묶음은 기종/구를 쓰므로 그 뒤에, 바뀐 날짜 근처만 다시 묶고(full이면 전체) 대표가 바뀐 날짜도 다시 집계한다
+        clustered_dates, cluster_stats = cluster_listings(conn, dates)
+        if dates is not None: dates = sorted(set(dates) | set(clustered_dates))
+        refreshed = refresh_rollups(conn, dates=dates)
+    finally:
+        conn.close()
+
+    if classified:
+        print(f"✅ 제품 기종 분류: {classified}건")
+    if resolved:
+        print(f"✅ 지역 구 보정: {len(resolved)}건")
+    if observed is not None:
+        print(f"✅ 관측 이력: 가격 구간 {observed:,}개")
+    if cluster_stats['updated']:
+        print(f"✅ 중복 매물 묶기: 게시물 {cluster_stats['posts']:,}건을 다시 묶음 → {cluster_stats['clusters']:,}개 묶음, 중복 {cluster_stats['duplicates']:,}건")
+
+    if refreshed:
+        print(f"✅ 집계 갱신 완료: {len(refreshed)}일 ({refreshed[0]} ~ {refreshed[-1]})")
+    else:
+        print("변경된 날짜가 없습니다.")
+
+    # 스냅숏은 DB 버전이 달라졌을 때만 다시 만든다
+    if not snapshot or not columnar.duckdb_available(): return
+    meta = columnar.read_meta(snapshot_dir)
+    if meta is not None and meta.get('db_version') == db_version_token(db_file): return
+    meta = columnar.export_snapshot(db_file, snapshot_dir)
+    print(f"✅ Parquet 스냅숏: {meta['rows']:,}건, {len(meta['partitions'])}개 월 파티션 ({meta['export_seconds']}초)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="제품 기종 분류, 지역 구 보정 및 일별 집계(rollup) 테이블 갱신")
+    parser.add_argument("--db", default=str(DB_FILE), help="대상 DB 파일 (기본: project2.db)")
+    parser.add_argument("--dates", nargs="*", help="다시 집계할 날짜 (YYYY-MM-DD)")
+    parser.add_argument("--full", action="store_true", help="전체 제품/지역 재처리 및 집계 테이블 재생성")
+    parser.add_argument("--snapshot-dir", default=str(columnar.SNAPSHOT_DIR), help="Parquet 스냅숏 폴더 (기본: snapshot/)")
+    parser.add_argument("--no-snapshot", action="store_true", help="Parquet 스냅숏을 만들지 않음")
+    args = parser.parse_args()
+    refresh_database(args.db, dates=args.dates, full=args.full, snapshot_dir=args.snapshot_dir, snapshot=not args.no_snapshot)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# --- 플랫폼 간 중복 매물 묶기 (posts.listing_cluster_id) ---
+# 같은 판매자가 당근마켓/번개장터/중고나라에 같은 폰을 함께 올리면 매물 수 KPI와 플랫폼 파이가 부풀려진다.
+# 게시물마다 지문(정규화한 제목, 가격, 용량, 색상, 구, 게시일)을 만들고, 플랫폼이 다르면서 지문이 맞는 게시물을
+# 한 묶음으로 본다. 묶음에서 가장 먼저 올라온 게시물이 대표이고 그 post_id가 listing_cluster_id다 (혼자면 자기 post_id).
+# 모든 쌍을 비교하지 않고 블로킹으로 후보 쌍만 만든다:
+#   · 블록: (기종, 가격 칸, 게시일 칸). 칸은 반 칸씩 어긋난 격자 두 벌이라 허용 범위 안의 두 값은 적어도 한 번 같은 칸에 들어간다.
+#   · 블록 안에서는 제목 3-gram MinHash를 LSH 밴드로 나눠, 같은 밴드 값을 가진 게시물끼리만 비교한다.
+#   · 버킷 안은 (게시일, 가격) 순으로 정렬해 앞뒤 BLOCK_NEIGHBORS개와만 짝짓는다 (같은 제목이 몰린 큰 버킷도 선형).
+#     묶음은 확인된 쌍을 이어서 만들므로 이웃끼리만 이어져도 같은 매물은 한 묶음이 된다.
+#   · 버킷 키는 (격자, 밴드)마다 한 벌씩 만들어 정렬하고 버린다 (게시물당 키 64개를 한꺼번에 들고 있지 않게).
+# 한 묶음에는 플랫폼마다 게시물이 하나만 들어간다. 제목이 비슷한 쌍부터 잇고, 같은 플랫폼 게시물이 겹치게 되는 연결은 건너뛴다
+# (흔한 제목의 서로 다른 매물이 A-B-C로 줄줄이 엮이지 않게).
+# 후보 쌍은 가격 차, 게시일 차, 제목 자카드 유사도를 확인하고, 용량/색상/구는 양쪽 다 있을 때만 맞아야 한다.
+# db_refresh.py가 기종 분류/구 보정 뒤에 실행하고, 대표 여부가 바뀐 게시물의 날짜는 집계를 다시 만든다.
+# 이때는 새로 적재된(바뀐) 날짜 근처만 다시 묶는다: 후보 쌍은 게시일 차가 DATE_WINDOW_DAYS 이하이므로
+# 바뀐 날짜 ±2*DATE_WINDOW_DAYS(바뀐 게시물과 그 짝, 짝의 짝)의 게시물과 그 게시물이 속한 기존 묶음 전체만 읽는다.
+#   python dedup.py                          # project2.db의 묶음을 전체 다시 계산하고 요약 출력
+#   python dedup.py --dates 2025-11-09       # 그 날짜 근처만 다시 묶기
+import argparse
+import datetime
+import re
+import sqlite3
+import time
+import unicodedata
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from market_db import DB_FILE, UNKNOWN_GU
+
+PRICE_TOLERANCE_KRW = 50_000   # 같은 매물로 볼 가격 차 (미만)
+DATE_WINDOW_DAYS = 2           # 같은 매물로 볼 게시일 차 (이하)
+TITLE_SIMILARITY = 0.5         # 제목 3-gram 자카드 유사도 (이상)
+SHINGLE_SIZE = 3
+MINHASH_BANDS, MINHASH_ROWS = 16, 2   # 유사도 0.5인 쌍이 후보가 될 확률 약 99%
+BLOCK_NEIGHBORS = 5
+MINHASH_SEED = 20251109
+
+# 색상은 영문/한글이 섞여 있어 한글로 맞춘 뒤 공백을 뺀다 ('Black Titanium' → '블랙티타늄')
+COLOR_WORDS = {
+    'black': '블랙', 'white': '화이트', 'blue': '블루', 'natural': '내추럴', 'desert': '데저트',
+    'titanium': '티타늄', 'space': '스페이스', 'silver': '실버', 'gold': '골드', 'deep': '딥',
+    'purple': '퍼플', 'pink': '핑크', 'green': '그린', 'yellow': '옐로우', 'red': '레드',
+    'midnight': '미드나이트', 'starlight': '스타라이트', 'ultramarine': '울트라마린', 'teal': '틸',
+    '네추럴': '내추럴', '옐로': '옐로우',
+}
+COLOR_PATTERN = re.compile('|'.join(sorted(map(re.escape, COLOR_WORDS), key=len, reverse=True)))
+TITLE_STRIP = re.compile(r'[^0-9a-z가-힣]+')
+
+
+# --- 지문 ---
+def normalize_title(title):
+    """소문자 + 전각/호환 문자 정리 + 한글/영문/숫자만 남김"""
+    return TITLE_STRIP.sub('', unicodedata.normalize('NFKC', title or '').lower())
+
+
+def title_shingles(text):
+    """정규화한 제목의 3-gram 집합"""
+    if len(text) <= SHINGLE_SIZE: return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def normalize_color(color):
+    if not isinstance(color, str): return None
+    text = COLOR_PATTERN.sub(lambda m: COLOR_WORDS[m.group(0)], color.lower())
+    return text.replace(' ', '') or None
+
+
+def colors_match(a, b):
+    # '블랙'과 '블랙티타늄'처럼 한쪽만 자세히 적은 경우는 같은 색으로 본다
+    if not isinstance(a, str) or not isinstance(b, str): return True
+    return a in b or b in a
+
+
+def minhash_signatures(shingle_sets, num_perm=MINHASH_BANDS * MINHASH_ROWS, seed=MINHASH_SEED):
+    """(게시물 수, num_perm) uint64 MinHash 서명. 3-gram은 crc32로 정수화하고 (a*x + b) mod p로 순열을 흉내 낸다"""
+    prime = np.uint64((1 << 61) - 1)
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), num_perm), np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i, shingles in enumerate(shingle_sets):
+        if not shingles: continue
+        x = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        signatures[i] = ((np.outer(x, a) + b) % prime).min(axis=0)
+    return signatures
+
+
+# --- 후보 쌍 (블로킹 + LSH) ---
+def grid_cells(values, width):
+    """반 칸 어긋난 격자 두 벌의 칸 번호 (n, 2). 차이가 width/2 미만인 두 값은 적어도 한 열에서 칸이 같다"""
+    values = np.asarray(values, dtype=np.int64)
+    return np.stack([values // width, (values + width // 2) // width], axis=1)
+
+
+def combine_hashes(*columns):
+    """열마다 pd.util.hash_array를 구해 하나의 uint64 키로 합친다"""
+    key = np.zeros(len(columns[0]), dtype=np.uint64)
+    for column in columns:
+        key = key * np.uint64(1_000_003) ^ pd.util.hash_array(np.asarray(column))
+    return key
+
+
+def candidate_pairs(listings, signatures, neighbors=BLOCK_NEIGHBORS):
+    """같은 (기종, 가격 칸, 게시일 칸, LSH 밴드 값) 버킷에서 정렬 순서로 가까운, 플랫폼이 다른 게시물 쌍 (i < j) DataFrame
+    signatures는 제목별 MinHash 서명 (listings['title_code']번째 행)"""
+    n = len(listings)
+    if n < 2: return pd.DataFrame({'i': np.zeros(0, dtype=np.int64), 'j': np.zeros(0, dtype=np.int64)})
+    models = pd.factorize(listings['model'])[0]
+    title_codes = listings['title_code'].to_numpy()
+    days, prices = listings['day'].to_numpy(), listings['price_krw'].to_numpy()
+    platforms = listings['platform_id'].to_numpy()
+    price_cells = grid_cells(prices, 2 * PRICE_TOLERANCE_KRW)
+    date_cells = grid_cells(days, 2 * DATE_WINDOW_DAYS + 2)
+    block_keys = [
+        combine_hashes(np.full(n, price_grid * 2 + date_grid), models, price_cells[:, price_grid], date_cells[:, date_grid])
+        for price_grid in range(2) for date_grid in range(2)
+    ]
+    # (게시일, 가격) 순으로 늘어놓은 뒤 키로 안정 정렬하면 버킷 안도 (게시일, 가격) 순이 된다
+    rank = np.lexsort((prices, days))
+    codes = []
+    for band in range(MINHASH_BANDS):
+        band_codes = []
+        rows = signatures[:, band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+        band_key = combine_hashes(np.full(n, band), *(rows[title_codes, row] for row in range(MINHASH_ROWS)))
+        for block_key in block_keys:
+            keys = (block_key * np.uint64(1_000_003) ^ band_key)[rank]
+            order = np.argsort(keys, kind='stable')
+            keys, idx = keys[order], rank[order]
+            for k in range(1, neighbors + 1):
+                same = keys[:-k] == keys[k:]
+                i, j = idx[:-k][same], idx[k:][same]
+                cross = platforms[i] != platforms[j]
+                i, j = i[cross], j[cross]
+                band_codes.append(np.minimum(i, j) * n + np.maximum(i, j))
+        # 밴드마다 중복 쌍을 줄여 둔다 (같은 매물은 여러 격자/밴드에서 다시 나온다)
+        codes.append(pd.unique(np.concatenate(band_codes)))
+    codes = np.sort(pd.unique(np.concatenate(codes)))
+    return pd.DataFrame({'i': codes // n, 'j': codes % n})
+
+
+def verify_pairs(listings, shingle_sets, pairs):
+    """후보 쌍 중 같은 매물로 볼 쌍만 제목 유사도(similarity)와 함께 남긴다 (shingle_sets는 listings['title_code']번째 제목의 3-gram)"""
+    def column(name, side):
+        return listings[name].to_numpy()[pairs[side].to_numpy()]
+
+    def same_or_missing(name):
+        left, right = column(name, 'i'), column(name, 'j')
+        return pd.isna(left) | pd.isna(right) | (left == right)
+
+    if pairs.empty: return pairs.assign(similarity=[])
+    ok = (
+        (column('platform_id', 'i') != column('platform_id', 'j'))
+        & (column('model', 'i') == column('model', 'j'))
+        & (np.abs(column('price_krw', 'i') - column('price_krw', 'j')) < PRICE_TOLERANCE_KRW)
+        & (np.abs(column('day', 'i') - column('day', 'j')) <= DATE_WINDOW_DAYS)
+        & same_or_missing('storage_gb') & same_or_missing('gu')
+    )
+    pairs = pairs[ok]
+    pairs = pairs[[colors_match(a, b) for a, b in zip(column('color', 'i'), column('color', 'j'))]]
+    if pairs.empty: return pairs.assign(similarity=[])
+
+    # 제목 유사도는 서로 다른 제목 쌍마다 한 번만 계산
+    title_pairs = pd.DataFrame({'a': column('title_code', 'i'), 'b': column('title_code', 'j')})
+    unique_pairs = title_pairs.drop_duplicates()
+    similarity = pd.Series([
+        1.0 if a == b else len(shingle_sets[a] & shingle_sets[b]) / max(len(shingle_sets[a] | shingle_sets[b]), 1)
+        for a, b in zip(unique_pairs['a'], unique_pairs['b'])
+    ], index=pd.MultiIndex.from_frame(unique_pairs))
+    pairs = pairs.assign(similarity=similarity.reindex(pd.MultiIndex.from_frame(title_pairs)).to_numpy())
+    return pairs[pairs['similarity'] >= TITLE_SIMILARITY]
+
+
+def connected_components(listings, pairs):
+    """쌍으로 이어진 게시물 묶음 번호 (union-find). 제목이 비슷한 쌍부터 잇고, 플랫폼이 겹치는 연결은 건너뛴다
+    순서가 같은 쌍은 post_id로 정해, 일부 날짜만 다시 묶어도 전체를 묶을 때와 같은 순서로 잇는다"""
+    n = len(listings)
+    parent = np.arange(n)
+    platform_masks = [1 << (int(p) % 63) for p in listings['platform_id']]
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    prices, post_ids = listings['price_krw'].to_numpy(), listings['post_id'].to_numpy()
+    left, right = pairs['i'].to_numpy(), pairs['j'].to_numpy()
+    pairs = pairs.assign(
+        price_gap=np.abs(prices[left] - prices[right]),
+        first=np.minimum(post_ids[left], post_ids[right]), second=np.maximum(post_ids[left], post_ids[right]),
+    ).sort_values(['similarity', 'price_gap', 'first', 'second'], ascending=[False, True, True, True])
+    for i, j in zip(pairs['i'], pairs['j']):
+        ri, rj = find(i), find(j)
+        if ri == rj or platform_masks[ri] & platform_masks[rj]: continue
+        root, child = min(ri, rj), max(ri, rj)
+        parent[child] = root
+        platform_masks[root] |= platform_masks[child]
+    return np.array([find(i) for i in range(n)])
+
+
+# --- DB ---
+def ensure_cluster_column(conn):
+    """묶음 컬럼을 만든다. 새로 만들었으면 True (전체 게시물을 묶어야 함)"""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(posts)")]
+    created = 'listing_cluster_id' not in columns
+    if created:
+        conn.execute("ALTER TABLE posts ADD COLUMN listing_cluster_id INTEGER")  # 묶음 대표 게시물의 post_id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_cluster ON posts(listing_cluster_id)")
+    conn.commit()
+    return created
+
+
+LISTING_SQL = """
+SELECT p.post_id, p.platform_id, pf.name AS platform, p.ext_post_id, p.posted_date, p.price_krw, p.title,
+       p.listing_cluster_id, pr.model_family, pr.variant, pr.storage_gb, pr.color, r.resolved_sigungu AS gu
+FROM posts AS p
+JOIN platforms AS pf ON p.platform_id = pf.platform_id
+LEFT JOIN products AS pr ON p.product_id = pr.product_id
+LEFT JOIN regions AS r ON p.region_id = r.region_id
+"""
+# 다시 묶을 범위: cluster_scope에 담긴 묶음의 게시물 전체 (묶음이 없던 새 게시물은 자기 post_id로 담긴다)
+SCOPE_SQL = LISTING_SQL + """
+WHERE p.listing_cluster_id IN (SELECT cluster_id FROM cluster_scope)
+   OR p.post_id IN (SELECT cluster_id FROM cluster_scope)
+"""
+
+
+def scope_windows(dates, days=2 * DATE_WINDOW_DAYS):
+    """날짜마다 ±days를 잡고 겹치거나 이어지는 구간을 합친 (시작, 끝) 문자열 목록"""
+    windows = []
+    for day in sorted(pd.to_datetime(pd.Series(list(dates), dtype=object), errors='coerce').dropna().dt.date.unique()):
+        start, end = day - datetime.timedelta(days=days), day + datetime.timedelta(days=days)
+        if windows and start <= windows[-1][1] + datetime.timedelta(days=1): windows[-1][1] = max(windows[-1][1], end)
+        else: windows.append([start, end])
+    return [(start.isoformat(), end.isoformat()) for start, end in windows]
+
+
+def read_scope(conn, dates):
+    """dates 근처(scope_windows) 게시물이 속한 묶음의 게시물 전체"""
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS cluster_scope (cluster_id INTEGER PRIMARY KEY)")
+    with conn:
+        conn.execute("DELETE FROM cluster_scope")
+        for start, end in scope_windows(dates):
+            conn.execute(
+                "INSERT OR IGNORE INTO cluster_scope SELECT COALESCE(listing_cluster_id, post_id) FROM posts "
+                "WHERE posted_date BETWEEN ? AND ?", (start, end)
+            )
+    return pd.read_sql_query(SCOPE_SQL, conn)
+
+
+def cluster_listings(conn, dates=None):
+    """listing_cluster_id를 다시 계산해 바뀐 것만 저장한다. (대표 여부가 바뀐 게시물의 날짜 목록, 요약 dict) 반환
+    dates를 주면 그 날짜 근처의 게시물과 그 게시물이 속한 묶음만 다시 묶는다 (요약도 그 범위 기준).
+    묶음 컬럼이 새로 생겼거나 dates가 None이면 전체를 묶는다."""
+    if ensure_cluster_column(conn): dates = None
+    posts = pd.read_sql_query(LISTING_SQL, conn) if dates is None else read_scope(conn, dates)
+    cluster_ids = posts['post_id'].to_numpy().copy()
+
+    # 기종/가격/게시일이 있어야 블록에 넣을 수 있다 (나머지는 혼자인 묶음)
+    eligible = posts['model_family'].notna() & posts['price_krw'].notna() & posts['posted_date'].notna()
+    listings = posts[eligible].reset_index()
+    listings['day'] = (pd.to_datetime(listings['posted_date'], errors='coerce') - pd.Timestamp('1970-01-01')).dt.days
+    listings = listings[listings['day'].notna()].reset_index(drop=True)
+    listings['day'] = listings['day'].astype(np.int64)
+    listings['price_krw'] = listings['price_krw'].astype(np.int64)
+    listings['gu'] = listings['gu'].where(listings['gu'] != UNKNOWN_GU)
+    listings['color'] = [normalize_color(c) for c in listings['color']]
+    listings['model'] = listings['model_family'] + '|' + listings['variant'].fillna('')
+
+    # 같은 제목(정규화 후)은 3-gram/MinHash를 한 번만 만든다
+    listings['title_code'], titles = pd.factorize(listings['title'].map(normalize_title))
+    shingle_sets = [title_shingles(t) for t in titles]
+    signatures = minhash_signatures(shingle_sets)
+    pairs = verify_pairs(listings, shingle_sets, candidate_pairs(listings, signatures))
+    components = connected_components(listings, pairs)
+
+    # 대표: 묶음에서 게시일이 가장 빠른 게시물 (같으면 플랫폼명, 게시글_ID 순. post_id는 적재 순서라 다시 적재하면 바뀔 수 있다)
+    order = listings.assign(component=components).sort_values(['component', 'day', 'platform', 'ext_post_id'], kind='stable')
+    representative = order.groupby('component')['post_id'].transform('first')
+    cluster_ids[order['index'].to_numpy()] = representative.to_numpy()
+
+    old = posts['listing_cluster_id']
+    changed = old.isna() | (old.to_numpy() != cluster_ids)
+    was_representative = old.isna() | (old.to_numpy() == posts['post_id'].to_numpy())
+    is_representative = cluster_ids == posts['post_id'].to_numpy()
+    updates = list(zip(cluster_ids[changed].tolist(), posts.loc[changed, 'post_id'].tolist()))
+    with conn:
+        conn.executemany("UPDATE posts SET listing_cluster_id = ? WHERE post_id = ?", updates)
+
+    flipped = posts.loc[was_representative != is_representative, 'posted_date'].dropna()
+    stats = {
+        'posts': len(posts),
+        'candidates': len(listings),
+        'pairs': len(pairs),
+        'duplicates': int((~is_representative).sum()),
+        'clusters': int(pd.Series(cluster_ids[~is_representative]).nunique()),
+        'updated': len(updates),
+    }
+    return sorted(set(flipped)), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="플랫폼 간 중복 매물을 묶어 posts.listing_cluster_id 갱신")
+    parser.add_argument("--db", default=str(DB_FILE), help="대상 DB 파일 (기본: project2.db)")
+    parser.add_argument("--dates", nargs="*", help="이 날짜(YYYY-MM-DD) 근처만 다시 묶기 (기본: 전체)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        start = time.perf_counter()
+        dates, stats = cluster_listings(conn, args.dates)
+        seconds = time.perf_counter() - start
+    finally:
+        conn.close()
+    print(
+        f"✅ 중복 매물: {stats['clusters']:,}개 묶음, 중복 {stats['duplicates']:,}건 "
+        f"(게시물 {stats['posts']:,}건, 확인한 후보 쌍 중 {stats['pairs']:,}쌍 일치, {seconds:.2f}초)"
+    )
+    if dates: print(f"   대표가 바뀐 날짜 {len(dates)}일: python db_refresh.py --dates {' '.join(dates)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# --- 플랫폼별 일일 CSV 일괄 적재: CSV 폴더 → staging_posts → 정규 테이블(load) → 후처리(db_refresh) ---
+# DB Browser에서 CSV를 하나씩 가져오고 project2.sqbpro의 "load" 스크립트를 돌리던 작업을 한 번에 한다.
+#   python ingest.py                         # 당근마켓/ 번개장터/ 중고나라/ 전체 적재 + 후처리
+#   python ingest.py 번개장터 --workers 4
+#   python ingest.py --no-refresh            # 적재만 (후처리는 나중에 python db_refresh.py)
+#   python ingest.py --force                 # manifest를 무시하고 모든 파일을 다시 적재
+# ingest_manifest에 파일별 (경로, 크기, 수정 시각, SHA-256, 행 수)를 기록해 새 파일/바뀐 파일만 적재한다.
+#   · 크기와 수정 시각이 같으면 읽지 않고, 다르면 해시를 비교해 내용이 같으면 기록만 고친다.
+#   · 바뀐 파일은 그 파일이 전에 넣은 스테이징 행(staging_posts.source_file)과 그 행으로 들어간 게시물을 지우고 다시 넣는다.
+# CSV 파싱은 프로세스 풀에서 파일 단위로 나눠 하고, 스테이징 INSERT는 BATCH_ROWS건씩 executemany로 넣는다.
+# 스테이징 교체 → 게시물 적재 → manifest 기록 → 관측 이력은 트랜잭션 하나: 중간에 멈추면 모두 취소되고
+# 다음 실행이 같은 파일을 처음부터 다시 적재한다 (바뀐 파일의 이전 게시물 키를 잃어 고아 게시물이 남지 않게).
+# 게시물은 (플랫폼, 게시글_ID)마다 하나: 여러 파일(날짜)에 나온 매물은 (파일 경로, 파일 안 행 번호) 순으로 먼저 나온 행으로 적재된다.
+# 스테이징에 들어간 순서가 아니라서, 바뀐 파일만 다시 넣어도(다시 넣은 행은 rowid가 뒤로 밀린다) 전체 적재와 같은 행이 남는다.
+# 날짜별 가격은 post_observations(observations.py)에 남는다: 이번에 적재한 게시물의 관측 구간도 같은 트랜잭션에서 다시 만든다.
+import argparse
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import columnar
+from db_refresh import refresh_database
+from market_db import BASE_DIR, DB_FILE
+from observations import REFRESH_OBSERVATIONS_SQL, ensure_observation_schema, refresh_observations
+
+PLATFORM_DIRS = ['당근마켓', '번개장터', '중고나라']  # BASE_DIR 아래 플랫폼별 CSV 폴더
+BATCH_ROWS = 5000
+
+# 스테이징 컬럼 (CSV 한글 헤더 그대로). 번개장터 크롤러는 "플랫폼명" 대신 "플랫폼"을 쓴다.
+STAGING_COLUMNS = ['플랫폼명', '게시글_ID', '가격', 'URL', '모델명', '제목', '용량', '시도', '시군구', '동읍면', '색상', '작성일']
+HEADER_ALIASES = {'플랫폼': '플랫폼명'}
+PRICE_INDEX = STAGING_COLUMNS.index('가격')
+
+# --- 스키마 (project2.sqbpro의 "schema"와 같음, 빈 DB에도 적재할 수 있게 IF NOT EXISTS) ---
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS staging_posts (
+  "플랫폼명"  TEXT,
+  "게시글_ID" TEXT,
+  "가격"      INTEGER,
+  "URL"      TEXT,
+  "모델명"    TEXT,
+  "제목"      TEXT,
+  "용량"      TEXT,    -- '256GB','1TB' 등
+  "시도"      TEXT,
+  "시군구"    TEXT,
+  "동읍면"    TEXT,
+  "색상"      TEXT,
+  "작성일"    TEXT,    -- YYYY-MM-DD 권장
+  source_file TEXT,    -- 이 행을 가져온 CSV (ingest_manifest.path)
+  source_row  INTEGER  -- 그 CSV 안의 행 번호 (헤더와 빈 줄 제외, 1부터)
+);
+
+-- 적재한 CSV 기록 (다음 실행에서 새 파일/바뀐 파일만 적재)
+CREATE TABLE IF NOT EXISTS ingest_manifest (
+  path        TEXT PRIMARY KEY,   -- BASE_DIR 기준 상대 경로
+  size        INTEGER NOT NULL,
+  mtime_ns    INTEGER NOT NULL,
+  sha256      TEXT NOT NULL,
+  row_count   INTEGER NOT NULL,
+  ingested_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS platforms (
+  platform_id INTEGER PRIMARY KEY,
+  name        TEXT UNIQUE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS products (
+  product_id INTEGER PRIMARY KEY,
+  model      TEXT NOT NULL,
+  storage_gb INTEGER,
+  color      TEXT,
+  UNIQUE (model, storage_gb, color)
+);
+
+CREATE TABLE IF NOT EXISTS regions (
+  region_id INTEGER PRIMARY KEY,
+  sido      TEXT,
+  sigungu   TEXT,
+  dong      TEXT,
+  UNIQUE (sido, sigungu, dong)
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+  post_id     INTEGER PRIMARY KEY,
+  platform_id INTEGER NOT NULL REFERENCES platforms(platform_id),
+  product_id  INTEGER REFERENCES products(product_id),
+  ext_post_id TEXT,
+  title       TEXT NOT NULL,
+  price_krw   INTEGER,
+  posted_date TEXT,
+  url         TEXT,
+  region_id   INTEGER REFERENCES regions(region_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_posts_platform ON posts(platform_id);
+CREATE INDEX IF NOT EXISTS idx_posts_product  ON posts(product_id);
+CREATE INDEX IF NOT EXISTS idx_posts_date     ON posts(posted_date);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_posts_platform_ext
+ON posts(platform_id, ext_post_id);
+"""
+
+# --- 이번 실행 범위 (임시 테이블: 이번에 적재한 파일, 바뀐 파일이 전에 넣었던 게시물 키, 정규화한 적재 대상 행) ---
+INGEST_TEMP_SQL = """
+CREATE TEMP TABLE IF NOT EXISTS ingest_files (
+  path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT, row_count INTEGER
+);
+CREATE TEMP TABLE IF NOT EXISTS ingest_keys (
+  platform TEXT, ext_post_id TEXT, PRIMARY KEY (platform, ext_post_id)
+) WITHOUT ROWID;
+CREATE TEMP TABLE IF NOT EXISTS load_rows (
+  staging_rowid INTEGER PRIMARY KEY, source_file TEXT, source_row INTEGER,
+  platform TEXT, ext_post_id TEXT, title TEXT, price_krw INTEGER, posted_date TEXT, url TEXT,
+  model TEXT, storage_gb INTEGER, color TEXT, sido TEXT, sigungu TEXT, dong TEXT
+);
+DELETE FROM ingest_files;
+DELETE FROM ingest_keys;
+"""
+
+# --- 차원/사실 테이블 적재 (project2.sqbpro의 "load" 스크립트를 이번 실행 범위로 좁힘) ---
+# 적재할 스테이징 행을 한 번 정규화(TRIM/빈 문자열→NULL/용량 단위 변환)해 load_rows에 담고,
+# 차원은 NULL끼리도 같게 보는 IS 비교로 찾는다. IS는 UNIQUE 인덱스를 탈 수 있어서
+# 원래 스크립트의 OR 조건 조인(스테이징 × 제품 × 지역 중첩 루프)이 행마다 인덱스 조회 한 번이 된다.
+# UNIQUE 제약은 NULL끼리 같다고 보지 않으므로, 다시 적재해도 NULL이 섞인 지역/제품이
+# 중복으로 쌓이지 않게 2), 3)은 INSERT OR IGNORE 대신 NOT EXISTS(IS 비교)로 거른다.
+# PRAGMA foreign_keys는 트랜잭션 안에서 바꿀 수 없어서 WRITE_PRAGMAS로 옮겼다.
+LOAD_SQL = """
+-- 0) 바뀐 파일이 전에 넣었던 게시물 삭제 (아래 4에서 남은 스테이징 행으로 다시 적재, 관측 이력은 6에서)
+DELETE FROM post_observations WHERE post_id IN (
+  SELECT p.post_id
+  FROM ingest_keys k
+  JOIN platforms pf ON pf.name = k.platform
+  JOIN posts p ON p.platform_id = pf.platform_id AND p.ext_post_id = k.ext_post_id
+);
+DELETE FROM posts WHERE post_id IN (
+  SELECT p.post_id
+  FROM ingest_keys k
+  JOIN platforms pf ON pf.name = k.platform
+  JOIN posts p ON p.platform_id = pf.platform_id AND p.ext_post_id = k.ext_post_id
+);
+
+-- 적재 대상: 이번 파일의 행 + 0에서 지운 키의 남은 행 (용량 정규화: 1TB→1024)
+DELETE FROM load_rows;
+INSERT INTO load_rows
+SELECT
+  s.rowid,
+  s.source_file,
+  s.source_row,
+  NULLIF(TRIM(s."플랫폼명"), ''),
+  s."게시글_ID",
+  s."제목",
+  s."가격",
+  s."작성일",
+  s."URL",
+  NULLIF(TRIM(s."모델명"), ''),
+  CASE
+    WHEN s."용량" IS NULL OR TRIM(s."용량")='' THEN NULL
+    WHEN UPPER(s."용량") LIKE '%TB%' THEN
+      1024 * CAST(REPLACE(REPLACE(UPPER(s."용량"), 'TB',''),' ','') AS INTEGER)
+    ELSE
+      CAST(REPLACE(REPLACE(UPPER(s."용량"), 'GB',''),' ','') AS INTEGER)
+  END,
+  NULLIF(TRIM(s."색상"),   ''),
+  NULLIF(TRIM(s."시도"),   ''),
+  NULLIF(TRIM(s."시군구"), ''),
+  NULLIF(TRIM(s."동읍면"), '')
+FROM staging_posts s
+WHERE s.rowid IN (
+  SELECT rowid FROM staging_posts WHERE source_file IN (SELECT path FROM ingest_files)
+  UNION
+  SELECT st.rowid FROM ingest_keys k
+  JOIN staging_posts st ON st."플랫폼명" = k.platform AND st."게시글_ID" = k.ext_post_id
+);
+
+-- 1) 플랫폼 적재
+INSERT OR IGNORE INTO platforms(name)
+SELECT DISTINCT platform FROM load_rows WHERE platform IS NOT NULL;
+
+-- 2) 지역 적재
+INSERT INTO regions(sido, sigungu, dong)
+SELECT DISTINCT sido, sigungu, dong
+FROM load_rows s
+WHERE NOT EXISTS (
+  SELECT 1 FROM regions rg WHERE rg.sido IS s.sido AND rg.sigungu IS s.sigungu AND rg.dong IS s.dong
+);
+
+-- 3) 제품 적재
+INSERT INTO products(model, storage_gb, color)
+SELECT DISTINCT model, storage_gb, color
+FROM load_rows s
+WHERE model IS NOT NULL AND NOT EXISTS (
+  SELECT 1 FROM products pr WHERE pr.model = s.model AND pr.storage_gb IS s.storage_gb AND pr.color IS s.color
+);
+
+-- 4) 게시물 적재 (파일 경로, 파일 안 행 번호 순으로 먼저 나온 행이 남음, 예전 적재로 중복된 차원 행은 id가 작은 쪽)
+--    출처를 모르는 예전 스테이징 행(source_file NULL)은 스테이징 순서
+INSERT OR IGNORE INTO posts (
+  platform_id, product_id, ext_post_id, title, price_krw, posted_date, url, region_id
+)
+SELECT
+  pf.platform_id,
+  pr.product_id,
+  s.ext_post_id,
+  s.title,
+  s.price_krw,
+  s.posted_date,
+  s.url,
+  rg.region_id
+FROM load_rows s
+JOIN platforms pf ON pf.name = s.platform
+LEFT JOIN products pr
+  ON pr.model = s.model AND pr.storage_gb IS s.storage_gb AND pr.color IS s.color
+LEFT JOIN regions rg
+  ON rg.sido IS s.sido AND rg.sigungu IS s.sigungu AND rg.dong IS s.dong
+ORDER BY s.source_file, s.source_row, s.staging_rowid, pr.product_id, rg.region_id;
+
+-- 5) manifest 기록
+INSERT OR REPLACE INTO ingest_manifest (path, size, mtime_ns, sha256, row_count, ingested_at)
+SELECT path, size, mtime_ns, sha256, row_count, strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')
+FROM ingest_files;
+
+-- 6) 관측 이력 대상: 이번에 적재한 키의 게시물 (구간은 REFRESH_OBSERVATIONS_SQL로 다시 만듦)
+DELETE FROM observation_posts;
+INSERT OR IGNORE INTO observation_posts
+SELECT p.post_id
+FROM load_rows s
+JOIN platforms pf ON pf.name = s.platform
+JOIN posts p ON p.platform_id = pf.platform_id AND p.ext_post_id = s.ext_post_id;
+"""
+
+# executescript는 열린 트랜잭션을 먼저 COMMIT하므로 문장 단위로 실행한다 (주석/문자열에 ';' 없음)
+LOAD_STATEMENTS = [sql for sql in LOAD_SQL.split(";") if sql.strip()]
+
+STAGING_COLUMN_LIST = ", ".join(f'"{name}"' for name in STAGING_COLUMNS)
+INSERT_STAGING_SQL = (
+    f"INSERT INTO staging_posts ({STAGING_COLUMN_LIST}, source_file, source_row) "
+    f"VALUES ({', '.join('?' * (len(STAGING_COLUMNS) + 2))})"
+)
+WRITE_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",     # 64MB
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def find_csv_files(dirs):
+    """폴더별 CSV 파일 목록 (폴더 순서 → 파일 이름 순서)"""
+    return [path for d in dirs for path in sorted(Path(d).glob("*.csv"))]
+
+
+def parse_price(text):
+    # 크롤러에 따라 '750000.0'처럼 실수로 저장된 가격이 있다
+    try: return int(float(text))
+    except ValueError: return text
+
+
+def ensure_ingest_schema(conn):
+    conn.executescript(SCHEMA_SQL)
+    # DB Browser로 만든 스테이징 테이블에는 출처 컬럼이 없다
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(staging_posts)")]
+    if 'source_file' not in columns:
+        conn.execute("ALTER TABLE staging_posts ADD COLUMN source_file TEXT")
+    if 'source_row' not in columns:
+        conn.execute("ALTER TABLE staging_posts ADD COLUMN source_row INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_staging_source ON staging_posts(source_file)")
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_staging_key ON staging_posts("플랫폼명", "게시글_ID")')
+    conn.executescript(INGEST_TEMP_SQL)
+    # 이력 테이블이 생기기 전에 적재한 DB는 지금 있는 스테이징으로 한 번 채운다
+    if ensure_observation_schema(conn): refresh_observations(conn)
+
+
+def manifest_path(path):
+    """manifest에 기록하는 경로 (BASE_DIR 아래면 상대 경로라서 저장소 위치가 바뀌어도 그대로 쓸 수 있다)"""
+    path = Path(path).resolve()
+    try: return path.relative_to(BASE_DIR.resolve()).as_posix()
+    except ValueError: return path.as_posix()
+
+
+def plan_files(conn, files, force=False):
+    """다시 읽을 파일 목록 [(경로, manifest 경로, 크기, mtime_ns, 비교할 해시, 새 파일 여부)]와 건너뛴 파일 수
+    크기와 수정 시각이 manifest와 같으면 건너뛴다. force면 해시도 비교하지 않고 모두 다시 적재한다."""
+    manifest = {row[0]: row[1:] for row in conn.execute("SELECT path, size, mtime_ns, sha256 FROM ingest_manifest")}
+    candidates, skipped = [], 0
+    for path in files:
+        stat = path.stat()
+        key = manifest_path(path)
+        known = manifest.get(key)
+        if known and not force and known[:2] == (stat.st_size, stat.st_mtime_ns):
+            skipped += 1
+            continue
+        candidates.append((path, key, stat.st_size, stat.st_mtime_ns, None if force or not known else known[2], not known))
+    return candidates, skipped
+
+
+# --- CSV 파싱 (프로세스 풀에서 실행되므로 모듈 최상위 함수) ---
+def parse_csv_text(text, path):
+    """CSV 내용을 스테이징 컬럼 순서의 튜플 리스트로 (값 앞뒤 공백 제거, 빈 칸은 NULL, 헤더 별칭 처리)"""
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = [HEADER_ALIASES.get(name.strip(), name.strip()) for name in next(reader, [])]
+    missing = [name for name in STAGING_COLUMNS if name not in header]
+    if missing: raise ValueError(f"{path}: 필요한 컬럼이 없습니다 {missing}")
+    indexes = [header.index(name) for name in STAGING_COLUMNS]
+    rows = []
+    for record in reader:
+        if not any(record): continue
+        row = [(record[i].strip() if i < len(record) else '') or None for i in indexes]
+        if row[PRICE_INDEX] is not None: row[PRICE_INDEX] = parse_price(row[PRICE_INDEX])
+        rows.append(tuple(row))
+    return rows
+
+
+def read_csv_file(path, known_hash=None):
+    """(SHA-256, 행 목록). 내용이 known_hash와 같으면 파싱하지 않고 행 목록 대신 None"""
+    data = Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == known_hash: return digest, None
+    return digest, parse_csv_text(data.decode('utf-8-sig'), path)
+
+
+def stage_files(conn, candidates, workers=None, batch_rows=BATCH_ROWS):
+    """후보 파일을 병렬로 읽어 바뀐 파일만 스테이징에 교체 적재. 통계 dict 반환
+    바뀐 파일이 전에 넣었던 게시물 키는 ingest_keys에, 적재한 파일은 ingest_files에 모아 load_staging에 넘긴다.
+    커밋하지 않는다: load_staging까지 호출한 쪽의 트랜잭션 하나로 묶는다 (main 참고)."""
+    stats = {'new': 0, 'changed': 0, 'unchanged': 0, 'rows': 0}
+    # DB Browser로 가져온 예전 스테이징 행은 출처를 모르므로 지운다 (이미 적재된 게시물은 그대로 둔다)
+    conn.execute("DELETE FROM staging_posts WHERE source_file IS NULL")
+    replaced, batch, touched = [], [], []
+
+    def flush():
+        for key in replaced:
+            conn.execute(
+                'INSERT OR IGNORE INTO ingest_keys SELECT "플랫폼명", "게시글_ID" FROM staging_posts '
+                'WHERE source_file = ? AND "플랫폼명" IS NOT NULL AND "게시글_ID" IS NOT NULL', (key,)
+            )
+            conn.execute("DELETE FROM staging_posts WHERE source_file = ?", (key,))
+        conn.executemany(INSERT_STAGING_SQL, batch)
+        replaced.clear()
+        batch.clear()
+
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(candidates) // (workers * 4))
+    paths = [c[0] for c in candidates]
+    known_hashes = [c[4] for c in candidates]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(read_csv_file, paths, known_hashes, chunksize=chunksize)
+        for (path, key, size, mtime_ns, _, is_new), (digest, rows) in zip(candidates, results):
+            if rows is None:
+                # 수정 시각만 바뀌고 내용은 같음
+                touched.append((size, mtime_ns, key))
+                stats['unchanged'] += 1
+                continue
+            stats['new' if is_new else 'changed'] += 1
+            stats['rows'] += len(rows)
+            conn.execute("INSERT OR REPLACE INTO ingest_files VALUES (?, ?, ?, ?, ?)", (key, size, mtime_ns, digest, len(rows)))
+            replaced.append(key)
+            batch.extend(row + (key, number) for number, row in enumerate(rows, 1))
+            if len(batch) >= batch_rows: flush()
+    if batch or replaced: flush()
+    conn.executemany("UPDATE ingest_manifest SET size = ?, mtime_ns = ? WHERE path = ?", touched)
+    return stats
+
+
+def load_staging(conn):
+    """이번에 적재한 파일의 스테이징 행 → platforms/regions/products/posts + manifest 기록 + 관측 이력
+    (들어간 게시물 수, 바뀐 파일 때문에 먼저 지운 게시물 수) 반환. stage_files처럼 커밋하지 않는다."""
+    before = conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    deleted = conn.execute(
+        "SELECT COUNT(*) FROM ingest_keys k JOIN platforms pf ON pf.name = k.platform "
+        "JOIN posts p ON p.platform_id = pf.platform_id AND p.ext_post_id = k.ext_post_id"
+    ).fetchone()[0]
+    for sql in LOAD_STATEMENTS + list(REFRESH_OBSERVATIONS_SQL):
+        conn.execute(sql)
+    return conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] - before + deleted, deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="플랫폼별 CSV 폴더를 staging_posts에 일괄 적재하고 정규 테이블/집계까지 갱신")
+    parser.add_argument("dirs", nargs="*", default=PLATFORM_DIRS, help="CSV 폴더 (기본: 당근마켓 번개장터 중고나라)")
+    parser.add_argument("--db", default=str(DB_FILE), help="대상 DB 파일 (기본: project2.db)")
+    parser.add_argument("--workers", type=int, default=None, help="CSV 파싱 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS, help=f"트랜잭션당 INSERT 행 수 (기본: {BATCH_ROWS})")
+    parser.add_argument("--force", action="store_true", help="manifest를 무시하고 모든 파일을 다시 적재")
+    parser.add_argument("--no-refresh", action="store_true", help="적재 후 db_refresh 후처리를 하지 않음")
+    parser.add_argument("--snapshot-dir", default=str(columnar.SNAPSHOT_DIR), help="Parquet 스냅숏 폴더 (기본: snapshot/)")
+    parser.add_argument("--no-snapshot", action="store_true", help="Parquet 스냅숏을 만들지 않음")
+    args = parser.parse_args()
+
+    dirs = [d if Path(d).is_absolute() else BASE_DIR / d for d in args.dirs]
+    files = find_csv_files(dirs)
+    if not files:
+        print("적재할 CSV 파일이 없습니다.")
+        return
+
+    conn = sqlite3.connect(args.db)
+    try:
+        for pragma in WRITE_PRAGMAS:
+            conn.execute(pragma)
+        ensure_ingest_schema(conn)
+
+        # 스테이징 → 적재 → manifest → 관측 이력을 한 트랜잭션으로 (예외가 나면 with conn이 모두 되돌린다)
+        with conn:
+            start = time.perf_counter()
+            candidates, skipped = plan_files(conn, files, force=args.force)
+            stats = stage_files(conn, candidates, workers=args.workers, batch_rows=args.batch_rows)
+            stage_seconds = time.perf_counter() - start
+            staged = stats['rows']
+            print(
+                f"✅ 스테이징: 새 파일 {stats['new']}개, 바뀐 파일 {stats['changed']}개, {staged:,}행 "
+                f"({stage_seconds:.2f}초, {staged / max(stage_seconds, 1e-9):,.0f}행/초) · "
+                f"그대로인 파일 {skipped + stats['unchanged']}개"
+            )
+            if not stats['new'] and not stats['changed']:
+                print("새로 적재할 파일이 없습니다.")
+                return
+
+            start = time.perf_counter()
+            inserted, deleted = load_staging(conn)
+            load_seconds = time.perf_counter() - start
+        print(
+            f"✅ 게시물 적재: {inserted:,}건, 바뀐 파일의 이전 게시물 삭제 {deleted:,}건 "
+            f"({load_seconds:.2f}초, {staged / max(load_seconds, 1e-9):,.0f}행/초)"
+        )
+    finally:
+        conn.close()
+
+    total_seconds = stage_seconds + load_seconds
+    print(f"   전체 {total_seconds:.2f}초, {staged / max(total_seconds, 1e-9):,.0f}행/초")
+    if not args.no_refresh:
+        refresh_database(args.db, snapshot_dir=args.snapshot_dir, snapshot=not args.no_snapshot)
+
+
+if __name__ == "__main__":
+    main()
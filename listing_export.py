@@ -0,0 +1,89 @@
+# --- 필터된 매물 내보내기 (CSV / Excel) ---
+# 대시보드 필터(build_dynamic_query_parts)에 맞는 게시물 전체를 커서에서 EXPORT_CHUNK_ROWS건씩 읽어 바로 쓴다.
+# 결과 전체를 DataFrame으로 만들지 않으므로 건수와 상관없이 메모리 사용량이 일정하다.
+#   · CSV: 청크마다 인코딩한 bytes를 내보내는 제너레이터 (HTTP 응답에 그대로 흘려보낼 수 있음)
+#   · XLSX: openpyxl write-only 모드 (행을 임시 파일로 바로 내려쓰고 셀 객체를 쌓지 않음)
+import csv
+import io
+import tempfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from dashboard_data import listing_query
+from market_db import model_label
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_FORMATS = {
+    # 형식: (확장자, MIME)
+    'CSV': ('csv', 'text/csv'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+EXPORT_QUERY_COLUMNS = ['posted_date', 'platform', 'model_family', 'variant', 'title', 'price_krw', 'region', 'url', 'post_id']
+EXPORT_HEADER = ['작성일', '플랫폼', '기종', '제목', '가격(원)', '지역', '링크', '게시물 ID']
+SPOOL_MAX_BYTES = 16 * 1024 * 1024  # 이보다 큰 파일은 메모리 대신 임시 파일에 쓴다
+
+
+def export_file_name(platform, model, start_date, end_date, fmt):
+    return f"매물_{platform}_{model}_{start_date}_{end_date}.{EXPORT_FORMATS[fmt][0]}".replace(" ", "_")
+
+
+def iter_listing_rows(conn, platform, model, start_date, end_date, chunk_rows=EXPORT_CHUNK_ROWS):
+    """필터에 맞는 게시물을 최신순으로 chunk_rows건씩 (EXPORT_HEADER 순서의 튜플 리스트)"""
+    sql, params = listing_query(platform, model, start_date, end_date, columns=EXPORT_QUERY_COLUMNS)
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows: return
+            yield [
+                (posted_date, platform_name, model_label(family, variant), title, price, region, url, post_id)
+                for posted_date, platform_name, family, variant, title, price, region, url, post_id in rows
+            ]
+    finally:
+        cursor.close()
+
+
+def iter_listing_csv(conn, platform, model, start_date, end_date, chunk_rows=EXPORT_CHUNK_ROWS):
+    """CSV bytes 조각 제너레이터 (UTF-8 BOM: 엑셀에서 한글이 깨지지 않게)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_HEADER)
+    yield buffer.getvalue().encode('utf-8-sig')
+    for rows in iter_listing_rows(conn, platform, model, start_date, end_date, chunk_rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+
+
+def write_listing_csv(conn, platform, model, start_date, end_date, fileobj):
+    for chunk in iter_listing_csv(conn, platform, model, start_date, end_date):
+        fileobj.write(chunk)
+
+
+def write_listing_xlsx(conn, platform, model, start_date, end_date, fileobj):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("매물")
+    ws.freeze_panes = "A2"
+    bold = Font(bold=True)
+    header = []
+    for name in EXPORT_HEADER:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.font = bold
+        header.append(cell)
+    ws.append(header)
+    for rows in iter_listing_rows(conn, platform, model, start_date, end_date):
+        for row in rows:
+            ws.append(row)
+    wb.save(fileobj)
+
+
+def export_listings(conn, platform, model, start_date, end_date, fmt='CSV'):
+    """내보낸 파일을 처음 위치로 되감은 파일 객체로 반환 (작으면 메모리, 크면 임시 파일)"""
+    fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    if fmt == 'Excel': write_listing_xlsx(conn, platform, model, start_date, end_date, fileobj)
+    else: write_listing_csv(conn, platform, model, start_date, end_date, fileobj)
+    fileobj.seek(0)
+    return fileobj
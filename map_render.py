@@ -0,0 +1,99 @@
+# --- 서울 구별 매물 수 지도 그리기 (Streamlit 없이 import 가능) ---
+import io
+
+from PIL import Image, ImageDraw, ImageFont
+
+from market_db import BASE_DIR
+
+# --- 지도 이미지 설정 ---
+# ✅ 코드 파일과 같은 위치에서 찾도록 수정
+SEOUL_MAP_FILE = BASE_DIR / "서울지도보기.jpg"
+
+# --- 지도 좌표 설정 (사용자 지정 좌표 유지) ---
+SEOUL_GU_COORDINATES = {
+    '도봉구': (285, 60),  '노원구': (322, 80),  '강북구': (258, 88),
+    '은평구': (167, 106),  '성북구': (258, 140), '중랑구': (340, 147),
+    '서대문구': (178, 165), '종로구': (225, 160), '동대문구': (303, 160),
+    '마포구': (148, 187), '중구': (243, 190),   '성동구': (290, 202),
+    '광진구': (335, 210), '강동구': (395, 198),
+    '강서구': (55, 180),  '양천구': (90, 240),  '구로구': (75, 270),
+    '영등포구': (146, 230), '동작구': (190, 258), '용산구': (225, 230),
+    '금천구': (130, 300), '관악구': (190, 300), '서초구': (255, 283),
+    '강남구': (305, 265), '송파구': (360, 250)
+}
+
+
+# --- 지도 원 스타일 (색상 로직: 초록 -> 노랑 -> 빨강) ---
+# 원 크기/색은 이미지 렌더링과 Plotly 렌더링이 같은 규칙을 쓴다.
+REF_MAX_COUNT = 40.0
+
+
+def circle_style(count):
+    # 비율
+    ratio = min(count / REF_MAX_COUNT, 1.0)
+    
+    # 크기: 5px ~ 25px
+    radius = 5 + (ratio * 20)
+    
+    # 💡 색상: 초록(적음) -> 노랑(중간) -> 빨강(많음)
+    if count <= 5:
+        outline_color = (0, 200, 0, 255) # 진한 초록
+    elif count <= 15:
+        outline_color = (255, 215, 0, 255) # 진한 노랑(Gold)
+    else:
+        outline_color = (255, 0, 0, 255) # 빨강
+    return radius, outline_color
+
+
+# 지도에 그릴 (구, 매물 수) 목록. 캐시 키로 쓰므로 순서를 고정한다.
+def seoul_gu_counts(region_df):
+    valid_df = region_df[region_df['sigungu'].isin(SEOUL_GU_COORDINATES.keys())]
+    pairs = [(gu, int(count)) for gu, count in zip(valid_df['sigungu'], valid_df['count'])]
+    return tuple(sorted(pairs, key=lambda pair: (-pair[1], pair[0])))
+
+
+# --- 지도 이미지 읽기/인코딩/그리기 ---
+def load_map_image(path=SEOUL_MAP_FILE):
+    try: return Image.open(path).convert("RGBA")
+    except FileNotFoundError: return None
+
+
+def encode_map_image(image, image_format):
+    img_buffer = io.BytesIO()
+    if image_format == 'PNG8':
+        # 색 수를 미리 줄인 팔레트 PNG (인코딩/전송 크기 감소)
+        image.convert("RGB").quantize(colors=128).save(img_buffer, format='PNG', optimize=False)
+    elif image_format in ('JPEG', 'WEBP'):
+        image.convert("RGB").save(img_buffer, format=image_format, quality=85)
+    else:
+        image.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+
+def draw_map_overlay(base_map, gu_counts, image_format='PNG'):
+    """기본 지도 복사본에 (구, 매물 수) 원을 그려 인코딩된 이미지 bytes 반환"""
+    base_image = base_map.copy()
+    draw = ImageDraw.Draw(base_image)
+    font = ImageFont.load_default() 
+    
+    for gu_name, count in reversed(gu_counts):
+        x, y = SEOUL_GU_COORDINATES[gu_name]
+        radius, outline_color = circle_style(count)
+        
+        # 원 그리기 (내부 비움)
+        draw.ellipse(
+            (x - radius, y - radius, x + radius, y + radius), 
+            fill=None, 
+            outline=outline_color, 
+            width=3 
+        )
+        
+        # 숫자 표시
+        if radius > 8:
+            text = str(count)
+            text_w = len(text) * 6 
+            text_h = 10
+            # 글자도 테두리 색과 동일하게
+            draw.text((x - text_w/2, y - text_h/2), text, fill=outline_color, font=font, stroke_width=0)
+
+    return encode_map_image(base_image, image_format)
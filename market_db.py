@@ -0,0 +1,330 @@
+# --- 대시보드와 적재 후처리 스크립트(db_refresh.py)가 함께 쓰는 공통 설정/함수 ---
+import hashlib
+import io
+import math
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+import unicodedata
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# --- 파일 경로 설정 ---
+BASE_DIR = Path(__file__).parent
+MAP_FILE_PATH = BASE_DIR / "dong_gu_map.csv"
+DB_FILE = BASE_DIR / "project2.db"
+
+UNKNOWN_GU = "지역 미기재"
+
+# --- 기종 분류 (model_keywords.csv 기반) ---
+# 모델명을 소문자/공백 제거 후 "시리즈 키워드 + 세대 숫자 + 세부모델 키워드"로 읽는다.
+# 새 시리즈나 세부모델(Air 등)은 CSV에 키워드만 추가하면 된다.
+MODEL_KEYWORDS_PATH = BASE_DIR / "model_keywords.csv"
+OTHER_MODEL = "기타"
+
+
+def _compact(text):
+    return re.sub(r'\s+', '', unicodedata.normalize('NFC', str(text))).lower()
+
+
+@lru_cache(maxsize=None)
+def load_model_keywords(path=MODEL_KEYWORDS_PATH):
+    """(시리즈 사전, 세부모델 사전) 반환. 키는 긴 것부터 매칭되도록 정렬"""
+    series, variants = {}, {}
+    if not path.exists(): return series, variants
+    kw_df = pd.read_csv(path, encoding='utf-8-sig', dtype=str).fillna('')
+    for _, row in kw_df.iterrows():
+        key = _compact(row['keyword'])
+        if not key: continue
+        if row['kind'].strip() == 'series': series[key] = row['value'].strip()
+        elif row['kind'].strip() == 'variant': variants[key] = row['value'].strip()
+    by_length = lambda d: dict(sorted(d.items(), key=lambda kv: len(kv[0]), reverse=True))
+    return by_length(series), by_length(variants)
+
+
+def classify_model(model, keywords=None):
+    """'아이폰 16 프로' → ('iPhone 16', 'Pro'), 일반 모델은 variant ''. 분류 불가 시 (None, None)"""
+    if model is None or pd.isna(model): return None, None
+    series, variants = keywords or load_model_keywords()
+    text = _compact(model)
+    for key, name in series.items():
+        m = re.search(re.escape(key) + r'(\d+)', text)
+        if m: break
+    else:
+        return None, None
+    rest = text[m.end():]
+    variant = next((value for key, value in variants.items() if key in rest), '')
+    return f"{name} {m.group(1)}", variant
+
+
+def model_label(model_family, variant):
+    """('iPhone 16', 'Pro') → 'iPhone 16 Pro' (대시보드 표시명)"""
+    if not model_family: return OTHER_MODEL
+    return f"{model_family} {variant or ''}".strip()
+
+
+def model_sort_key(label):
+    family, variant = classify_model(label)
+    if family is None: return ('~', 0, '')
+    name, _, gen = family.rpartition(' ')
+    return (name, int(gen), (variant or '').lower())
+
+
+def model_filter_sql(model, alias='pr'):
+    """선택한 기종(표시명)에 해당하는 WHERE 조건(앞에 AND 포함)과 파라미터를 반환"""
+    family, variant = classify_model(model)
+    if family is None:
+        return f" AND {alias}.model_family IS NULL ", []
+    return f" AND {alias}.model_family = ? AND {alias}.variant = ? ", [family, variant]
+
+
+def models_filter_sql(models, alias='pr'):
+    """여러 기종(표시명) 중 하나에 해당하는 WHERE 조건(앞에 AND 포함)과 파라미터 (비교 모드용)"""
+    conditions, params = [], []
+    for model in models:
+        family, variant = classify_model(model)
+        if family is None:
+            conditions.append(f"{alias}.model_family IS NULL")
+        else:
+            conditions.append(f"({alias}.model_family = ? AND {alias}.variant = ?)")
+            params.extend([family, variant])
+    if not conditions: return " AND 0 ", []
+    return f" AND ({' OR '.join(conditions)}) ", params
+
+
+# --- 정규화 함수 (pandas Series, 빈 값은 NA) ---
+def normalize_keys(series):
+    keys = series.astype('string').str.normalize('NFC').str.replace(r'[^가-힣a-zA-Z0-9]', '', regex=True)
+    return keys.mask(keys == '')
+
+
+# --- 동→구 매핑 인덱스 ---
+# 정확한 정규화 키 외에 다음 변형도 찾는다.
+#   · '행당제2동' ↔ '행당2동' ('제' 표기 차이)
+#   · '논현1동' → '논현동' (번호 동인데 매핑에는 번호 없는 동만 있는 경우)
+#   · '논현동' → 강남구 (매핑의 '논현1동', '논현2동'이 모두 같은 구인 경우)
+# 매핑에 없는 번호 동을 형제 번호 동으로 추정하지는 않는다 (예: 효자4동 ≠ 종로구 효자1동).
+NUMBERED_DONG = r'\d+동$'
+
+
+def _canonical_keys(keys):
+    return keys.str.replace(r'제(\d+)', r'\1', regex=True)
+
+
+class DongMappingIndex:
+    def __init__(self, map_df=None, digest=None, stamp=None):
+        self.digest = digest
+        self.stamp = stamp
+        self.exact, self.unique, self.legal = {}, {}, {}
+        if map_df is None or map_df.empty: return
+
+        keys = _canonical_keys(normalize_keys(map_df['dong']))
+        gus = map_df['sigungu'].astype(str).str.strip()
+        valid = keys.notna()
+        keys, gus = keys[valid], gus[valid]
+        self.exact = dict(zip(keys, gus))  # 같은 동 이름이 여러 구에 있으면 마지막 행 (기존 동작 유지)
+        gus_by_key = gus.groupby(keys.values).agg(lambda s: s.unique())
+        self.unique = {key: gu_list[0] for key, gu_list in gus_by_key.items() if len(gu_list) == 1}
+
+        numbered = keys.str.contains(NUMBERED_DONG, na=False)
+        bases = keys[numbered].str.replace(NUMBERED_DONG, '동', regex=True)
+        gu_by_base = gus[numbered].groupby(bases.values).agg(lambda s: s.unique())
+        self.legal = {base: gu_list[0] for base, gu_list in gu_by_base.items() if len(gu_list) == 1}
+
+    def __len__(self):
+        return len(self.exact)
+
+    def map_keys(self, keys):
+        """정규화된 동 키 Series → 구 Series (못 찾으면 NA)"""
+        keys = _canonical_keys(keys.astype('string'))
+        gu = keys.map(self.exact)
+        numbered = keys.str.contains(NUMBERED_DONG, na=False)
+        bases = keys.str.replace(NUMBERED_DONG, '동', regex=True)
+        gu = gu.fillna(bases.where(numbered).map(self.unique))
+        gu = gu.fillna(keys.where(~numbered).map(self.legal))
+        return gu
+
+    def map_dongs(self, dongs):
+        return self.map_keys(normalize_keys(dongs))
+
+
+# --- 매핑 인덱스 캐시 (프로세스당 1회, 파일이 바뀌었을 때만 다시 만듦) ---
+# mtime/크기가 바뀌면 내용 해시를 확인해서, 내용까지 바뀐 경우에만 인덱스를 새로 만든다.
+_mapping_indexes = {}
+_mapping_lock = threading.Lock()
+
+
+def _read_mapping_csv(data):
+    try: text = data.decode('utf-8-sig')
+    except UnicodeDecodeError: text = data.decode('cp949')
+    map_df = pd.read_csv(io.StringIO(text), dtype=str)
+    map_df.columns = map_df.columns.str.strip()
+    return map_df
+
+
+def get_mapping_index(map_file_path=MAP_FILE_PATH):
+    path = Path(map_file_path)
+    try:
+        stat = path.stat()
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return DongMappingIndex()
+
+    with _mapping_lock:
+        cached = _mapping_indexes.get(path)
+        if cached is not None and cached.stamp == stamp: return cached
+        data = path.read_bytes()
+        digest = hashlib.sha1(data).hexdigest()
+        if cached is not None and cached.digest == digest:
+            cached.stamp = stamp
+            return cached
+        try: index = DongMappingIndex(_read_mapping_csv(data), digest, stamp)
+        except Exception: index = DongMappingIndex(digest=digest, stamp=stamp)
+        _mapping_indexes[path] = index
+        return index
+
+
+# --- 구 결정 (시군구가 비어 있으면 동 이름으로 매핑, 실패 시 '지역 미기재') ---
+def resolve_gu_series(sigungu, dong, mapping_index):
+    gu_text = sigungu.astype('string').str.strip()
+    has_gu = gu_text.notna() & ~gu_text.isin(['None', 'nan', ''])
+    mapped = mapping_index.map_dongs(dong).fillna(UNKNOWN_GU)
+    return sigungu.astype(object).where(has_gu, mapped.astype(object))
+
+
+# --- 가격 분포 스케치 (로그 구간 히스토그램) ---
+# 가격을 상대 오차 PRICE_SKETCH_ALPHA 이내의 로그 구간 번호로 바꿔 (날짜, 플랫폼, 기종)별 건수로 저장한다.
+# 구간별 건수는 더하기만 하면 합쳐지므로, 기간이 길어도 게시물 수가 아니라 구간 수에 비례해 분위수를 구한다.
+PRICE_SKETCH_ALPHA = 0.005
+PRICE_SKETCH_GAMMA = (1 + PRICE_SKETCH_ALPHA) / (1 - PRICE_SKETCH_ALPHA)
+
+
+def price_bucket(price):
+    """가격 → 구간 번호 (0원 이하는 -1, 가격 없음은 None). SQLite 함수로도 등록해서 쓴다"""
+    if price is None: return None
+    if price < 1: return -1
+    return math.ceil(math.log(price) / math.log(PRICE_SKETCH_GAMMA))
+
+
+def bucket_prices(buckets):
+    """구간 번호 Series → 구간 대표 가격 Series (구간 안의 어떤 가격과도 상대 오차 ALPHA 이내)"""
+    buckets = buckets.astype(float)
+    prices = 2 * np.power(PRICE_SKETCH_GAMMA, buckets) / (PRICE_SKETCH_GAMMA + 1)
+    return prices.where(buckets >= 0, 0.0)
+
+
+# --- DB 버전 토큰 (적재/후처리로 파일이 바뀌면 달라짐, 결과 캐시 키에 사용) ---
+def db_version_token(db_file=DB_FILE):
+    try:
+        stat = os.stat(db_file)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+    except OSError:
+        return "missing"
+
+
+# --- 테이블 존재 여부 ---
+def table_exists(conn, name):
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+# --- 읽기 전용 연결 풀 ---
+# 연결마다 PRAGMA 설정/스키마 파싱/페이지 캐시를 다시 만들지 않도록 연결을 재사용한다.
+# check_same_thread=False로 열지만 한 연결은 한 번에 한 스레드만 빌려 쓴다.
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON",
+    "PRAGMA mmap_size = 268435456",   # 256MB
+    "PRAGMA cache_size = -65536",     # 64MB (음수: KiB 단위)
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+class ReadOnlyPool:
+    def __init__(self, db_file=DB_FILE, size=4, timeout=10.0, cached_statements=256):
+        self.db_file = Path(db_file)
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._file_ids = {}  # id(conn) -> 연결 당시 DB 파일 (inode, 장치)
+
+    def _file_id(self):
+        st = os.stat(self.db_file)
+        return (st.st_ino, st.st_dev)
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            f"file:{self.db_file}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=self.cached_statements,
+        )
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        self._file_ids[id(conn)] = self._file_id()
+        return conn
+
+    def _discard(self, conn):
+        self._file_ids.pop(id(conn), None)
+        try: conn.close()
+        except sqlite3.Error: pass
+        with self._lock:
+            self._created -= 1
+
+    def _is_healthy(self, conn):
+        # DB 파일이 통째로 교체되었으면(재생성) 예전 파일을 보고 있으므로 버린다
+        try:
+            if self._file_ids.get(id(conn)) != self._file_id(): return False
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except (sqlite3.Error, OSError):
+            return False
+
+    def acquire(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create: self._created += 1
+                if can_create:
+                    try:
+                        return self._connect()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("DB 연결 풀 대기 시간 초과")
+            if self._is_healthy(conn): return conn
+            self._discard(conn)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            try: conn.rollback()
+            except sqlite3.Error:
+                self._discard(conn)
+                return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try: yield conn
+        finally: self.release(conn)
+
+    def close_all(self):
+        while True:
+            try: self._discard(self._idle.get_nowait())
+            except queue.Empty: return
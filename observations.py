@@ -0,0 +1,231 @@
+# --- 매물 관측 이력: 같은 매물이 날짜별 CSV에 다시 나올 때의 가격 변화 / 게시 기간 ---
+# posts는 (플랫폼, 게시글_ID)마다 처음 본 행 하나만 남기므로, 이후 날짜의 가격은 staging_posts에만 있다.
+# post_observations는 게시물별 (관측일, 가격)을 날짜순으로 늘어놓고 가격이 그대로인 연속 관측을
+# 구간 하나(first_seen ~ last_seen, 관측 횟수)로 묶어 저장한다. 매일 다시 올라오는 매물도 가격이 바뀔 때만 행이 는다.
+# 관측일은 CSV의 작성일이다 (파일 하나가 그날 수집한 목록이라 같은 파일의 행은 작성일이 모두 같다).
+# ingest.py가 적재할 때 이번에 건드린 게시물만 스테이징에서 다시 만든다.
+#   python observations.py --rebuild             # 전체 다시 만들기 (이력 테이블이 생기기 전에 적재한 DB)
+#   python observations.py --model "iPhone 16 Pro" --start 2025-10-20 --end 2025-11-09
+import argparse
+import sqlite3
+
+import pandas as pd
+
+from market_db import DB_FILE, model_filter_sql, model_label, model_sort_key, table_exists
+
+OBSERVATION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_observations (
+  post_id    INTEGER NOT NULL REFERENCES posts(post_id),
+  first_seen TEXT NOT NULL,      -- 이 가격으로 처음 본 날
+  last_seen  TEXT NOT NULL,      -- 이 가격으로 마지막으로 본 날 (다음 구간 전까지)
+  price_krw  INTEGER,
+  seen_count INTEGER NOT NULL,   -- 구간 안의 관측(날짜) 수
+  PRIMARY KEY (post_id, first_seen)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_observations_first_seen ON post_observations(first_seen);
+CREATE INDEX IF NOT EXISTS idx_observations_last_seen  ON post_observations(last_seen);
+
+-- 관측 구간을 다시 만들 게시물
+CREATE TEMP TABLE IF NOT EXISTS observation_posts (post_id INTEGER PRIMARY KEY);
+"""
+
+# observation_posts에 담긴 게시물의 관측 구간을 스테이징에서 다시 만든다 (트랜잭션 안에서 순서대로 실행)
+# 같은 날 여러 파일(기종별 검색 결과)에 나온 매물은 그날 (파일 경로, 파일 안 행 번호) 순으로 먼저 나온 행의 가격을 쓴다
+# (ingest.py가 게시물을 고르는 순서와 같음, 출처가 없는 예전 스테이징 행은 스테이징 순서).
+REFRESH_OBSERVATIONS_SQL = (
+    "DELETE FROM post_observations WHERE post_id IN (SELECT post_id FROM observation_posts)",
+    """
+    WITH sightings AS (
+      SELECT p.post_id, s."작성일" AS seen_date, s."가격" AS price_krw,
+        ROW_NUMBER() OVER (PARTITION BY p.post_id, s."작성일" ORDER BY s.source_file, s.source_row, s.rowid) AS pick
+      FROM observation_posts o
+      JOIN posts p ON p.post_id = o.post_id
+      JOIN platforms pf ON pf.platform_id = p.platform_id
+      JOIN staging_posts s ON s."플랫폼명" = pf.name AND s."게시글_ID" = p.ext_post_id
+      WHERE s."작성일" IS NOT NULL
+    ), seen AS (
+      SELECT post_id, seen_date, price_krw FROM sightings WHERE pick = 1
+    ), flagged AS (
+      SELECT post_id, seen_date, price_krw,
+        CASE WHEN LAG(seen_date) OVER w IS NOT NULL AND LAG(price_krw) OVER w IS price_krw THEN 0 ELSE 1 END AS new_run
+      FROM seen
+      WINDOW w AS (PARTITION BY post_id ORDER BY seen_date)
+    ), runs AS (
+      SELECT post_id, seen_date, price_krw, SUM(new_run) OVER (PARTITION BY post_id ORDER BY seen_date) AS run
+      FROM flagged
+    )
+    INSERT INTO post_observations (post_id, first_seen, last_seen, price_krw, seen_count)
+    SELECT post_id, MIN(seen_date), MAX(seen_date), price_krw, COUNT(*)
+    FROM runs
+    GROUP BY post_id, run
+    """,
+)
+
+
+def ensure_observation_schema(conn):
+    """이력 테이블을 만든다. 새로 만들었으면 True (이미 적재된 게시물의 이력을 채워야 함)"""
+    created = not table_exists(conn, 'post_observations')
+    conn.executescript(OBSERVATION_SCHEMA)
+    return created
+
+
+def refresh_observations(conn, post_ids=None):
+    """지정한 게시물(없으면 전체)의 관측 구간을 다시 만든다. 저장된 구간 수 반환"""
+    ensure_observation_schema(conn)
+    with conn:
+        conn.execute("DELETE FROM observation_posts")
+        if post_ids is None: conn.execute("INSERT INTO observation_posts SELECT post_id FROM posts")
+        else: conn.executemany("INSERT OR IGNORE INTO observation_posts VALUES (?)", [(int(i),) for i in post_ids])
+        for sql in REFRESH_OBSERVATIONS_SQL:
+            conn.execute(sql)
+    return conn.execute(
+        "SELECT COUNT(*) FROM post_observations WHERE post_id IN (SELECT post_id FROM observation_posts)"
+    ).fetchone()[0]
+
+
+# --- 조회 ---
+def filter_sql(platform, model, start_date, end_date, date_column):
+    """WHERE 절과 파라미터 (dashboard_data.build_dynamic_query_parts와 같은 조건, 기종은 없으면 전체)"""
+    where_clause = f" WHERE {date_column} BETWEEN ? AND ? "
+    params = [str(start_date), str(end_date)]
+    if platform != '전체':
+        where_clause += " AND pf.name = ? "
+        params.append(platform)
+    if model:
+        model_sql, model_params = model_filter_sql(model, 'pr')
+        where_clause += model_sql
+        params.extend(model_params)
+    return where_clause, params
+
+
+def read_latest_seen(conn):
+    """가장 최근 관측일 (이날까지 보인 매물은 아직 게시 중으로 본다)"""
+    return conn.execute("SELECT MAX(last_seen) FROM post_observations").fetchone()[0]
+
+
+PRICE_DROP_COLUMNS = ['post_id', 'platform', 'model_family', 'variant', 'title', 'drop_date',
+                      'old_price', 'new_price', 'drop_krw', 'drop_pct', 'url']
+
+
+def read_price_drops(conn, platform, model, start_date, end_date):
+    """기간 안에 가격이 내려간 관측 (새 가격을 처음 본 날 기준, 최근순)
+    구간은 first_seen 인덱스로 찾고, 바로 앞 구간은 (post_id, first_seen) 기본 키로 하나씩 찾는다."""
+    where_clause, params = filter_sql(platform, model, start_date, end_date, 'o.first_seen')
+    sql = f"""
+    SELECT * FROM (
+      SELECT o.post_id, pf.name AS platform, pr.model_family, pr.variant, p.title, o.first_seen AS drop_date,
+        (SELECT q.price_krw FROM post_observations q
+         WHERE q.post_id = o.post_id AND q.first_seen < o.first_seen
+         ORDER BY q.first_seen DESC LIMIT 1) AS old_price,
+        o.price_krw AS new_price, p.url
+      FROM post_observations o
+      JOIN posts p ON p.post_id = o.post_id
+      JOIN platforms pf ON p.platform_id = pf.platform_id
+      JOIN products pr ON p.product_id = pr.product_id
+      {where_clause}
+    )
+    WHERE new_price < old_price
+    ORDER BY drop_date DESC, post_id
+    """
+    df = pd.read_sql_query(sql, conn, params=params)
+    df['drop_krw'] = df['old_price'] - df['new_price']
+    df['drop_pct'] = (df['drop_krw'] / df['old_price'] * 100).round(1)
+    return df[PRICE_DROP_COLUMNS]
+
+
+LIFETIME_COLUMNS = ['post_id', 'platform', 'model_family', 'variant', 'first_seen', 'last_seen',
+                    'days_on_market', 'price_runs', 'first_price', 'last_price']
+
+
+def read_listing_lifetimes(conn, platform, model, start_date, end_date):
+    """필터(게시일 기준, model이 없으면 전체 기종)에 맞는 게시물별 처음/마지막 관측일, 게시 일수, 처음/마지막 가격
+    게시물은 posts 인덱스로 고르고 구간은 기본 키로 읽으므로 전체 이력 길이와 상관없이 필터된 매물 수에 비례한다."""
+    where_clause, params = filter_sql(platform, model, start_date, end_date, 'p.posted_date')
+    sql = f"""
+    SELECT l.*,
+      CAST(julianday(l.last_seen) - julianday(l.first_seen) AS INTEGER) AS days_on_market,
+      (SELECT q.price_krw FROM post_observations q WHERE q.post_id = l.post_id
+       ORDER BY q.first_seen LIMIT 1) AS first_price,
+      (SELECT q.price_krw FROM post_observations q WHERE q.post_id = l.post_id
+       ORDER BY q.first_seen DESC LIMIT 1) AS last_price
+    FROM (
+      SELECT p.post_id, pf.name AS platform, pr.model_family, pr.variant,
+        MIN(o.first_seen) AS first_seen, MAX(o.last_seen) AS last_seen, COUNT(*) AS price_runs
+      FROM posts p
+      JOIN platforms pf ON p.platform_id = pf.platform_id
+      JOIN products pr ON p.product_id = pr.product_id
+      JOIN post_observations o ON o.post_id = p.post_id
+      {where_clause}
+      GROUP BY p.post_id
+    ) l
+    """
+    return pd.read_sql_query(sql, conn, params=params)[LIFETIME_COLUMNS]
+
+
+DAYS_ON_MARKET_COLUMNS = ['model', 'listings', 'active', 'ended', 'avg_days', 'median_days', 'max_days',
+                          'price_changed', 'price_dropped']
+
+
+def summarize_days_on_market(df, latest_seen):
+    """게시물별 이력 → 기종별 게시 기간 요약
+    게시 일수 통계는 마지막 관측일 전에 사라진(판매/삭제된) 매물만으로 낸다. 아직 게시 중인 매물은 active로 센다."""
+    if df.empty: return pd.DataFrame(columns=DAYS_ON_MARKET_COLUMNS)
+    df = df.assign(
+        model=[model_label(f, v) for f, v in zip(df['model_family'], df['variant'])],
+        is_active=df['last_seen'] == latest_seen,
+        changed=df['price_runs'] > 1,
+        dropped=df['last_price'] < df['first_price'],
+    )
+    ended_days = df['days_on_market'].where(~df['is_active'])
+    summary = df.assign(ended_days=ended_days).groupby('model').agg(
+        listings=('post_id', 'size'),
+        active=('is_active', 'sum'),
+        avg_days=('ended_days', 'mean'),
+        median_days=('ended_days', 'median'),
+        max_days=('ended_days', 'max'),
+        price_changed=('changed', 'sum'),
+        price_dropped=('dropped', 'sum'),
+    ).reset_index()
+    summary['ended'] = summary['listings'] - summary['active']
+    summary['avg_days'] = summary['avg_days'].round(1)
+    summary = summary.sort_values('model', key=lambda s: s.map(model_sort_key)).reset_index(drop=True)
+    return summary[DAYS_ON_MARKET_COLUMNS]
+
+
+def read_days_on_market(conn, platform, model, start_date, end_date):
+    """(기종별 게시 기간 요약, 가장 최근 관측일). model이 없으면 전체 기종"""
+    latest_seen = read_latest_seen(conn)
+    df = read_listing_lifetimes(conn, platform, model, start_date, end_date)
+    return summarize_days_on_market(df, latest_seen), latest_seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="매물 관측 이력(가격 변화, 게시 기간) 다시 만들기 / 요약 출력")
+    parser.add_argument("--db", default=str(DB_FILE), help="대상 DB 파일 (기본: project2.db)")
+    parser.add_argument("--rebuild", action="store_true", help="전체 게시물의 관측 이력을 스테이징에서 다시 만듦")
+    parser.add_argument("--platform", default="전체")
+    parser.add_argument("--model", help="기종 표시명 (기본: 전체 기종)")
+    parser.add_argument("--start", default="0000-00-00", help="게시일 시작 (YYYY-MM-DD)")
+    parser.add_argument("--end", default="9999-99-99", help="게시일 끝 (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        if ensure_observation_schema(conn) or args.rebuild:
+            runs = refresh_observations(conn)
+            print(f"✅ 관측 이력: 게시물 {conn.execute('SELECT COUNT(*) FROM observation_posts').fetchone()[0]:,}건, 가격 구간 {runs:,}개")
+        summary, latest_seen = read_days_on_market(conn, args.platform, args.model, args.start, args.end)
+        drops = read_price_drops(conn, args.platform, args.model, args.start, args.end)
+    finally:
+        conn.close()
+
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(f"\n[기종별 게시 기간] 마지막 관측일 {latest_seen}")
+        print(summary.to_string(index=False) if not summary.empty else "(없음)")
+        print(f"\n[가격 인하] {len(drops):,}건")
+        if not drops.empty: print(drops.drop(columns=['url']).head(20).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
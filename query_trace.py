@@ -0,0 +1,174 @@
+# --- 쿼리 계측 (함수별 실행 시간 / 반환 행 수 / 캐시 적중 여부 / SQLite 실행 계획) ---
+# 대시보드의 조회 함수와 지도 생성 함수를 감싸 한 번 호출할 때마다 기록을 남긴다.
+# 기록은 최근 history건을 메모리에 두고(디버그 사이드바), log_path가 있으면 JSON Lines로도 쌓는다.
+# 프로세스 전체에서 아래 tracer 하나를 함께 쓰고, 켜기 전(enabled=False)에는 아무것도 기록하지 않는다.
+#   {"ts": ..., "func": "fetch_dashboard_data", "ms": 12.3, "rows": 31, "cache": "miss",
+#    "queries": [{"sql": ..., "ms": ..., "rows": ..., "plan": [...], "full_scan": ["p"]}]}
+import functools
+import json
+import re
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+
+
+def result_rows(value):
+    """반환값의 행 수 (DataFrame/리스트 길이, 튜플·딕셔너리는 안의 DataFrame 행 수 합)"""
+    if isinstance(value, pd.DataFrame): return len(value)
+    if isinstance(value, dict):
+        return sum(len(v) for v in value.values() if isinstance(v, pd.DataFrame))
+    if isinstance(value, tuple):
+        frames = [v for v in value if isinstance(v, pd.DataFrame)]
+        return sum(len(v) for v in frames) if frames else None
+    if isinstance(value, list): return len(value)
+    return None
+
+
+def full_scan_tables(plan):
+    """EXPLAIN QUERY PLAN 결과 중 인덱스 없이 전체를 읽는 테이블 (예: 'SCAN p')"""
+    tables = []
+    for detail in plan:
+        m = re.match(r'SCAN (?:TABLE )?(\S+)', detail)
+        if m and 'USING' not in detail: tables.append(m.group(1))
+    return tables
+
+
+def _short(args, kwargs, limit=200):
+    text = ", ".join([repr(a) for a in args] + [f"{k}={v!r}" for k, v in kwargs.items()])
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class QueryTracer:
+    def __init__(self, enabled=False, log_path=None, history=500):
+        self.enabled = enabled
+        self.log_path = Path(log_path) if log_path else None
+        self.records = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, enabled=None, log_path=None):
+        if enabled is not None: self.enabled = enabled
+        if log_path is not None: self.log_path = Path(log_path)
+
+    def _current(self):
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    def trace(self, rows=result_rows, cache_default=None):
+        """함수 호출을 계측하는 데코레이터. cache_default: 적중/미스 표시가 없을 때 기록할 값"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled: return func(*args, **kwargs)
+                record = {
+                    'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                    'func': func.__name__,
+                    'args': _short(args, kwargs),
+                    'thread': threading.current_thread().name,
+                    'ms': None, 'rows': None, 'cache': None, 'queries': [],
+                }
+                if not hasattr(self._local, 'stack'): self._local.stack = []
+                stack = self._local.stack
+                stack.append(record)
+                start = time.perf_counter()
+                try:
+                    value = func(*args, **kwargs)
+                    record['rows'] = rows(value) if rows else None
+                    return value
+                except Exception as e:
+                    record['error'] = f"{type(e).__name__}: {e}"
+                    raise
+                finally:
+                    record['ms'] = round((time.perf_counter() - start) * 1000, 2)
+                    if record['cache'] is None: record['cache'] = cache_default
+                    stack.pop()
+                    self._save(record)
+            return wrapper
+        return decorator
+
+    def mark_cache(self, hit):
+        """진행 중인 호출의 캐시 적중 여부 기록 (이미 표시된 값은 유지)"""
+        record = self._current()
+        if record is not None and record['cache'] is None:
+            record['cache'] = 'hit' if hit else 'miss'
+
+    def on_cache_lookup(self, func_name, hit):
+        # ResultCache(on_lookup=...)용 콜백
+        self.mark_cache(hit)
+
+    def read_sql(self, sql, conn, params=None):
+        """pd.read_sql_query와 같지만, 계측 중이면 실행 계획과 실행 시간/행 수를 함께 기록"""
+        record = self._current() if self.enabled else None
+        if record is None: return pd.read_sql_query(sql, conn, params=params)
+
+        try:
+            plan = [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params or [])]
+        except Exception as e:
+            plan = [f"(실행 계획 조회 실패: {e})"]
+        start = time.perf_counter()
+        df = pd.read_sql_query(sql, conn, params=params)
+        self._add_query(record, sql, params, start, len(df), plan, full_scan_tables(plan))
+        return df
+
+    def read_duckdb(self, sql, conn, params=None):
+        """read_sql의 DuckDB 연결용 (columnar.py). 실행 계획은 EXPLAIN의 물리 계획"""
+        record = self._current() if self.enabled else None
+        if record is None: return conn.execute(sql, params or []).df()
+
+        try:
+            plan = [line for row in conn.execute("EXPLAIN " + sql, params or []).fetchall()
+                    for line in row[-1].splitlines() if line.strip()]
+        except Exception as e:
+            plan = [f"(실행 계획 조회 실패: {e})"]
+        start = time.perf_counter()
+        df = conn.execute(sql, params or []).df()
+        self._add_query(record, sql, params, start, len(df), plan, [])  # 컬럼형 스캔은 전체 스캔으로 표시하지 않는다
+        return df
+
+    def _add_query(self, record, sql, params, start, rows, plan, full_scan):
+        record['queries'].append({
+            'sql': re.sub(r'\s+', ' ', sql).strip(),
+            'params': [str(p) for p in (params or [])],
+            'ms': round((time.perf_counter() - start) * 1000, 2),
+            'rows': rows,
+            'plan': plan,
+            'full_scan': full_scan,
+        })
+
+    def _save(self, record):
+        with self._lock:
+            self.records.append(record)
+            if self.log_path is None: return
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            except OSError: pass
+
+    def recent(self, limit=None):
+        with self._lock:
+            records = list(self.records)
+        return records[-limit:] if limit else records
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+    def summary(self):
+        """함수별 호출 수 / 평균·최대 시간 / 캐시 적중률 DataFrame"""
+        records = self.recent()
+        if not records: return pd.DataFrame(columns=['func', 'calls', 'avg_ms', 'max_ms', 'hit_rate'])
+        df = pd.DataFrame(records)
+        grouped = df.groupby('func')
+        return pd.DataFrame({
+            'calls': grouped.size(),
+            'avg_ms': grouped['ms'].mean().round(2),
+            'max_ms': grouped['ms'].max(),
+            'hit_rate': grouped['cache'].apply(lambda s: (s == 'hit').mean()).round(2),
+        }).reset_index()
+
+
+tracer = QueryTracer()
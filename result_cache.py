@@ -0,0 +1,172 @@
+# --- 디스크 기반 결과 캐시 (재시작해도 유지, DB 버전이 바뀌면 자동 무효화) ---
+# 결과는 별도 SQLite 파일에 pickle로 저장하고, 키는 (네임스페이스, 함수 이름, 인자, DB 버전 토큰)으로 만든다.
+# 네임스페이스(예: DB 파일 + 분석 백엔드)마다 버전을 따로 관리해, 같은 캐시 파일을 쓰는 다른 DB의 결과를 지우지 않는다.
+# 꺼낼 때마다 새로 역직렬화한 객체를 돌려주므로 호출한 쪽이 결과를 고쳐도 캐시와 다른 호출자에게 번지지 않는다.
+# 함수가 예외를 내면 아무것도 저장하지 않는다 (조회 실패로 생긴 빈 결과가 캐시에 남지 않게).
+# 전체 크기가 max_bytes를 넘으면 가장 오래 안 쓴 결과부터 지운다 (LRU).
+import functools
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+  key         TEXT PRIMARY KEY,
+  namespace   TEXT NOT NULL DEFAULT '',
+  func        TEXT NOT NULL,
+  version     TEXT NOT NULL,
+  value       BLOB NOT NULL,
+  size        INTEGER NOT NULL,
+  last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access);
+CREATE INDEX IF NOT EXISTS idx_results_namespace ON results(namespace, version);
+CREATE TABLE IF NOT EXISTS counters (
+  name  TEXT PRIMARY KEY,
+  value INTEGER NOT NULL
+);
+"""
+
+
+class ResultCache:
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, memory_entries=128, on_lookup=None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.on_lookup = on_lookup  # on_lookup(함수 이름, 적중 여부): 계측용 콜백
+        self.hits = 0      # 이 프로세스에서의 적중/미스 (누적값은 counters 테이블)
+        self.misses = 0
+        self._memory = OrderedDict()  # 자주 쓰는 결과의 pickle (SQLite를 읽지 않고 역직렬화만)
+        self._versions = {}           # 네임스페이스 -> 마지막으로 본 DB 버전
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(results)")]
+        if columns and 'namespace' not in columns: self._conn.execute("DROP TABLE results")  # 네임스페이스 전의 캐시는 버린다
+        self._conn.executescript(CACHE_SCHEMA)
+
+    @staticmethod
+    def make_key(func_name, args, kwargs, namespace=''):
+        raw = namespace + repr((func_name, args, sorted(kwargs.items())))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _count(self, name):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1", (name,)
+        )
+
+    def _on_version(self, version, namespace=''):
+        # 네임스페이스에서 새 DB 버전을 처음 보면 그 네임스페이스의 이전 버전 결과를 지운다
+        if self._versions.get(namespace) == version: return
+        self._versions[namespace] = version
+        stale = [(key,) for (key,) in self._conn.execute(
+            "SELECT key FROM results WHERE namespace = ? AND version <> ?", (namespace, version))]
+        self._conn.executemany("DELETE FROM results WHERE key = ?", stale)
+        for (key,) in stale:
+            self._memory.pop(key, None)
+
+    def get(self, key, version, namespace=''):
+        """(적중 여부, 값) 반환. 값은 부를 때마다 새로 역직렬화한 객체"""
+        with self._lock:
+            self._on_version(version, namespace)
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                blob = self._memory[key]
+            else:
+                row = self._conn.execute(
+                    "SELECT value FROM results WHERE key = ? AND version = ?", (key, version)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    self._count('misses')
+                    return False, None
+                blob = row[0]
+                self._remember(key, blob)
+            self.hits += 1
+            self._count('hits')
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return True, pickle.loads(blob)
+
+    def set(self, key, version, func_name, value, namespace=''):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._on_version(version, namespace)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, namespace, func, version, value, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, namespace, func_name, version, blob, len(blob), time.time()),
+            )
+            self._remember(key, blob)
+            self._evict()
+
+    def _remember(self, key, blob):
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes: return
+        # 한 번에 90%까지 줄여서 매번 지우지 않도록 한다
+        target = total - int(self.max_bytes * 0.9)
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_access"):
+            evicted.append((key,))
+            target -= size
+            if target <= 0: break
+        self._conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+        for (key,) in evicted:
+            self._memory.pop(key, None)
+
+    def clear(self, func_name=None):
+        with self._lock:
+            if func_name is None:
+                self._conn.execute("DELETE FROM results")
+            else:
+                self._conn.execute("DELETE FROM results WHERE func = ?", (func_name,))
+            self._memory.clear()
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            'entries': entries,
+            'bytes': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'total_hits': counters.get('hits', 0),
+            'total_misses': counters.get('misses', 0),
+        }
+
+    def cached(self, version_fn, namespace=''):
+        """함수 결과를 (namespace, 인자, version_fn()) 기준으로 캐시하는 데코레이터.
+        namespace: 같은 캐시 파일을 쓰면서 결과가 달라질 수 있는 호출자 구분 (예: DB 파일 + 분석 백엔드).
+        DB 버전이 바뀌면 같은 namespace의 이전 결과만 지운다"""
+        def decorator(func):
+            func_name = func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                version = str(version_fn())
+                key = self.make_key(func_name, args, kwargs, namespace)
+                hit, value = self.get(key, version, namespace)
+                if self.on_lookup: self.on_lookup(func_name, hit)
+                if hit: return value
+                value = func(*args, **kwargs)
+                self.set(key, version, func_name, value, namespace)
+                return value  # 캐시에는 pickle만 남으므로 이 객체는 호출한 쪽 것
+
+            wrapper.clear = lambda: self.clear(func_name)
+            return wrapper
+        return decorator
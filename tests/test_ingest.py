@@ -0,0 +1,67 @@
+# --- ingest.py 회귀 테스트: 바뀐 파일만 다시 적재한 결과가 처음부터 전체 적재한 결과와 같아야 한다 ---
+#   python -m pytest tests
+import csv
+import shutil
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+PLATFORM_DIR = '중고나라'
+
+POSTS_SQL = """
+SELECT pf.name, p.ext_post_id, p.title, p.price_krw, p.posted_date, p.url,
+       pr.model, pr.storage_gb, pr.color, rg.sido, rg.sigungu, rg.dong
+FROM posts p
+JOIN platforms pf ON pf.platform_id = p.platform_id
+LEFT JOIN products pr ON pr.product_id = p.product_id
+LEFT JOIN regions rg ON rg.region_id = p.region_id
+ORDER BY pf.name, p.ext_post_id
+"""
+OBSERVATIONS_SQL = """
+SELECT pf.name, p.ext_post_id, o.first_seen, o.last_seen, o.price_krw, o.seen_count
+FROM post_observations o
+JOIN posts p ON p.post_id = o.post_id
+JOIN platforms pf ON pf.platform_id = p.platform_id
+ORDER BY pf.name, p.ext_post_id, o.first_seen
+"""
+
+
+def run_ingest(data_dir, db_file):
+    subprocess.run(
+        [sys.executable, str(BASE_DIR / 'ingest.py'), str(data_dir), '--db', str(db_file), '--no-refresh', '--workers', '1'],
+        check=True, cwd=BASE_DIR, capture_output=True,
+    )
+
+
+def read_db(db_file):
+    conn = sqlite3.connect(db_file)
+    try: return conn.execute(POSTS_SQL).fetchall(), conn.execute(OBSERVATIONS_SQL).fetchall()
+    finally: conn.close()
+
+
+def edit_csv(path, edit):
+    with open(path, encoding='utf-8-sig', newline='') as f: rows = list(csv.reader(f))
+    edit(rows)
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f: csv.writer(f).writerows(rows)
+
+
+def test_changed_file_reingest_matches_full_load(tmp_path):
+    data_dir = tmp_path / PLATFORM_DIR
+    shutil.copytree(BASE_DIR / PLATFORM_DIR, data_dir)
+    run_ingest(data_dir, tmp_path / 'incremental.db')
+
+    # jg_15_1020.csv의 첫 매물은 다음 날 파일(jg_15_1021.csv)에도 다른 가격으로 나온다:
+    # 다시 적재해도 먼저 나온 파일(10/20)의 행이 게시물로 남아야 한다
+    def edit(rows):
+        rows[2][2] = str(int(float(rows[2][2])) + 10000)
+        del rows[3]
+    edit_csv(data_dir / 'jg_15_1020.csv', edit)
+    run_ingest(data_dir, tmp_path / 'incremental.db')
+
+    run_ingest(data_dir, tmp_path / 'full.db')
+    incremental_posts, incremental_observations = read_db(tmp_path / 'incremental.db')
+    full_posts, full_observations = read_db(tmp_path / 'full.db')
+    assert incremental_posts == full_posts
+    assert incremental_observations == full_observations